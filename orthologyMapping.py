@@ -11,6 +11,21 @@
 # e.g if you have files for AGAM from ^ above link you can run the following command to get list of orthologs and paralogs
 # ../orthologs.py -np1 agamb -sp1id AGAMB.idmap.txt -sp1pc AGAMB.97pc.txt -brh AGAMB_DMELA.brh -sp2pc DMELA.97pc.txt -sp2id DMELA.idmap.txt -geneSet AGAM_4.9_genes -symb fb_synonym_fb_2020_02.tsv -conv false
 # and in addition if you want to convert SCRMshaw output to file which has DMEL ortho/paralogs use -so flag and provide scrmshaw output
+# to map many species at once (DMEL tables loaded only once) use: ./orthologyMapping.py batch -manifest species.tsv -sp2id DMELA.idmap.txt -sp2pc DMELA.97pc.txt -symb fb_synonym_fb_2020_02.tsv
+# to annotate (more) SCRMshaw outputs later from the lists of a previous run: ./orthologyMapping.py annotate -orth X_orthologList.csv -para X_paralogList.csv -so scrmshawOutput.bed[.gz] > SO_scrmshawOutput.bed
+# every input file can also be given compressed (.gz, .bz2, .xz, .zst)
+# -geneSet and -setConv can also be given the GFF3 annotation of the species, without cutting it with the perl one-liners first (see GFF INPUT below)
+# if you run the mapping many times against the same inputs, add -cache <directory> to keep the parsed tables for the next run
+# to keep the tables loaded and answer lookups over localhost HTTP: ./orthologyMapping.py serve -sp1id ... (see LOOKUP SERVICE below)
+# it can also be imported as a module (see OrthologyIndex below) to keep the tables loaded and resolve genes on demand
+# every run writes X_runReport.json (time of each stage, rows parsed from each input file, lookup hits/misses, peak memory), add -profile true for a cProfile of the run
+# big gene sets are resolved faster with -engine vector (whole gene set joined column by column), and with less memory with -compact true
+# weak brh hits can be left out with -minScore, -maxEvalue, -minIdentity and -minAlnLen, and -brhMetrics true adds the hit metrics to X_final.txt
+# for hit files with several partners per protein, -multiHit true writes every hit of each gene ranked by score to X_multiHit.txt (-topHits k for the k best)
+# -groups true writes co-orthology groups (ids connected over any number of 97pc/brh links) to X_groups.txt and X_geneGroups.txt
+# for repeat runs with a new gene set or SCRMshaw output add -store X.store, only new genes (or genes whose inputs changed) are resolved again
+# the other way round, species genes of FlyBase genes or symbols: ./orthologyMapping.py reverse ... (see REVERSE MAPPING below)
+# results can also be written as a SQLite database or Parquet/Arrow files with -format (see OUTPUT FORMATS below)
 #updated and commented June 2021
 ################################################################
 
@@ -21,50 +36,406 @@ import argparse
 import pprint
 import re
 import csv
+import marshal
+import array
+import mmap
+import bisect
+import ast
+import sqlite3
+import zlib
+import hashlib
+import json
+import multiprocessing
+import collections
+import io
+import gzip
+import bz2
+import lzma
+import shutil
+import subprocess
+import time
+import gc
+import threading
+import signal
+import socketserver
+import http.server
+import contextlib
+import cProfile
+import pstats
+try:
+    import resource
+except ImportError:
+    # not available on windows, peak memory is then left out of the run report
+    resource = None
+
+
+# ---------------------------- INPUT FILES -------------------
+# all input files can also be given compressed (.gz, .bz2, .xz or .zst, found from the first bytes of the file and not its name),
+# they are decompressed while reading so no uncompressed copy is needed on disk. If a multithreaded decompressor is
+# installed (pigz, lbzip2/pbzip2, xz, zstd) it is used in a separate process, which is much faster for large symbol tables
+COMPRESSIONS = [
+    # (magic bytes, compression, external decompressors (first found on PATH is used))
+    (b'\x1f\x8b', 'gzip', [['pigz', '-dc'], ['igzip', '-dc']]),
+    (b'BZh', 'bz2', [['lbzip2', '-dc'], ['pbzip2', '-dc']]),
+    (b'\xfd7zXZ\x00', 'xz', [['xz', '-dc', '-T0']]),
+    (b'\x28\xb5\x2f\xfd', 'zstd', [['zstd', '-dcq']]),
+]
+# usual file name suffixes of those compressions (outputs are written uncompressed, so these are taken off their names)
+COMPRESSION_SUFFIXES = ['.gz', '.bz2', '.xz', '.zst']
+
+
+# this function returns a file name without its compression suffix (e.g. preds.bed for preds.bed.gz)
+def uncompressed_name(fileName):
+    for suffix in COMPRESSION_SUFFIXES:
+        if fileName.lower().endswith(suffix):
+            return fileName[:-len(suffix)]
+    return fileName
+
+
+# this function returns the compression found from the first bytes of a file (gzip, bz2, xz or zstd) or None if it is plain text
+def magic_compression(start):
+    for magic, compression, commands in COMPRESSIONS:
+        if start.startswith(magic):
+            return compression
+    return None
+
+
+# this function returns the compression of a file (gzip, bz2, xz or zstd) or None if it is plain text
+def input_compression(fileI):
+    if fileI == '-':
+        return None
+    with open(fileI, 'rb') as fi:
+        return magic_compression(fi.read(6))
+
+
+# text file object reading the output of an external decompressor, which is waited for when the file is closed
+class CommandReader(io.TextIOWrapper):
+    def __init__(self, command):
+        self.process = subprocess.Popen(command, stdout=subprocess.PIPE)
+        super().__init__(self.process.stdout, encoding='utf-8')
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        returnCode = self.process.wait()
+        # a negative return code is the decompressor killed by SIGPIPE when the file is closed before its end
+        if returnCode > 0:
+            raise IOError(' '.join(self.process.args) + ' failed with exit status ' + str(returnCode))
+
+
+# this function returns a binary file object decompressing raw (a file name or binary file object) with python itself
+def python_decompressor(compression, raw):
+    if compression == 'gzip':
+        return gzip.open(raw, 'rb')
+    if compression == 'bz2':
+        return bz2.open(raw, 'rb')
+    if compression == 'xz':
+        return lzma.open(raw, 'rb')
+    # zstd is not part of python, the zstandard package is needed when the zstd command is not installed
+    try:
+        import zstandard
+    except ImportError:
+        sys.exit('zstd compressed input: install the zstd command or the zstandard python package to read it')
+    if isinstance(raw, str):
+        return zstandard.ZstdDecompressor().stream_reader(open(raw, 'rb'), closefd=True)
+    return zstandard.ZstdDecompressor().stream_reader(raw)
+
+
+# this function opens an input file for reading as text, decompressing it if needed ('-' is standard input)
+def open_input(fileI):
+    if fileI == '-':
+        raw = sys.stdin.buffer if hasattr(sys.stdin.buffer, 'peek') else io.BufferedReader(sys.stdin.buffer)
+        compression = magic_compression(raw.peek(6)[:6])
+        if compression is None:
+            return io.TextIOWrapper(raw, encoding='utf-8')
+        return io.TextIOWrapper(python_decompressor(compression, raw), encoding='utf-8')
+
+    compression = input_compression(fileI)
+    if compression is None:
+        return open(fileI, 'r')
+    for magic, name, commands in COMPRESSIONS:
+        if name == compression:
+            for command in commands:
+                if shutil.which(command[0]):
+                    return CommandReader(command + [fileI])
+    return io.TextIOWrapper(python_decompressor(compression, fileI), encoding='utf-8')
+
+
+# this function returns a read only memory map of a plain (uncompressed, not empty) input file or None if it cannot be mapped
+def mapped_input(fileI):
+    if fileI == '-' or input_compression(fileI) is not None or os.path.getsize(fileI) == 0:
+        return None
+    with open(fileI, 'rb') as fi:
+        return mmap.mmap(fi.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+# this function returns the lines of an input file as bytes, a plain file is read from a memory map of it (no read buffer
+# and no decoding of the columns that are not used), a compressed one from the binary stream under open_input()
+def input_lines(fileI):
+    mm = mapped_input(fileI)
+    if mm is not None:
+        with mm:
+            yield from iter(mm.readline, b'')
+    else:
+        with open_input(fileI) as fi:
+            yield from fi.buffer
+
+
+# this function returns the lines of bytes [start, end) of a memory mapped file (start and end at the start of a line)
+def mapped_lines(mm, start, end):
+    mm.seek(start)
+    readline = mm.readline
+    tell = mm.tell
+    while tell() < end:
+        yield readline()
+
+
+# this function returns the number of lines (rows) of an input file, which every loader reads all of, counted over blocks
+# of its (decompressed) bytes at C speed rather than line by line in the loaders (None for standard input, which cannot
+# be read a second time)
+def input_rows(fileI):
+    if fileI == '-':
+        return None
+    rows = 0
+    block = b''
+    with open_input(fileI) as fi:
+        for block in iter(lambda: fi.buffer.read(1 << 20), b''):
+            rows += block.count(b'\n')
+    # (a last line without a newline is a row too)
+    if block and not block.endswith(b'\n'):
+        rows += 1
+    return rows
 
 
 # This dictionary is created to save id mapping file of Spec_X. The format of this dictionary is something like this: [OFAS00001] = 'OFAS2:0001'
-def idMap_dict(nameOfDict, file):
-    with open(file, 'r') as fi:
-        rows = (line.split(' ') for line in fi)
-        nameOfDict = {row[1].strip('\n'): row[0] for row in rows}
+# if a set of gene ids is given only their rows are kept
+def idMap_dict(nameOfDict, file, geneIds=None):
+    with open_input(file) as fi:
+        rows = (line.split(' ', 2) for line in fi)
+        if geneIds is None:
+            nameOfDict = {row[1].strip('\n'): row[0] for row in rows}
+        else:
+            nameOfDict = {row[1].strip('\n'): row[0] for row in rows if row[1].strip('\n') in geneIds}
     return (nameOfDict)
 
 
 # This dictionary is created to save best reciprocal hits (DMEL_SpecX or SpecX_DMEL format). The format of this dictionary is something like this: [7227:00001] = 'OFAS2:0001'
-def brh_dict(nameOfBrhDict, fileBrh, flipping):
-    with open(fileBrh, 'r') as fb:
-        rowsB = (line.split('\t') for line in fb)
+# if a set of species X ids is given only their hits are kept
+def brh_dict(nameOfBrhDict, fileBrh, flipping, sp1Ids=None):
+    # only the first two columns are cut out of each line (and decoded)
+    rowsB = (line.split(b'\t', 2) for line in input_lines(fileBrh))
+    if sp1Ids is not None:
+        # (compared as bytes so the lines of other ids are not decoded)
+        keyColumn = 0 if flipping == 'true' else 1
+        sp1IdsB = {sp1Id.encode() for sp1Id in sp1Ids}
+        rowsB = (rowb for rowb in rowsB if rowb[keyColumn] in sp1IdsB)
+    if (flipping == 'true'):
+        # print('true')
+        nameOfBrhDict = {rowb[0].decode(): rowb[1].decode() for rowb in rowsB}
+    else:
+        # print('False')
+        nameOfBrhDict = {rowb[1].decode(): rowb[0].decode() for rowb in rowsB}
+    return (nameOfBrhDict)
+
+
+# This class keeps every hit of a .brh file (protein_id1 protein_id2 score evalue percent_identity start1 end1 start2 end2)
+# with its score, evalue, percent identity and aligned length (the shorter of the two aligned ranges, as the files have no
+# protein lengths to work out coverage) in arrays, so that hits can be filtered with other thresholds without reading the
+# file again. byScore holds the hits from best to worst score, so a minimum score only looks at the start of it, and
+# negScores holds their negated scores in the same (ascending) order so that start is found with bisect
+class BrhIndex:
+    def __init__(self, keys, partners, columns, byScore=None):
+        self.keys = keys
+        self.partners = partners
+        self.scores, self.evalues, self.identities, self.alignments = columns
+        if byScore is None:
+            byScore = array.array('i', sorted(range(len(keys)), key=self.scores.__getitem__, reverse=True))
+        self.byScore = byScore
+        self.negScores = array.array('d', [-self.scores[row] for row in byScore])
+
+    def __len__(self):
+        return len(self.keys)
+
+    # returns the numbers of the hits passing the thresholds, in the order of the file
+    def rows(self, minScore=None, maxEvalue=None, minIdentity=None, minAlignment=None):
+        if minScore is None:
+            rows = range(len(self.keys))
+        else:
+            # byScore[:n] are the hits with a score of at least minScore
+            n = bisect.bisect_right(self.negScores, -minScore)
+            rows = sorted(self.byScore[:n])
+        passing = []
+        for row in rows:
+            if maxEvalue is not None and self.evalues[row] > maxEvalue:
+                continue
+            if minIdentity is not None and self.identities[row] < minIdentity:
+                continue
+            if minAlignment is not None and self.alignments[row] < minAlignment:
+                continue
+            passing.append(row)
+        return passing
+
+    # returns {species X id: number of its hit} for the hits passing the thresholds (the last one if an id has more)
+    def select(self, minScore=None, maxEvalue=None, minIdentity=None, minAlignment=None):
+        return {self.keys[row]: row for row in self.rows(minScore, maxEvalue, minIdentity, minAlignment)}
+
+    # returns the brh dictionary ([species X id] = DMEL id) of the selected hits
+    def table(self, selected):
+        return {key: self.partners[row] for key, row in selected.items()}
+
+    # returns score, evalue, percent identity and aligned length of each selected hit, as columns for <namesp1>_final.txt
+    def metric_table(self, selected):
+        return {key: self.metric_columns(row) for key, row in selected.items()}
+
+    # returns score, evalue, percent identity and aligned length of hit number row as columns
+    def metric_columns(self, row):
+        return ['%.2f' % self.scores[row], '%.4e' % self.evalues[row], '%.2f' % self.identities[row], str(self.alignments[row])]
+
+    # returns the hits of rows (e.g. the ones passing thresholds, see rows()) as BrhHits
+    def hits(self, rows):
+        # hits of each id together (ids sorted), from best to worst score (hits with the same score in the order of the file)
+        ordered = sorted(rows, key=lambda row: (self.keys[row], -self.scores[row], row))
+        keys = []
+        offsets = array.array('i')
+        for position, row in enumerate(ordered):
+            if not keys or keys[-1] != self.keys[row]:
+                keys.append(self.keys[row])
+                offsets.append(position)
+        offsets.append(len(ordered))
+        return BrhHits(self, keys, offsets, array.array('i', ordered))
+
+
+# This class keeps every hit of each species X id (brh_dict keeps only the last one of an id), for files listing more than one
+# partner of a protein (e.g. hits that are not reciprocal), as compressed sparse rows: the hits of keys[i] are the hits numbered
+# rows[offsets[i]:offsets[i + 1]] of the BrhIndex, from best to worst score. keys is sorted, so an id is found by bisection
+# without a dictionary (or a list of hits) per id
+class BrhHits:
+    def __init__(self, index, keys, offsets, rows):
+        self.index = index
+        self.keys = keys
+        self.offsets = offsets
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.keys)
+
+    # returns the numbers of the hits of key from best to worst score (the top ones only if top is given), empty if it has none
+    def hit_rows(self, key, top=None):
+        position = bisect.bisect_left(self.keys, key)
+        if position == len(self.keys) or self.keys[position] != key:
+            return self.rows[0:0]
+        start = self.offsets[position]
+        end = self.offsets[position + 1]
+        if top is not None:
+            end = min(end, start + top)
+        return self.rows[start:end]
+
+    # returns [(DMEL id, hit number), ...] of key from best to worst score (the top ones only if top is given)
+    def partners(self, key, top=None):
+        return [(self.index.partners[row], row) for row in self.hit_rows(key, top)]
+
+
+# This function reads a .brh file into a BrhIndex (same direction of hits as brh_dict, and as there only the hits of
+# sp1Ids if a set of species X ids is given)
+def brh_index(nameOfBrhIndex, fileBrh, flipping, sp1Ids=None):
+    keys = []
+    partners = []
+    columns = (array.array('d'), array.array('d'), array.array('d'), array.array('i'))
+    keyColumn = 0 if flipping == 'true' else 1
+    sp1IdsB = None if sp1Ids is None else {sp1Id.encode() for sp1Id in sp1Ids}
+    # the numbers are parsed straight from the bytes of the line (float() and int() take bytes), only the ids are decoded
+    for line in input_lines(fileBrh):
+        rowb = line.split(b'\t', 9)
+        if len(rowb) < 9:
+            raise ValueError(fileBrh + ' has no score/evalue/identity/alignment columns in line: ' + line.decode())
+        if sp1IdsB is not None and rowb[keyColumn] not in sp1IdsB:
+            continue
         if (flipping == 'true'):
-            # print('true')
-            nameOfBrhDict = {rowb[0]: rowb[1] for rowb in rowsB}
+            keys.append(rowb[0].decode())
+            partners.append(rowb[1].decode())
         else:
-            # print('False')
-            nameOfBrhDict = {rowb[1]: rowb[0] for rowb in rowsB}
-    return (nameOfBrhDict)
+            keys.append(rowb[1].decode())
+            partners.append(rowb[0].decode())
+        columns[0].append(float(rowb[2]))
+        columns[1].append(float(rowb[3]))
+        columns[2].append(float(rowb[4]))
+        columns[3].append(min(abs(int(rowb[6]) - int(rowb[5])), abs(int(rowb[8]) - int(rowb[7]))) + 1)
+    return (BrhIndex(keys, partners, columns))
 
 
 # This dictionary is created to save id mapping file of DMEL. The format of this dictionary is something like this: [7227:0001] = 'FBgn0264125'
-def idMap2_dict(nameOfDict2, file2):
-    with open(file2, 'r') as fi:
-        rows = (line.split(' ') for line in fi)
+# if a set of DMEL ids is given only their rows are kept, and only their lines are split
+def idMap2_dict(nameOfDict2, file2, dmelIds=None):
+    with open_input(file2) as fi:
+        if dmelIds is None:
+            rows = (line.split(' ') for line in fi)
+        else:
+            rows = (line.split(' ') for line in fi if line[:line.find(' ')] in dmelIds)
         nameOfDict2 = {row[0]: row[1].strip() for row in rows}
     return (nameOfDict2)
 
 
-# This function takes in the list of paralogs (via *.97.pc.txt file) and returns the LIST of list of paralogs e.g. ['OFAS2:004b90', 'OFAS2:004b2b']
-def paralogs(nameoflist, filepc):
+# This class indexes the list of paralogs (via *.97.pc.txt file) so that looking a gene up does not need to scan every list
+# clusters keeps the LIST of list of paralogs e.g. ['OFAS2:004b90', 'OFAS2:004b2b'] (first one is the longest representative)
+# and members maps each id to [index of its list, index of id in that list] e.g. [OFAS2:004b2b] = [0, 1]
+class ParalogIndex:
+    def __init__(self, clusters, members=None):
+        self.clusters = clusters
+        if members is not None:
+            # members already worked out (e.g. read back from the cache)
+            self.members = members
+            return
+        self.members = {}
+        for clusterIndex, cluster in enumerate(clusters):
+            for position, member in enumerate(cluster):
+                # an id listed twice keeps its first location, same as scanning the lists from the top
+                if member not in self.members:
+                    self.members[member] = [clusterIndex, position]
+
+    def __contains__(self, value):
+        return value in self.members
+
+    def __getitem__(self, clusterIndex):
+        return self.clusters[clusterIndex]
+
+    def __iter__(self):
+        return iter(self.clusters)
+
+    def __len__(self):
+        return len(self.clusters)
+
+    # returns [index of list, index of value in that list] or -1 if value is not in any list of paralogs
+    def find(self, value):
+        return self.members.get(value, -1)
+
+    # returns the whole list of paralogs the value belongs to
+    def cluster(self, value):
+        return self.clusters[self.members[value][0]]
+
+    # returns the longest representative (first id) of the list of paralogs the value belongs to
+    def representative(self, value):
+        return self.clusters[self.members[value][0]][0]
+
+
+# This function takes in the list of paralogs (via *.97.pc.txt file) and returns them as a ParalogIndex built on the LIST of list of paralogs e.g. ['OFAS2:004b90', 'OFAS2:004b2b']
+# if a set of ids is given only the lists holding one of them are kept
+def paralogs(nameoflist, filepc, ids=None):
     listOflist = []
-    with open(filepc, 'r') as fp:
+    with open_input(filepc) as fp:
         rows = (re.split(',|\t', line.strip()) for line in fp)
+        if ids is not None:
+            rows = (row for row in rows if not ids.isdisjoint(row))
         for row in rows: listOflist.append(row)
     # for row in rows:
     # listOflist.append(row)
-    return (listOflist)
+    return (ParalogIndex(listOflist))
 
 
 # this function is used to find a value and return the index of that value
 def find(value, matrix):
+    if isinstance(matrix, ParalogIndex):
+        return matrix.find(value)
     for list in matrix:
         if value in list:
             return [matrix.index(list), list.index(value)]
@@ -72,29 +443,48 @@ def find(value, matrix):
 
 
 # this function is used to create a dictionary, when there is need to convert gene names using the file provided by user convGeneSet
-def conv_dict(nameOfCDict, fileC):
-    with open(fileC, 'r') as fi:
+# (a GFF file gives the conversions of its genes with a Dbxref entry of database dbxref, see GFF INPUT)
+def conv_dict(nameOfCDict, fileC, dbxref=None):
+    if gff_input(fileC):
+        if dbxref is None:
+            dbxref = GFF_DBXREF
+        nameOfCDict = {}
+        for geneId, geneDbxrefs in gff_genes(fileC):
+            for dbxrefs in geneDbxrefs:
+                entryId = dbxref_id(dbxrefs, dbxref)
+                if entryId is not None:
+                    nameOfCDict[entryId] = geneId
+                    break
+        return (nameOfCDict)
+    with open_input(fileC) as fi:
         rows = (line.split('\t') for line in fi)
         nameOfCDict = {row[1].strip(): row[0] for row in rows}
     return (nameOfCDict)
 
 
 # this function creates a dictionary to store FBgn gene symbol of drosophilla
-def geneSymbol_dict(nameofSDict, fileS):
-    with open(fileS, 'r') as fi:
-        rows = (line.split('\t') for line in fi if not (line.startswith('#') or line.strip() == ''))
-        nameofSDict = {row[0]: row[2] for row in rows}
+# if a set of FBgn ids is given (e.g. the ones in DMEL idmap file) only their symbols are kept, and only their lines are split
+def geneSymbol_dict(nameofSDict, fileS, fbgnIds=None):
+    with open_input(fileS) as fi:
+        if fbgnIds is None:
+            rows = (line.split('\t') for line in fi if not (line.startswith('#') or line.strip() == ''))
+            nameofSDict = {row[0]: row[2] for row in rows}
+        else:
+            rows = (line.split('\t', 3) for line in fi if line[:line.find('\t')] in fbgnIds)
+            nameofSDict = {row[0]: row[2] for row in rows}
     return (nameofSDict)
 
 
-# this function creates two dictionaries (ortholog and paralog) using x_final file created before..
+# this function creates two dictionaries (ortholog and paralog) using x_final file created before (e.g. by an earlier run)..
 def orthologs_dict(nameOfODict_orth, nameOfDict_para, fileO):
     nameOfODict_orth = {}
     nameOfDict_para = {}
 
     #modifying this by taking into account of dmel paralogs
-    with open(fileO, 'r') as fi:
-        rows = (line.split('\t') for line in fi)
+    with open_input(fileO) as fi:
+        # (newline taken off first, as <namesp1>_final.txt can have BRH metric columns after the 9 columns read here)
+        # (rows written short by older versions are padded to the 9 columns, see header_width)
+        rows = (header_width(line.rstrip('\n').split('\t'), FINAL_HEADER) for line in fi)
         # nameOfCDict = {row[0]:row[1]+row[2] for row in rows}
         for row in rows:
             if row[2] != 'NULL' and row[2] != '-':
@@ -113,12 +503,12 @@ def orthologs_dict(nameOfODict_orth, nameOfDict_para, fileO):
 
             elif (row[4] =='-' or row[4] == 'NULL') and row[1]=='NoDirectOrtholog':
 
-                if (row[6] != 'NULL' and row[6] != '-') and (row[8] =='NULL' or row[8]=='-\n') :
+                if (row[6] != 'NULL' and row[6] != '-') and (row[8] =='NULL' or row[8]=='-') :
                     if row[6]!= 'NoSymbolFound':
                         nameOfDict_para[row[0]] = row[6].strip()
                     else:
                         nameOfDict_para[row[0]] = row[5].strip()
-                elif (row[6] != 'NULL' and row[6] != '-') and (row[8] !='NULL' and row[8]!='-\n'):
+                elif (row[6] != 'NULL' and row[6] != '-') and (row[8] !='NULL' and row[8]!='-'):
                     ppsall= row[8].lstrip('[').rstrip(']\n').replace("'","")
                     pps=ppsall.split(',')
                     if row[6].strip() not in pps:
@@ -137,8 +527,2277 @@ def file_from_dict(nameOfFile, nameOfDict):
         w.writerow([key, val])
 
 
+# ---------------------------- GFF INPUT -------------------
+# the gene set (-geneSet) and the conversion file (-setConv) can also be given as the GFF3 annotation itself (.gff/.gff3 or
+# starting with ##gff-version, compressed or not), instead of files cut out of it first with the perl one-liners of README.txt:
+#   gene set:   ID of every gene feature (column 3 'gene') in the order of the file
+#   conversion: ID of a gene and the id of its Dbxref entry of database -gffDbxref (e.g. ID=gene5;Dbxref=BEETLEBASE:TC000001,GeneID:...
+#               gives gene5 TC000001), genes without such entry are left out
+# as with the one-liners a gene ID listed on more lines is in the gene set once and its conversion is taken from the first of
+# them with such a Dbxref entry. The GFF file is read once even if it is both the gene set and the conversion file
+GFF_DBXREF = 'BEETLEBASE'
+
+# genes of the GFF files read so far {(path, mtime, size): [(gene id, [Dbxref attribute of each of its lines]), ...]}
+gffGenes = {}
+
+
+# this function tells if an input file is a GFF file (by its name, e.g. genes.gff3.gz, or its ##gff-version header line)
+def gff_input(fileI):
+    name = uncompressed_name(os.path.basename(fileI).lower())
+    if name.endswith('.gff') or name.endswith('.gff3'):
+        return True
+    if fileI == '-' or not os.path.isfile(fileI):
+        return False
+    with open_input(fileI) as fi:
+        return fi.readline().startswith('##gff-version')
+
+
+# this function returns [(gene id, [Dbxref attribute of each of its lines ('' if none)]), ...] of the gene features of a GFF file
+def gff_genes(fileG):
+    st = os.stat(fileG)
+    key = (os.path.abspath(fileG), st.st_mtime_ns, st.st_size)
+    if key not in gffGenes:
+        genes = {}
+        with open_input(fileG) as fg:
+            for line in fg:
+                # (sequences may follow the features at the end of a GFF3 file)
+                if line.startswith('##FASTA'):
+                    break
+                # only gene lines are split into their columns and attributes
+                if line.startswith('#') or '\tgene\t' not in line:
+                    continue
+                cols = line.rstrip('\n').split('\t')
+                if len(cols) < 9 or cols[2] != 'gene':
+                    continue
+                attributes = dict(attribute.split('=', 1) for attribute in cols[8].split(';') if '=' in attribute)
+                geneId = attributes.get('ID')
+                if geneId is not None:
+                    genes.setdefault(geneId, []).append(attributes.get('Dbxref', ''))
+        gffGenes[key] = list(genes.items())
+    return gffGenes[key]
+
+
+# this function returns the id of the entry of database dbxref in a Dbxref attribute (e.g. TC000001 of BEETLEBASE:TC000001,GeneID:...)
+# or None if it has none
+def dbxref_id(dbxrefs, dbxref):
+    for entry in dbxrefs.split(','):
+        database, _, entryId = entry.partition(':')
+        if database == dbxref and entryId != '':
+            return entryId
+    return None
+
+
+# ---------------------------- COMPACT TABLES -------------------
+# with -compact true the loaded tables are kept in a compact form: every id (and symbol) is interned once into an IdTable
+# as a dense integer, idmap/brh/symbol dictionaries become IdRelations (one array of integers indexed by the integer of the key)
+# and lists of paralogs become CompactParalogIndexes (members of all lists in one array). They answer the same lookups as the
+# dictionaries and ParalogIndex, so the gene loop works on either, but take a few bytes per id instead of a python string
+# and dictionary entry in every table the id is in (lookups are slower though). The tables are built from the loaded
+# dictionaries, so the saving is in the memory the tables hold for as long as they are kept, not in the peak of a single run:
+# with 60k genes the tables take 15 MB instead of 33 MB (300k genes: 88 MB instead of 180 MB) but a whole run peaks at
+# 147 MB instead of 159 MB (300k genes: 389 MB instead of 443 MB), as most of it is the results of the genes, and loading is
+# about 5x and the gene loop about 2.5x slower. It pays off in processes keeping the tables of many species loaded (-serve,
+# OrthologyIndex, a batch manifest sharing the DMEL tables), not in one mapping run
+
+
+# this class interns ids: id number i is blob[offsets[i]:offsets[i + 1]] (utf-8) and slots is an open addressing hash
+# table (crc32 of the id, linear probing) of id numbers, -1 for an empty slot
+class IdTable:
+    def __init__(self):
+        self.blob = bytearray()
+        self.offsets = array.array('q', [0])
+        self.slots = array.array('i', [-1]) * 1024
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def name(self, code):
+        return self.blob[self.offsets[code]:self.offsets[code + 1]].decode('utf-8')
+
+    # returns (integer of the utf-8 encoded id or -1, slot where it is or would be)
+    def lookup(self, key):
+        slots = self.slots
+        offsets = self.offsets
+        mask = len(slots) - 1
+        slot = zlib.crc32(key) & mask
+        while True:
+            code = slots[slot]
+            if code < 0 or self.blob[offsets[code]:offsets[code + 1]] == key:
+                return (code, slot)
+            slot = (slot + 1) & mask
+
+    # returns the integer of name or -1 if it was never interned
+    def code(self, name):
+        return self.lookup(name.encode('utf-8'))[0]
+
+    # returns the integer of name, giving it the next free one if it has none yet
+    def intern(self, name):
+        key = name.encode('utf-8')
+        code, slot = self.lookup(key)
+        if code >= 0:
+            return code
+        code = len(self.offsets) - 1
+        self.blob += key
+        self.offsets.append(len(self.blob))
+        self.slots[slot] = code
+        # keeping the table at most half full keeps probing short
+        if 2 * code + 2 > len(self.slots):
+            self.rehash(2 * len(self.slots))
+        return code
+
+    def rehash(self, nSlots):
+        self.slots = array.array('i', [-1]) * nSlots
+        mask = nSlots - 1
+        for code in range(len(self)):
+            slot = zlib.crc32(self.blob[self.offsets[code]:self.offsets[code + 1]]) & mask
+            while self.slots[slot] >= 0:
+                slot = (slot + 1) & mask
+            self.slots[slot] = code
+
+
+# this class maps ids to ids (or symbols) like a dictionary, targets[integer of key] = integer of value or -1 for no value
+class IdRelation:
+    def __init__(self, ids, pairs=()):
+        self.ids = ids
+        self.targets = array.array('i')
+        self.size = 0
+        for key, value in pairs:
+            self.add(key, value)
+
+    # sets the value of key (as in a dictionary a key added again keeps its last value)
+    def add(self, key, value):
+        keyCode = self.ids.intern(key)
+        valueCode = self.ids.intern(value)
+        targets = self.targets
+        if keyCode >= len(targets):
+            targets.extend(array.array('i', [-1]) * (keyCode + 1 - len(targets)))
+        if targets[keyCode] < 0:
+            self.size += 1
+        targets[keyCode] = valueCode
+
+    # returns the integer of the value of key or -1 if key has no value
+    def code(self, key):
+        keyCode = self.ids.lookup(key.encode('utf-8'))[0]
+        if keyCode < 0 or keyCode >= len(self.targets):
+            return -1
+        return self.targets[keyCode]
+
+    def __contains__(self, key):
+        return self.code(key) >= 0
+
+    def __getitem__(self, key):
+        valueCode = self.code(key)
+        if valueCode < 0:
+            raise KeyError(key)
+        return self.ids.name(valueCode)
+
+    def get(self, key, default=None):
+        valueCode = self.code(key)
+        return default if valueCode < 0 else self.ids.name(valueCode)
+
+    def __len__(self):
+        return self.size
+
+    def items(self):
+        return ((self.ids.name(keyCode), self.ids.name(valueCode)) for keyCode, valueCode in enumerate(self.targets) if valueCode >= 0)
+
+    def keys(self):
+        return (key for key, value in self.items())
+
+    def values(self):
+        return (value for key, value in self.items())
+
+
+# this class is the compact form of ParalogIndex: the members of list i are memberCodes[offsets[i]:offsets[i + 1]]
+# and memberCluster/memberPosition[integer of id] give the list of an id and its place in it (-1 if it is in no list)
+class CompactParalogIndex:
+    def __init__(self, ids, index):
+        self.ids = ids
+        self.offsets = array.array('i', [0])
+        self.memberCodes = array.array('i')
+        for cluster in index:
+            self.memberCodes.extend([ids.intern(member) for member in cluster])
+            self.offsets.append(len(self.memberCodes))
+        self.memberCluster = array.array('i', [-1]) * len(ids)
+        self.memberPosition = array.array('i', [-1]) * len(ids)
+        for member, (clusterIndex, position) in index.members.items():
+            memberCode = ids.code(member)
+            self.memberCluster[memberCode] = clusterIndex
+            self.memberPosition[memberCode] = position
+
+    # returns the integer of value if it is in a list of paralogs, else -1
+    def code(self, value):
+        memberCode = self.ids.lookup(value.encode('utf-8'))[0]
+        if memberCode < 0 or memberCode >= len(self.memberCluster) or self.memberCluster[memberCode] < 0:
+            return -1
+        return memberCode
+
+    def __contains__(self, value):
+        return self.code(value) >= 0
+
+    def __getitem__(self, clusterIndex):
+        return [self.ids.name(memberCode) for memberCode in self.memberCodes[self.offsets[clusterIndex]:self.offsets[clusterIndex + 1]]]
+
+    def __iter__(self):
+        return (self[clusterIndex] for clusterIndex in range(len(self)))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # returns [index of list, index of value in that list] or -1 if value is not in any list of paralogs
+    def find(self, value):
+        memberCode = self.code(value)
+        if memberCode < 0:
+            return -1
+        return [self.memberCluster[memberCode], self.memberPosition[memberCode]]
+
+    def cluster(self, value):
+        return self[self.memberCluster[self.code(value)]]
+
+    def representative(self, value):
+        return self.ids.name(self.memberCodes[self.offsets[self.memberCluster[self.code(value)]]])
+
+
+# this function returns the compact form of a loaded table (dictionary or ParalogIndex), interning its ids into ids
+# (without an IdTable the table is returned as it is)
+def compact_table(ids, table):
+    if ids is None:
+        return table
+    if isinstance(table, ParalogIndex):
+        return CompactParalogIndex(ids, table)
+    return IdRelation(ids, table.items())
+
+
+# ---------------------------- RUN REPORT -------------------
+# unless -report false is given, <namesp1>_runReport.json is written next to the outputs with wall/CPU time of each stage,
+# the rows parsed from each input file (rowsParsed: its lines, 0 when the table comes from the cache) and the entries of
+# the table made of them (tableEntries: entries kept after the loader picked and de-duplicated rows, e.g. only symbols of
+# DMEL idmap FBgn ids), hits/misses of the idmap, brh, DMEL idmap, symbol and paralog cluster lookups of the genes resolved
+# in the run (genes taken from a result store are counted as 'result store hit') and peak memory. With -profile true the
+# stages also run under cProfile and the statistics are saved in <namesp1>_profile.txt
+class RunReport:
+    def __init__(self, profile=False):
+        self.stages = []
+        self.inputs = []
+        self.lookups = collections.Counter()
+        self.counts = {}
+        self.profiler = cProfile.Profile() if profile else None
+
+    # context manager timing (and profiling) the stage inside it
+    @contextlib.contextmanager
+    def stage(self, name):
+        wallStart = time.perf_counter()
+        cpuStart = time.process_time()
+        if self.profiler is not None:
+            self.profiler.enable()
+        try:
+            yield
+        finally:
+            if self.profiler is not None:
+                self.profiler.disable()
+            self.stages.append({'stage': name, 'wall_s': round(time.perf_counter() - wallStart, 4),
+                                'cpu_s': round(time.process_time() - cpuStart, 4)})
+
+    def add_input(self, loaderName, files, rowsParsed, tableEntries, fromCache, seconds):
+        self.inputs.append({'loader': loaderName, 'files': files, 'rowsParsed': rowsParsed, 'tableEntries': tableEntries,
+                            'fromCache': fromCache, 'wall_s': round(seconds, 4)})
+
+    # counts the lookups of every GeneResult
+    def add_lookups(self, results):
+        for result in results:
+            self.lookups.update(result.lookups)
+
+    def write(self, fileName, info):
+        report = dict(info)
+        report.update({'stages': self.stages, 'inputs': self.inputs, 'counts': self.counts,
+                       'lookups': dict(sorted(self.lookups.items())),
+                       'peak_rss_mb': peak_rss_mb()})
+        with open(fileName, 'w') as fr:
+            json.dump(report, fr, indent=2)
+
+    def write_profile(self, fileName, limit=40):
+        with open(fileName, 'w') as fp:
+            pstats.Stats(self.profiler, stream=fp).sort_stats('cumulative').print_stats(limit)
+
+
+# report of the mapping that is running (None when no report is wanted), filled by cached_load() and map_species()
+runReport = None
+
+
+# this function returns a context manager timing a stage in the run report (or doing nothing if there is no report)
+def report_stage(name):
+    if runReport is None:
+        return contextlib.nullcontext()
+    return runReport.stage(name)
+
+
+# this function returns peak memory (RSS in MB) of this process and its finished child processes (e.g. worker processes)
+def peak_rss_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is in KB on linux and in bytes on macOS
+    scale = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return round(max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                     resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / scale, 1)
+
+
+# ---------------------------- CACHE OF INPUT TABLES -------------------
+# parsing the idmap, brh, 97pc and symbol files takes most of the start-up time, and for repeat runs against the same
+# reference they do not change, so each table can be saved in a binary (marshal) file inside a cache directory.
+# A cache file is only used when the version, the python version, and the path, mtime and size of every input file
+# still match what was saved with it, otherwise the table is parsed again and the cache file is rewritten
+# (every loader takes the name of its table, its input file and then its parameters, only that file is an input file)
+CACHE_VERSION = 3
+
+
+# this function returns the signature saved in a cache file: cache version, python version, loader parameters and (path, mtime, size) of each input file
+# (a parameter is never taken for a file, even if a file of that name happens to be in the working directory)
+def cache_signature(loaderName, inputFiles, params):
+    files = []
+    for inputFile in inputFiles:
+        if os.path.isfile(inputFile):
+            st = os.stat(inputFile)
+            files.append((os.path.abspath(inputFile), st.st_mtime_ns, st.st_size))
+        else:
+            # a missing file is left for the loader to report
+            files.append((os.path.abspath(inputFile), None, None))
+    paramReprs = []
+    for param in params:
+        if isinstance(param, (set, frozenset)):
+            # sets of ids are saved as a digest of their sorted ids
+            paramReprs.append('set:' + hashlib.sha1('\n'.join(sorted(param)).encode()).hexdigest())
+        else:
+            paramReprs.append(repr(param))
+    return (CACHE_VERSION, tuple(sys.version_info[:2]), loaderName, tuple(paramReprs), tuple(files))
+
+
+# this function returns the table made by loader(*args), reading it from cacheDir when a valid cache file is there
+# (and adds how many entries were loaded from which files to the run report)
+def cached_load(cacheDir, loader, *args):
+    start = time.perf_counter()
+    table, fromCache = cached_table(cacheDir, loader, *args)
+    if runReport is not None:
+        seconds = time.perf_counter() - start
+        # (a table read back from the cache has no lines parsed)
+        rowsParsed = 0 if fromCache else input_rows(args[1])
+        runReport.add_input(loader.__name__, [args[1]], rowsParsed, len(table), fromCache, seconds)
+    return table
+
+
+# this function returns the table made by loader(*args) and True if it was read back from cacheDir (or False if loader was called)
+def cached_table(cacheDir, loader, *args):
+    if cacheDir == 'NoCache':
+        return (loader(*args), False)
+    signature = cache_signature(loader.__name__, [args[1]], (args[0],) + args[2:])
+    # one cache file per loader and input path(s), so a changed input (or parameter) overwrites its old cache file instead of piling up new ones
+    inputPaths = [f[0] for f in signature[4]]
+    key = hashlib.sha1(repr((loader.__name__, inputPaths)).encode()).hexdigest()
+    cacheFile = os.path.join(cacheDir, loader.__name__ + '_' + key[:16] + '.bin')
+
+    if os.path.isfile(cacheFile):
+        try:
+            with open(cacheFile, 'rb') as fc:
+                # the signature is a small header read on its own, the table is read at once and unmarshalled from memory
+                # (marshal.load() reads a file object in small pieces, which is slower than parsing the input file again)
+                if marshal.load(fc) == signature:
+                    with gc_paused():
+                        data = marshal.loads(fc.read())
+                    if loader is paralogs:
+                        return (ParalogIndex(data[0], data[1]), True)
+                    if loader is brh_index:
+                        columns = [array.array(typecode, raw) for typecode, raw in data[2]]
+                        return (BrhIndex(data[0], data[1], columns, array.array('i', data[3])), True)
+                    return (data, True)
+        except (EOFError, ValueError, TypeError):
+            # unreadable/old cache file, will be rebuilt below
+            pass
+
+    table = loader(*args)
+    data = table
+    if isinstance(table, ParalogIndex):
+        data = (table.clusters, table.members)
+    elif isinstance(table, BrhIndex):
+        columns = [(column.typecode, column.tobytes()) for column in (table.scores, table.evalues, table.identities, table.alignments)]
+        data = (table.keys, table.partners, columns, table.byScore.tobytes())
+    os.makedirs(cacheDir, exist_ok=True)
+    # writing to a temporary file first so a run killed half way never leaves a broken cache file behind
+    tmpFile = cacheFile + '.' + str(os.getpid()) + '.tmp'
+    with open(tmpFile, 'wb') as fc:
+        marshal.dump(signature, fc)
+        marshal.dump(data, fc)
+    os.replace(tmpFile, cacheFile)
+    return (table, False)
+
+
+# this function loads the DMEL side tables (shared by every species mapped against DMEL)
+# returns DMEL idmap and symbol dictionaries and paralog index of DMEL (a DmelParalogTable)
+# (with an IdTable ids the tables are kept in compact form, see COMPACT TABLES, without sp2pc97 there is no paralog index)
+def load_reference(sp2idmap, symbolGene, sp2pc97, cacheDir='NoCache', ids=None):
+    dict_sp2id = cached_load(cacheDir, idMap2_dict, 'sp2id', sp2idmap)
+    # symbols are only ever looked up for FBgn ids of DMEL idmap file, so the others are not loaded
+    dict_symb = compact_table(ids, cached_load(cacheDir, geneSymbol_dict, 'symbol', symbolGene, frozenset(dict_sp2id.values())))
+    dict_sp2id = compact_table(ids, dict_sp2id)
+    pc2 = None
+    if sp2pc97 is not None:
+        pc2 = DmelParalogTable(compact_table(ids, cached_load(cacheDir, paralogs, 'pc2', sp2pc97)), dict_sp2id, dict_symb)
+    return (dict_sp2id, dict_symb, pc2)
+
+
+# this function loads the species X side tables
+# returns species X idmap and brh dictionaries and paralog index of species X
+# (with an IdTable ids the tables are kept in compact form, see COMPACT TABLES, and with a BrhIndex of the brh file only
+# its hits passing brhThresholds are used)
+def load_species(sp1idmap, brhsp1sp2, flipped, sp1pc97, cacheDir='NoCache', ids=None, brhIndex=None, brhThresholds=None):
+    dict_sp1id = compact_table(ids, cached_load(cacheDir, idMap_dict, 'sp1id', sp1idmap))
+    if brhIndex is None:
+        dict_brh = compact_table(ids, cached_load(cacheDir, brh_dict, 'brh', brhsp1sp2, flipped))
+    else:
+        dict_brh = compact_table(ids, brhIndex.table(brhIndex.select(**(brhThresholds or {}))))
+    pc1 = compact_table(ids, cached_load(cacheDir, paralogs, 'pc1', sp1pc97))
+    return (dict_sp1id, dict_brh, pc1)
+
+
+# this function returns the thresholds (as given to BrhIndex.select) that are set, from options or manifest columns ('' or None is not set)
+def brh_thresholds(minScore=None, maxEvalue=None, minIdentity=None, minAlignment=None):
+    thresholds = {}
+    for name, value in [('minScore', minScore), ('maxEvalue', maxEvalue), ('minIdentity', minIdentity), ('minAlignment', minAlignment)]:
+        if value is not None and value != '':
+            thresholds[name] = float(value)
+    return thresholds
+
+
+# this function loads all of the OrthoDB/FlyBase tables needed for the mapping (through the cache if one is given)
+# returns species X idmap, brh, DMEL idmap, symbol dictionaries and paralog indexes of species X and DMEL
+def load_inputs(sp1idmap, brhsp1sp2, flipped, sp2idmap, symbolGene, sp1pc97, sp2pc97, cacheDir='NoCache', ids=None, brhIndex=None,
+                brhThresholds=None):
+    dict_sp1id, dict_brh, pc1 = load_species(sp1idmap, brhsp1sp2, flipped, sp1pc97, cacheDir, ids, brhIndex, brhThresholds)
+    dict_sp2id, dict_symb, pc2 = load_reference(sp2idmap, symbolGene, sp2pc97, cacheDir, ids)
+    return (dict_sp1id, dict_brh, dict_sp2id, dict_symb, pc1, pc2)
+
+
+# this function loads the tables needed for the mapping of the genes geneNames only (-lazy true): each file is streamed once,
+# keeping the rows reachable from the gene set, i.e. idmap rows of the genes, their lists of paralogs (with the first,
+# longest, id of each), brh hits of those ids, DMEL lists of paralogs and idmap rows of the DMEL ids of those hits (and of
+# their DMEL paralogs) and symbols of their FBgn ids. Genes are resolved the same as with the whole tables, the cache is not
+# used (tables of one gene set would replace the cached whole tables).
+# returns the tables as load_inputs() does and the BrhIndex of the kept hits if there are brh thresholds or keepBrhIndex is
+# set (else None)
+def load_inputs_lazy(geneNames, sp1idmap, brhsp1sp2, flipped, sp2idmap, symbolGene, sp1pc97, sp2pc97, ids=None, brhThresholds=None,
+                     keepBrhIndex=False):
+    dict_sp1id = cached_load('NoCache', idMap_dict, 'sp1id', sp1idmap, frozenset(geneNames))
+    sp1Ids = frozenset(dict_sp1id.values())
+    pc1 = cached_load('NoCache', paralogs, 'pc1', sp1pc97, sp1Ids)
+    # genes without brh look up the hit of the first id of their list of paralogs
+    brhIds = sp1Ids.union(cluster[0] for cluster in pc1)
+    brhIndex = None
+    if brhThresholds or keepBrhIndex:
+        brhIndex = cached_load('NoCache', brh_index, 'brh', brhsp1sp2, flipped, brhIds)
+        dict_brh = brhIndex.table(brhIndex.select(**(brhThresholds or {})))
+    else:
+        dict_brh = cached_load('NoCache', brh_dict, 'brh', brhsp1sp2, flipped, brhIds)
+    # (with a BrhIndex every partner of the kept hits, e.g. for <namesp1>_multiHit.txt)
+    dmelIds = frozenset(dict_brh.values()) if brhIndex is None else frozenset(brhIndex.partners)
+    pc2 = cached_load('NoCache', paralogs, 'pc2', sp2pc97, dmelIds)
+    dict_sp2id = cached_load('NoCache', idMap2_dict, 'sp2id', sp2idmap, dmelIds.union(*pc2))
+    dict_symb = cached_load('NoCache', geneSymbol_dict, 'symbol', symbolGene, frozenset(dict_sp2id.values()))
+    dict_sp2id = compact_table(ids, dict_sp2id)
+    dict_symb = compact_table(ids, dict_symb)
+    pc2 = DmelParalogTable(compact_table(ids, pc2), dict_sp2id, dict_symb)
+    return (compact_table(ids, dict_sp1id), compact_table(ids, dict_brh), dict_sp2id, dict_symb, compact_table(ids, pc1), pc2, brhIndex)
+
+
+# one record per gene of the gene set: the columns written to <namesp1>_temp.txt and <namesp1>_final.txt, the entries
+# that go into the ortholog and paralog lists (None when the gene has no entry in that list) and the lookups done for the
+# gene with their outcome (e.g. ('idmap hit', 'brh miss', 'paralog cluster hit', ...), counted in the run report)
+# every result has one column per column of TEMP_HEADER and FINAL_HEADER (NULL where a brh partner has no DMEL id)
+GeneResult = collections.namedtuple('GeneResult', ['geneName', 'tempCols', 'finalCols', 'ortholog', 'paralog', 'lookups'])
+
+TEMP_HEADER = ['GeneName_TC', 'GeneName_OGid', 'Ortholog_id_symb', 'Dmel_paralogs', 'Dmel_paralogs_ids', 'Dmel_paralogs_Symbols',
+               'listOfParalogsIfAny', 'ifParalogHasOrtholog_id_symb', 'Dmel_Pparalogs', 'Dmel_Pparalogs_ids', 'Dmel_Pparalogs_Symbols']
+FINAL_HEADER = ['GeneName', 'Orthologs', 'GeneSymbolOrthologs', 'Dmel_paralogs', 'GeneSymbolDmel_paralogs',
+                'ParalogsThatHaveOrthologs', 'GeneSymbolParalogs', 'Dmel_Pparalogs', 'GeneSymbolDmel_Pparalogs']
+
+
+# columns added to <namesp1>_final.txt with -brhMetrics true (hit of the direct ortholog, '-' for genes without one)
+BRH_HEADER = ['BRH_score', 'BRH_evalue', 'BRH_identity', 'BRH_alignedLength']
+# columns of <namesp1>_multiHit.txt written with -multiHit true, one line per hit of a gene (rank 1 is its best scoring hit)
+MULTIHIT_HEADER = ['GeneName', 'GeneName_OGid', 'Rank', 'Dmel_id', 'Orthologs', 'GeneSymbolOrthologs'] + BRH_HEADER
+
+
+# this function returns the columns cols of a row cut or padded with '-' to the width of its header (rows of files written
+# by older versions were left short after a brh partner without DMEL id)
+def header_width(cols, header):
+    if len(cols) == len(header):
+        return cols
+    return (list(cols) + ['-'] * len(header))[:len(header)]
+
+
+# this function checks if dmel's id has any paralogs and returns [list of paralogs, their FBgn ids, symbols of those FBgn ids]
+# or None if it is not found in DMEL 97 pc file
+def dmel_paralogs(dmelId, dict_sp2id, dict_symb, pc2):
+    if dmelId not in pc2:
+        return None
+    return paralog_list_ids(pc2.cluster(dmelId), dict_sp2id, dict_symb)
+
+
+# this function returns [list of paralogs, their FBgn ids, symbols of those FBgn ids] of a DMEL list of paralogs
+def paralog_list_ids(dmelsParalogsList, dict_sp2id, dict_symb):
+    dmelsParalogsListFBgn = []
+    dmelsParalogsListFBgnSymb = []
+    # go through each of these paralogs and list their FBgn ids and symbols
+    for paralog in dmelsParalogsList:
+        if paralog in dict_sp2id:
+            dmelsParalogsListFBgn.append(dict_sp2id[paralog])
+            dmelsParalogsListFBgnSymb.append(dict_symb.get(dict_sp2id[paralog], '-'))
+        else:
+            # no FBgn id found (and no symbol is listed for it either)
+            dmelsParalogsListFBgn.append('-')
+    return [dmelsParalogsList, dmelsParalogsListFBgn, dmelsParalogsListFBgnSymb]
+
+
+# this function returns the paralog list entry made of a symbol and the symbols of its dmel paralogs
+# e.g. symbol 'Nmdmc' and paralogs ['CG1', 'CG2'] gives 'NmdmcCG1, CG2' (the symbol is left out if it is the first paralog)
+def paralog_entry(symbol, paralogsSymb):
+    pOpsall = str(paralogsSymb)[1:-1].replace("'", "")
+    if symbol not in pOpsall.split(','):
+        return symbol + pOpsall
+    return pOpsall
+
+
+# this function returns the paralog columns of a list of DMEL paralogs as they are written: (list of paralogs, their FBgn ids,
+# their symbols, the part of paralog_entry() that is the same for every symbol, the symbols in that part)
+def paralog_list_columns(dmelParalogs):
+    pOpsall = str(dmelParalogs[2])[1:-1].replace("'", "")
+    return (str(dmelParalogs[0]), str(dmelParalogs[1]), str(dmelParalogs[2]), pOpsall, frozenset(pOpsall.split(',')))
+
+
+# this class is the DMEL paralog index with the paralog columns of each of its lists worked out once (DMEL idmap and symbol
+# tables do not change during a run), so the paralog columns of an ortholog are one lookup whatever the size of its list.
+# It is used in place of the paralog index (find, cluster, ... are those of the index) and shared by every species
+# mapped against DMEL (in batch mode, the lookup service and OrthologyIndex)
+class DmelParalogTable:
+    def __init__(self, pc2, dict_sp2id, dict_symb):
+        self.pc2 = pc2
+        self.columns = [paralog_list_columns(paralog_list_ids(cluster, dict_sp2id, dict_symb)) for cluster in pc2]
+
+    def __contains__(self, value):
+        return value in self.pc2
+
+    def __getitem__(self, clusterIndex):
+        return self.pc2[clusterIndex]
+
+    def __iter__(self):
+        return iter(self.pc2)
+
+    def __len__(self):
+        return len(self.pc2)
+
+    def find(self, value):
+        return self.pc2.find(value)
+
+    def cluster(self, value):
+        return self.pc2.cluster(value)
+
+    def representative(self, value):
+        return self.pc2.representative(value)
+
+    # returns the paralog columns (see paralog_list_columns) of the list of paralogs of dmelId or None if it is in no list
+    def paralog_columns(self, dmelId):
+        place = self.pc2.find(dmelId)
+        if place == -1:
+            return None
+        return self.columns[place[0]]
+
+
+# this function returns the paralog columns (see paralog_list_columns) of the DMEL paralogs of dmel's id or None if it is not
+# found in DMEL 97 pc file (looked up in pc2 if it is a DmelParalogTable, else worked out)
+def dmel_paralog_columns(dmelId, dict_sp2id, dict_symb, pc2):
+    if isinstance(pc2, DmelParalogTable):
+        return pc2.paralog_columns(dmelId)
+    dmelParalogs = dmel_paralogs(dmelId, dict_sp2id, dict_symb, pc2)
+    if dmelParalogs is None:
+        return None
+    return paralog_list_columns(dmelParalogs)
+
+
+# the columns of each kind of result, shared by resolve_gene() and the vector engine: the head of a result is the gene name,
+# its id and the ortholog columns (TEMP_HEADER[:6], FINAL_HEADER[:5]), its tail the paralog columns (see paralog_columns)
+# tails of a gene with a brh partner (that has no need of paralogs) and of a gene without ortholog that is in no list of paralogs
+NO_NEED_OF_PARALOGS_TAIL = (['-', '-', '-', '-', '-'], ['NoNeedOfParalogs', '-', '-', '-'])
+NO_PARALOGS_TAIL = (['NoParalogs', '-', '-', '-', '-'], ['NoParalogsFound', '-', '-', '-'])
+
+
+# this function returns the GeneResult of a gene not found in idmap (nothing else could be looked up)
+def unmapped_result(geneName, geneName2):
+    return GeneResult(geneName, [geneName2] + ['-'] * 10, [geneName, 'geneIDnotMapped'] + ['-'] * 7, None, None, ('idmap miss',))
+
+
+# this function returns the head of a gene whose brh partner dmelId has the FBgn id fbgn (and symbol, None if it has none)
+# with the paralog columns of its DMEL list of paralogs (see dmel_paralog_columns, None if it is in no list)
+# returns the temp and final columns and the ortholog and paralog list entries (paralog entry None without DMEL paralogs)
+def ortholog_head(geneName2, sp1Id, dmelId, fbgn, symbol, dmelParalogs):
+    symbolCol = symbol if symbol is not None else 'NoSymbolFound'
+    tempCols = [geneName2, sp1Id, dmelId + '__' + fbgn + '/' + (symbol if symbol is not None else 'NoSymb')]
+    finalCols = [geneName2, fbgn, symbolCol]
+    ortholog = symbol if symbol is not None else fbgn
+    if dmelParalogs is None:
+        return (tempCols + ['NoParalogs', '-', '-'], finalCols + ['NoParalogs', '-'], ortholog, None)
+    paralog = dmelParalogs[3] if symbolCol in dmelParalogs[4] else symbolCol + dmelParalogs[3]
+    return (tempCols + [dmelParalogs[0], dmelParalogs[1], dmelParalogs[2]], finalCols + [dmelParalogs[1], dmelParalogs[2]],
+            ortholog, paralog)
+
+
+# this function returns the temp and final head of a gene whose brh partner has no DMEL id (so no ortholog can be found)
+def partner_unmapped_head(geneName2, sp1Id):
+    return ([geneName2, sp1Id] + ['NULL'] * 4, [geneName2] + ['NULL'] * 4)
+
+
+# this function returns the temp and final head of a gene that is not in the brh file
+def no_ortholog_head(geneName2, sp1Id):
+    return ([geneName2, sp1Id, 'NO ortholog', '-', '-', '-'], [geneName2, 'NoDirectOrtholog', 'NULL', '-', '-'])
+
+
+# this function finds ortholog/paralogs wrt DMEL of one gene of the gene set and returns them as a GeneResult
+def resolve_gene(geneName, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv=None, separator=':'):
+    # if there is a step of conversion of gene Naming involved, then making sure to use the right one using the
+    # dictioanary created previously, if not, then go ahead with line one of gene name
+    geneName2 = geneName
+    if dict_conv is not None and geneName.split(separator)[1] in dict_conv:
+        geneName2 = dict_conv[geneName.split(separator)[1]]
+
+    # gene id not found in idmap--nothing else could be looked up
+    if geneName not in dict_sp1id:
+        return unmapped_result(geneName, geneName2)
+
+    sp1Id = dict_sp1id[geneName]
+    ortholog = None
+    paralog = None
+    lookups = ['idmap hit']
+
+    # STEP 1: Check ORTHOLOGS
+    # First of all check if it has any Ortholog or not..
+    if sp1Id in dict_brh:
+        dmelId = dict_brh[sp1Id]
+        lookups.append('brh hit')
+        # also a gene with a brh but without DMEL id has no need to look at its paralogs
+        noOrigOrtholog = False
+        if dmelId in dict_sp2id:
+            fbgn = dict_sp2id[dmelId]
+            symbol = dict_symb.get(fbgn)
+            lookups.append('Dmel idmap hit')
+            lookups.append('symbol miss' if symbol is None else 'symbol hit')
+
+            # check if dmel's id (whose ortholog is found) has any paralogs?
+            dmelParalogs = dmel_paralog_columns(dmelId, dict_sp2id, dict_symb, pc2)
+            lookups.append('Dmel paralog cluster miss' if dmelParalogs is None else 'Dmel paralog cluster hit')
+            tempCols, finalCols, ortholog, paralog = ortholog_head(geneName2, sp1Id, dmelId, fbgn, symbol, dmelParalogs)
+        else:  # id is not found in dictionary of ids--so no ortholog can be found
+            lookups.append('Dmel idmap miss')
+            tempCols, finalCols = partner_unmapped_head(geneName2, sp1Id)
+    else:  # if not present in BRH file
+        lookups.append('brh miss')
+        tempCols, finalCols = no_ortholog_head(geneName2, sp1Id)
+        noOrigOrtholog = True
+
+    # STEP 2: Check PARALOGS.. (if no ortholog found)
+    # check if there is any paralog present, if so: whether that paralog has any ortholog
+    if not noOrigOrtholog:  # ortholog is present, no need to look at paralog
+        tempCols += NO_NEED_OF_PARALOGS_TAIL[0]
+        finalCols += NO_NEED_OF_PARALOGS_TAIL[1]
+    elif sp1Id not in pc1:  # not found in 97 pc file
+        lookups.append('paralog cluster miss')
+        tempCols += NO_PARALOGS_TAIL[0]
+        finalCols += NO_PARALOGS_TAIL[1]
+    else:
+        paralogListIndex = pc1.find(sp1Id)
+        paralogList = pc1[paralogListIndex[0]]
+        lookups.append('paralog cluster hit')
+        tempTail, finalTail, paralog, paralogLookups = paralog_columns(paralogList, paralogListIndex[1], dict_brh, dict_sp2id,
+                                                                      dict_symb, pc2)
+        tempCols += tempTail
+        finalCols += finalTail
+        lookups += paralogLookups
+
+    return GeneResult(finalCols[0], tempCols, finalCols, ortholog, paralog, tuple(lookups))
+
+
+# this function works out the paralog columns of a gene without ortholog that is at position of the list of paralogs
+# paralogList (the ortholog of the first, longest, paralog of the list is used), the same for each gene of the list but the first
+# returns the temp and final columns, the paralog list entry (or None) and the lookups done
+def paralog_columns(paralogList, position, dict_brh, dict_sp2id, dict_symb, pc2):
+    tempCols = []
+    finalCols = []
+    paralog = None
+    lookups = []
+    # if this index [1] item is 0 : that means this does have paralogs, but none of paralogs have any ortholog
+    # paralog can only have ortholog if its not the first one in 97 pc file
+    if position == 0:
+        tempCols += [str(paralogList), 'NULL', '-', '-', '-']
+        finalCols += ['HasParalogButNoChanceOfOrthologOfParalogs', '-', '-', '-']
+    elif paralogList[0] in dict_brh:  # its paralog does have ortholog
+        dmelIdP = dict_brh[paralogList[0]]
+        lookups.append('brh hit')
+        if dmelIdP not in dict_sp2id:  # the ortholog of its paralog has no DMEL id
+            lookups.append('Dmel idmap miss')
+            tempCols += [str(paralogList)] + ['NULL'] * 4
+            finalCols += ['NULL'] * 4
+        else:
+            fbgnP = dict_sp2id[dmelIdP]
+            symbolP = dict_symb.get(fbgnP)
+            lookups.append('Dmel idmap hit')
+            lookups.append('symbol miss' if symbolP is None else 'symbol hit')
+            tempCols += [str(paralogList), paralogList[0] + '--' + dmelIdP + '__' + fbgnP + '/' +
+                         (symbolP if symbolP is not None else 'NoSymb')]
+            finalCols += [fbgnP, symbolP if symbolP is not None else 'NoSymbolFound']
+
+            # check if dmel's id (whose ortholog is found) has any paralogs?
+            dmelParalogsP = dmel_paralog_columns(dmelIdP, dict_sp2id, dict_symb, pc2)
+            lookups.append('Dmel paralog cluster miss' if dmelParalogsP is None else 'Dmel paralog cluster hit')
+            if dmelParalogsP is not None:
+                tempCols += [dmelParalogsP[0], dmelParalogsP[1], dmelParalogsP[2]]
+                finalCols += [dmelParalogsP[1], dmelParalogsP[2]]
+                paralog = dmelParalogsP[3] if finalCols[1] in dmelParalogsP[4] else finalCols[1] + dmelParalogsP[3]
+            else:
+                tempCols += ['NoParalogsParalogs', '-', '-']
+                finalCols += ['NoParalogsParalogs', '-']
+                paralog = symbolP if symbolP is not None else fbgnP
+    else:  # its paralog also doesnt have any ortholog
+        lookups.append('brh miss')
+        tempCols += [str(paralogList), '-', '-', '-', '-']
+        finalCols += ['HasParalogButNoOrthologOfParalogs', '-', '-', '-']
+    return (tempCols, finalCols, paralog, lookups)
+
+
+# tables of the worker processes of resolve_genes(), set by resolve_init()
+resolveTables = None
+
+
+# this function stores the loaded tables in the worker process (forked workers share them without copying)
+def resolve_init(tables):
+    global resolveTables
+    resolveTables = tables
+
+
+# this function resolves a chunk of gene names (runs inside a worker process)
+def resolve_chunk(geneNames):
+    return [resolve_gene(geneName, *resolveTables) for geneName in geneNames]
+
+
+# this function resolves every gene name of a gene set and returns their GeneResults in the same order
+# with more than one worker the gene names are resolved in chunks by a pool of processes, with engine 'vector' they are
+# resolved all at once with array joins (see VECTOR ENGINE)
+def resolve_genes(geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv=None, separator=':', workers=1,
+                  engine='loop'):
+    with gc_paused():
+        return resolve_gene_list(geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv, separator, workers, engine)
+
+
+# the results are lists and tuples of strings (no reference cycles), so the garbage collector only slows creating (or
+# reading back) hundreds of thousands of them down
+@contextlib.contextmanager
+def gc_paused():
+    gcEnabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if gcEnabled:
+            gc.enable()
+
+
+def resolve_gene_list(geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv, separator, workers, engine):
+    if engine == 'vector':
+        return resolve_genes_vector(geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv, separator)
+    tables = (dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv, separator)
+    # a few chunks per worker keeps all of them busy, small gene sets are not worth starting processes for
+    chunkSize = max(5000, -(-len(geneNames) // (workers * 4)))
+    if workers <= 1 or len(geneNames) <= chunkSize:
+        return [resolve_gene(geneName, *tables) for geneName in geneNames]
+    chunks = [geneNames[i:i + chunkSize] for i in range(0, len(geneNames), chunkSize)]
+    results = []
+    with multiprocessing.Pool(workers, initializer=resolve_init, initargs=(tables,)) as pool:
+        for chunkResults in pool.imap(resolve_chunk, chunks):
+            results.extend(chunkResults)
+    return results
+
+
+# ---------------------------- VECTOR ENGINE -------------------
+# with -engine vector the gene set is resolved as a whole instead of gene by gene: the idmap -> brh -> DMEL idmap -> symbol
+# chain and the lookups in the lists of paralogs are joins of whole columns (a lookup of every value of a column in a table
+# at once), whatever depends only on a list of paralogs (ortholog of its first paralog, FBgn ids/symbols of a DMEL list) is
+# worked out once per list, and genes are put together by kind of result from the same heads and tails as resolve_gene()
+# (see ortholog_head and the others), so it gives the same GeneResults
+
+
+# this function returns the value in table of each key of the column keys (None for a key that is None or not in table)
+def column_join(table, keys):
+    if isinstance(table, dict):
+        return list(map(table.get, keys))
+    return [table.get(key) if key is not None else None for key in keys]
+
+
+# this function returns [index of list, index in that list] in pc of each id of the column ids (None if it is in no list)
+def column_find(pc, ids):
+    if isinstance(pc, DmelParalogTable):
+        pc = pc.pc2
+    if isinstance(pc, ParalogIndex):
+        return list(map(pc.members.get, ids))
+    return [pc.find(key) if key is not None and key in pc else None for key in ids]
+
+
+# this function resolves every gene name of a gene set with column joins and returns their GeneResults in the same order
+def resolve_genes_vector(geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv=None, separator=':'):
+    if dict_conv is not None:
+        geneNames2 = [dict_conv[geneName.split(separator)[1]] if geneName.split(separator)[1] in dict_conv else geneName
+                      for geneName in geneNames]
+    else:
+        geneNames2 = geneNames
+
+    # the chain of joins
+    sp1Ids = column_join(dict_sp1id, geneNames)
+    dmelIds = column_join(dict_brh, sp1Ids)
+    fbgns = column_join(dict_sp2id, dmelIds)
+    symbols = column_join(dict_symb, fbgns)
+    dmelPlaces = column_find(pc2, [dmelId if fbgn is not None else None for dmelId, fbgn in zip(dmelIds, fbgns)])
+    sp1Places = column_find(pc1, [sp1Id if dmelId is None else None for sp1Id, dmelId in zip(sp1Ids, dmelIds)])
+
+    lookupsFound = {(True, True): ('idmap hit', 'brh hit', 'Dmel idmap hit', 'symbol hit', 'Dmel paralog cluster hit'),
+                    (True, False): ('idmap hit', 'brh hit', 'Dmel idmap hit', 'symbol hit', 'Dmel paralog cluster miss'),
+                    (False, True): ('idmap hit', 'brh hit', 'Dmel idmap hit', 'symbol miss', 'Dmel paralog cluster hit'),
+                    (False, False): ('idmap hit', 'brh hit', 'Dmel idmap hit', 'symbol miss', 'Dmel paralog cluster miss')}
+    noNeedTemp, noNeedFinal = NO_NEED_OF_PARALOGS_TAIL
+    dmelParalogCols = {}
+    paralogCols = {}
+    results = []
+    for geneName, geneName2, sp1Id, dmelId, fbgn, symbol, dmelPlace, sp1Place in zip(geneNames, geneNames2, sp1Ids, dmelIds, fbgns,
+                                                                                      symbols, dmelPlaces, sp1Places):
+        if sp1Id is None:  # gene id not found in idmap
+            results.append(unmapped_result(geneName, geneName2))
+        elif fbgn is not None:  # ortholog found, DMEL paralog columns are worked out once per DMEL list of paralogs
+            dmelParalogs = None
+            if dmelPlace is not None:
+                if dmelPlace[0] not in dmelParalogCols:
+                    dmelParalogCols[dmelPlace[0]] = dmel_paralog_columns(dmelId, dict_sp2id, dict_symb, pc2)
+                dmelParalogs = dmelParalogCols[dmelPlace[0]]
+            tempCols, finalCols, ortholog, paralog = ortholog_head(geneName2, sp1Id, dmelId, fbgn, symbol, dmelParalogs)
+            results.append(GeneResult(geneName2, tempCols + noNeedTemp, finalCols + noNeedFinal, ortholog, paralog,
+                                      lookupsFound[(symbol is not None, dmelParalogs is not None)]))
+        elif dmelId is not None:  # ortholog without DMEL id (no need to look at paralogs either)
+            tempCols, finalCols = partner_unmapped_head(geneName2, sp1Id)
+            results.append(GeneResult(geneName2, tempCols + noNeedTemp, finalCols + noNeedFinal, None, None,
+                                      ('idmap hit', 'brh hit', 'Dmel idmap miss')))
+        elif sp1Place is None:  # no ortholog and no paralogs
+            tempCols, finalCols = no_ortholog_head(geneName2, sp1Id)
+            results.append(GeneResult(geneName2, tempCols + NO_PARALOGS_TAIL[0], finalCols + NO_PARALOGS_TAIL[1], None, None,
+                                      ('idmap hit', 'brh miss', 'paralog cluster miss')))
+        else:  # no ortholog: the paralog columns are worked out once per list of paralogs (and position 0 or not in it)
+            key = (sp1Place[0], sp1Place[1] == 0)
+            if key not in paralogCols:
+                tempTail, finalTail, paralog, paralogLookups = paralog_columns(pc1[sp1Place[0]], sp1Place[1], dict_brh, dict_sp2id,
+                                                                              dict_symb, pc2)
+                paralogCols[key] = (tempTail, finalTail, paralog,
+                                    ('idmap hit', 'brh miss', 'paralog cluster hit') + tuple(paralogLookups))
+            tempTail, finalTail, paralog, lookups = paralogCols[key]
+            tempCols, finalCols = no_ortholog_head(geneName2, sp1Id)
+            results.append(GeneResult(geneName2, tempCols + tempTail, finalCols + finalTail, None, paralog, lookups))
+    return results
+
+
+# this function creates the ortholog and paralog dictionaries (gene name: symbols) from the GeneResults of a gene set
+def result_dicts(results):
+    # the lists have always started with a row for the column names of the final file
+    dict_orthologs = {FINAL_HEADER[0]: FINAL_HEADER[2]}
+    dict_paralogs = {FINAL_HEADER[0]: paralog_entry(FINAL_HEADER[2], [FINAL_HEADER[4]])}
+    for result in results:
+        if result.ortholog is not None:
+            dict_orthologs[result.geneName] = result.ortholog
+        if result.paralog is not None:
+            dict_paralogs[result.geneName] = result.paralog
+    return (dict_orthologs, dict_paralogs)
+
+
+# this function writes GeneResults of a gene set into <namesp1>_final.txt and (unless writeTemp is False) <namesp1>_temp.txt
+# with brhMetrics (BrhIndex.metric_table of the hits used) the metrics of the hit of each direct ortholog are added to the final file
+def write_results(namesp1, results, writeTemp=True, brhMetrics=None):
+    with open(namesp1 + '_final.txt', 'w') as f1a:
+        if brhMetrics is None:
+            f1a.write('\t'.join(FINAL_HEADER) + '\n')
+            f1a.writelines('\t'.join(result.finalCols) + '\n' for result in results)
+        else:
+            noMetrics = ['-'] * len(BRH_HEADER)
+            f1a.write('\t'.join(FINAL_HEADER + BRH_HEADER) + '\n')
+            # (the metrics always start at column 10, see header_width)
+            f1a.writelines('\t'.join(header_width(result.finalCols, FINAL_HEADER) +
+                                      (brhMetrics[result.tempCols[1]] if result.lookups[1:2] == ('brh hit',) else noMetrics)) + '\n'
+                           for result in results)
+    if writeTemp:
+        with open(namesp1 + '_temp.txt', 'w') as g1:
+            g1.write('\t'.join(TEMP_HEADER) + '\n')
+            g1.writelines('\t'.join(result.tempCols) + '\n' for result in results)
+
+
+# this function writes <namesp1>_multiHit.txt: every DMEL partner (the top ones only if top is given) of each gene of the
+# results that has hits in brhHits, from best to worst score, with its FBgn id, symbol and hit metrics
+def write_multi_hits(namesp1, results, brhHits, dict_sp2id, dict_symb, top=None):
+    with open(namesp1 + '_multiHit.txt', 'w') as fm:
+        fm.write('\t'.join(MULTIHIT_HEADER) + '\n')
+        for result in results:
+            if result.lookups[0] != 'idmap hit':
+                continue
+            sp1Id = result.tempCols[1]
+            for rank, (dmelId, row) in enumerate(brhHits.partners(sp1Id, top), 1):
+                fbgn = dict_sp2id.get(dmelId)
+                symbol = dict_symb.get(fbgn) if fbgn is not None else None
+                fm.write('\t'.join([result.geneName, sp1Id, str(rank), dmelId, fbgn if fbgn is not None else 'NULL',
+                                    symbol if symbol is not None else 'NoSymbolFound'] + brhHits.index.metric_columns(row)) + '\n')
+
+
+# this function returns the number of hits per gene of -topHits (or a manifest column) as an integer, None ('' or None) for all hits
+def top_hits(value):
+    if value is None or value == '':
+        return None
+    try:
+        top = int(value)
+    except ValueError:
+        top = 0
+    if top < 1:
+        sys.exit('number of top hits must be a positive integer, not ' + str(value))
+    return top
+
+
+# this function returns the gene names of a gene set file (1 gene per line) or of the genes of a GFF file (see GFF INPUT)
+def read_gene_set(geneSet):
+    if gff_input(geneSet):
+        return [geneId for geneId, geneDbxrefs in gff_genes(geneSet)]
+    with open_input(geneSet) as gS:
+        return [line.rstrip('\n') for line in gS]
+
+
+# this function maps every gene of geneSet (species X) to DMEL using the loaded tables and writes <namesp1>_temp.txt,
+# <namesp1>_final.txt, <namesp1>_orthologList.csv, <namesp1>_paralogList.csv (and SO_<scrmshaw file> if a SCRMshaw output is given)
+# returns the ortholog and paralog dictionaries used for the lists
+# with a result store (and the table_signatures() of the inputs) only new genes or genes with changed inputs are resolved
+# outputFormats are the formats the results are written in (see OUTPUT FORMATS), the text files above are the 'tsv' format
+# with the BrhHits of the brh file <namesp1>_multiHit.txt is written too (every hit of each gene, or its topHits best ones)
+# and with the OrthologyGroups of the tables <namesp1>_groups.txt and <namesp1>_geneGroups.txt (see CO-ORTHOLOGY GROUPS)
+def map_species(namesp1, geneSet, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, conversion='false', dict_conv=None,
+                separator=':', scrmshawOutput='NoSCRM', writeTemp=True, workers=1, engine='loop', brhMetrics=None, store='NoStore',
+                storeSignatures=None, outputFormats=('tsv',), brhHits=None, topHits=None, groups=None):
+    if not (conversion == "TRUE" or conversion == "T" or conversion == "true"):
+        dict_conv = None
+
+    # opening geneSet file that has 1 gene per line (all of genes extracted from its gff) and
+    # finding out if there are any orthologs or/and paralogs present wrt DMEL
+    with report_stage('read gene set'):
+        geneNames = read_gene_set(geneSet)
+    with report_stage('gene loop'):
+        if store != 'NoStore':
+            results = resolve_genes_incremental(store, storeSignatures, geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2,
+                                                dict_conv, separator, workers, engine)
+        else:
+            results = resolve_genes(geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv, separator, workers, engine)
+    if 'tsv' in outputFormats:
+        with report_stage('write final/temp files'):
+            write_results(namesp1, results, writeTemp, brhMetrics)
+    if brhHits is not None:
+        with report_stage('write multi-hit file'):
+            write_multi_hits(namesp1, results, brhHits, dict_sp2id, dict_symb, topHits)
+    if groups is not None:
+        with report_stage('write co-orthology groups'):
+            write_groups(namesp1, results, groups, dict_sp2id, dict_symb)
+    with report_stage('ortholog/paralog lists'):
+        # ortholog and paralog lists used to edit SCRMshaw prediction file to add respective ortho/para data in it
+        dict_orthologs, dict_paralogs = result_dicts(results)
+
+        # creating csv files for ortholog and paralog list
+        if 'tsv' in outputFormats:
+            file_from_dict(namesp1 + '_orthologList', dict_orthologs)
+            file_from_dict(namesp1 + '_paralogList', dict_paralogs)
+    for outputFormat in outputFormats:
+        if outputFormat != 'tsv':
+            with report_stage('write ' + outputFormat):
+                OUTPUT_WRITERS[outputFormat](namesp1, results, dict_orthologs, dict_paralogs, brhMetrics)
+    if runReport is not None:
+        # (with a result store only the genes resolved in this run are counted, by resolve_genes_incremental())
+        if store == 'NoStore':
+            runReport.add_lookups(results)
+        runReport.counts['genes'] = len(results)
+
+    if (scrmshawOutput != 'NoSCRM'):
+        scrmshawOutputPath = os.path.abspath(scrmshawOutput)
+        # (the annotated output is plain text, so a compressed input does not give it a .gz/.xz/... name)
+        orthologOutput = 'SO_' + uncompressed_name(os.path.basename(scrmshawOutput))
+        with report_stage('SCRMshaw annotation'):
+            scrmshawLines = annotate_scrmshaw(scrmshawOutputPath, orthologOutput, dict_orthologs, dict_paralogs, workers)
+        if runReport is not None:
+            runReport.counts['SCRMshaw lines'] = scrmshawLines
+
+    return (dict_orthologs, dict_paralogs)
+
+
+# ---------------------------- CO-ORTHOLOGY GROUPS -------------------
+# with -groups true the genes are also put into co-orthology groups: connected components of the graph of species X ids and
+# DMEL ids whose edges are the lists of paralogs of species X (97pc), the brh hits used and the lists of paralogs of DMEL,
+# found with a union-find structure in near linear time, so a group holds all ids a gene is linked to over any number of
+# hops (resolve_gene() only looks one hop out). Groups reached by the gene set are written to <namesp1>_groups.txt and the
+# group of each gene to <namesp1>_geneGroups.txt (groups are numbered in the order of the gene set)
+GROUP_HEADER = ['Group', 'Species_members', 'Dmel_members', 'Dmel_FBgn', 'GeneSymbol_members']
+GENE_GROUP_HEADER = ['GeneName', 'GeneName_OGid', 'Group']
+
+
+# this class is a union-find (disjoint set) structure over nodes 0, 1, ... with union by size and path halving
+class UnionFind:
+    def __init__(self):
+        self.parent = array.array('i')
+        self.size = array.array('i')
+
+    def __len__(self):
+        return len(self.parent)
+
+    # adds a node in a set of its own and returns its number
+    def add(self):
+        node = len(self.parent)
+        self.parent.append(node)
+        self.size.append(1)
+        return node
+
+    # returns the root node of the set of node
+    def find(self, node):
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    # joins the sets of nodes a and b
+    def union(self, a, b):
+        a = self.find(a)
+        b = self.find(b)
+        if a == b:
+            return
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+
+
+# this class builds the co-orthology groups of the loaded tables: speciesNodes and dmelNodes number the species X and DMEL ids
+# (kept apart as the two can use the same ids) and roots[node] is the root node of its group once every edge is added
+class OrthologyGroups:
+    def __init__(self, dict_brh, pc1, pc2=None):
+        self.sets = UnionFind()
+        self.speciesNodes = {}
+        self.dmelNodes = {}
+        self.add_clusters(self.speciesNodes, pc1)
+        for sp1Id, dmelId in dict_brh.items():
+            self.sets.union(self.node(self.speciesNodes, sp1Id), self.node(self.dmelNodes, dmelId))
+        if pc2 is not None:
+            self.add_clusters(self.dmelNodes, pc2)
+        # every node looked up once more so the group of an id is one lookup afterwards
+        self.roots = array.array('i', map(self.sets.find, range(len(self.sets))))
+
+    # returns the node of name in nodes, adding it if it has none yet
+    def node(self, nodes, name):
+        node = nodes.get(name)
+        if node is None:
+            node = nodes[name] = self.sets.add()
+        return node
+
+    # joins the ids of each list of paralogs
+    def add_clusters(self, nodes, pc):
+        for cluster in pc:
+            first = self.node(nodes, cluster[0])
+            for member in cluster[1:]:
+                self.sets.union(first, self.node(nodes, member))
+
+    # returns the group (root node) of a species X id or None if it has no edge
+    def species_group(self, sp1Id):
+        node = self.speciesNodes.get(sp1Id)
+        return None if node is None else self.roots[node]
+
+    # returns [([species X ids], [DMEL ids]), ...] of groups numbered 1, 2, ... in groupNumbers (number of each root node,
+    # 0 for a group that is left out)
+    def members(self, groupNumbers, nGroups):
+        members = [([], []) for number in range(nGroups + 1)]
+        roots = self.roots
+        for side, nodes in enumerate([self.speciesNodes, self.dmelNodes]):
+            for name, node in nodes.items():
+                number = groupNumbers[roots[node]]
+                if number:
+                    members[number][side].append(name)
+        return members[1:]
+
+
+# this function writes <namesp1>_groups.txt (members of each group reached by a gene of the results, with FBgn ids and
+# symbols of its DMEL ids) and <namesp1>_geneGroups.txt (group of each gene, '-' if its id has no edge or it is not mapped)
+def write_groups(namesp1, results, groups, dict_sp2id, dict_symb):
+    # numbers of the groups (by root node) in an array rather than a dictionary, as it is looked up for every gene
+    groupNumbers = array.array('i', [0]) * len(groups.roots)
+    nGroups = 0
+    geneGroups = []
+    speciesNode = groups.speciesNodes.get
+    roots = groups.roots
+    with gc_paused():
+        for result in results:
+            sp1Id = result.tempCols[1] if result.lookups[0] == 'idmap hit' else '-'
+            node = speciesNode(sp1Id)
+            if node is None:
+                geneGroups.append(result.geneName + '\t' + sp1Id + '\t-\n')
+                continue
+            number = groupNumbers[roots[node]]
+            if number == 0:
+                nGroups += 1
+                number = groupNumbers[roots[node]] = nGroups
+            geneGroups.append(result.geneName + '\t' + sp1Id + '\t' + str(number) + '\n')
+        with open(namesp1 + '_geneGroups.txt', 'w') as fg:
+            fg.write('\t'.join(GENE_GROUP_HEADER) + '\n')
+            fg.writelines(geneGroups)
+        members = groups.members(groupNumbers, nGroups)
+        with open(namesp1 + '_groups.txt', 'w') as fg:
+            fg.write('\t'.join(GROUP_HEADER) + '\n')
+            for number, (speciesIds, dmelIds) in enumerate(members, 1):
+                fbgns = [dict_sp2id.get(dmelId) for dmelId in dmelIds]
+                symbols = [dict_symb.get(fbgn) if fbgn is not None else None for fbgn in fbgns]
+                fg.write('\t'.join([str(number), ','.join(speciesIds), ','.join(dmelIds) or '-',
+                                    ','.join(fbgn if fbgn is not None else 'NULL' for fbgn in fbgns) or '-',
+                                    ','.join(symbol if symbol is not None else 'NoSymbolFound' for symbol in symbols) or '-']) + '\n')
+
+
+# ---------------------------- OUTPUT FORMATS -------------------
+# besides the text files (format 'tsv') the results can be written (with -format, e.g. -format tsv,sqlite) as
+#   sqlite:  <namesp1>.sqlite with tables genes (columns of _final.txt), orthologList and paralogList, indexed on gene name,
+#            FBgn id and symbol, the lists of DMEL paralogs are JSON arrays (e.g. SELECT ... FROM genes, json_each(Dmel_paralogs))
+#   parquet: <namesp1>_final.parquet and arrow: <namesp1>_final.arrow (Arrow IPC file), columns of _final.txt with the lists
+#            of DMEL paralogs as list<string> columns (the pyarrow package is needed for these two)
+# without brh metrics the BRH_* columns are left out, as in _final.txt
+LIST_COLUMNS = ['Dmel_paralogs', 'GeneSymbolDmel_paralogs', 'Dmel_Pparalogs', 'GeneSymbolDmel_Pparalogs']
+# the metric columns are written as numbers (score, evalue, identity as floats and aligned length as integer)
+BRH_TYPES = [float, float, float, int]
+
+
+# this function returns the columns of the final file of each result (and brh metrics if given) as python values: the
+# cells holding lists of DMEL paralogs as lists (or None where the cell has no list, e.g. 'NoParalogs'), metrics as numbers
+def result_records(results, brhMetrics=None):
+    listColumns = [FINAL_HEADER.index(column) for column in LIST_COLUMNS]
+    # the same lists come back for every gene of a list of paralogs, so each cell is only parsed once
+    parsed = {}
+    noMetrics = [None] * len(BRH_HEADER)
+    for result in results:
+        # (one value per column of FINAL_HEADER whatever the width of the row, see header_width)
+        record = list(header_width(result.finalCols, FINAL_HEADER))
+        for column in listColumns:
+            cell = record[column]
+            if cell.startswith('['):
+                if cell not in parsed:
+                    parsed[cell] = ast.literal_eval(cell)
+                record[column] = parsed[cell]
+            else:
+                record[column] = None
+        if brhMetrics is not None:
+            if result.lookups[1:2] == ('brh hit',):
+                record += [toType(value) for toType, value in zip(BRH_TYPES, brhMetrics[result.tempCols[1]])]
+            else:
+                record += noMetrics
+        yield record
+
+
+# this function writes the results, ortholog and paralog lists into the SQLite database <namesp1>.sqlite (replacing it)
+def write_sqlite(namesp1, results, dict_orthologs, dict_paralogs, brhMetrics=None):
+    header = FINAL_HEADER + (BRH_HEADER if brhMetrics is not None else [])
+    columnTypes = ['TEXT'] * len(FINAL_HEADER) + ['REAL', 'REAL', 'REAL', 'INTEGER'][:len(header) - len(FINAL_HEADER)]
+    listColumns = {header.index(column) for column in LIST_COLUMNS}
+    fileDB = namesp1 + '.sqlite'
+    # written to a temporary file first so readers never see a half written database
+    tmpFile = fileDB + '.' + str(os.getpid()) + '.tmp'
+    if os.path.exists(tmpFile):
+        os.remove(tmpFile)
+    db = sqlite3.connect(tmpFile)
+    try:
+        db.execute('CREATE TABLE genes (' + ', '.join(column + ' ' + columnType for column, columnType in zip(header, columnTypes)) + ')')
+        rows = ([json.dumps(value) if column in listColumns and value is not None else value for column, value in enumerate(record)]
+                for record in result_records(results, brhMetrics))
+        db.executemany('INSERT INTO genes VALUES (' + ', '.join(['?'] * len(header)) + ')', rows)
+        db.execute('CREATE TABLE orthologList (GeneName TEXT, GeneSymbolOrthologs TEXT)')
+        db.executemany('INSERT INTO orthologList VALUES (?, ?)', list(dict_orthologs.items())[1:])
+        db.execute('CREATE TABLE paralogList (GeneName TEXT, GeneSymbolParalogs TEXT)')
+        db.executemany('INSERT INTO paralogList VALUES (?, ?)', list(dict_paralogs.items())[1:])
+        for table, column in [('genes', 'GeneName'), ('genes', 'Orthologs'), ('genes', 'GeneSymbolOrthologs'),
+                              ('genes', 'ParalogsThatHaveOrthologs'), ('genes', 'GeneSymbolParalogs'),
+                              ('orthologList', 'GeneName'), ('paralogList', 'GeneName')]:
+            db.execute('CREATE INDEX ' + table + '_' + column + ' ON ' + table + ' (' + column + ')')
+        db.commit()
+    finally:
+        db.close()
+    os.replace(tmpFile, fileDB)
+
+
+# this function returns the pyarrow module, exits if it is not installed
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        sys.exit('parquet/arrow output: install the pyarrow python package to write it')
+    return pyarrow
+
+
+# this function returns the results as a pyarrow Table (columns of the final file, lists of DMEL paralogs as list<string>)
+def arrow_table(results, brhMetrics=None):
+    pyarrow = import_pyarrow()
+    header = FINAL_HEADER + (BRH_HEADER if brhMetrics is not None else [])
+    types = [pyarrow.list_(pyarrow.string()) if column in LIST_COLUMNS else pyarrow.string() for column in FINAL_HEADER]
+    types += [pyarrow.float64(), pyarrow.float64(), pyarrow.float64(), pyarrow.int64()][:len(header) - len(FINAL_HEADER)]
+    columns = [list(column) for column in zip(*result_records(results, brhMetrics))] or [[] for column in header]
+    return pyarrow.Table.from_arrays([pyarrow.array(column, type=columnType) for column, columnType in zip(columns, types)],
+                                     names=header)
+
+
+# this function writes the results into <namesp1>_final.parquet
+def write_parquet(namesp1, results, dict_orthologs, dict_paralogs, brhMetrics=None):
+    table = arrow_table(results, brhMetrics)
+    import pyarrow.parquet
+    pyarrow.parquet.write_table(table, namesp1 + '_final.parquet')
+
+
+# this function writes the results into the Arrow IPC file <namesp1>_final.arrow
+def write_arrow(namesp1, results, dict_orthologs, dict_paralogs, brhMetrics=None):
+    table = arrow_table(results, brhMetrics)
+    import pyarrow.ipc
+    with pyarrow.ipc.new_file(namesp1 + '_final.arrow', table.schema) as writer:
+        writer.write_table(table)
+
+
+# writers of the formats other than 'tsv' (text files written by map_species() itself)
+OUTPUT_WRITERS = {'sqlite': write_sqlite, 'parquet': write_parquet, 'arrow': write_arrow}
+
+
+# this function returns the list of output formats of a -format value (e.g. 'tsv,sqlite'), exits for an unknown format
+# (or parquet/arrow without pyarrow installed, before anything is mapped)
+def output_formats(formats):
+    outputFormats = [outputFormat.strip().lower() for outputFormat in formats.split(',') if outputFormat.strip() != '']
+    for outputFormat in outputFormats:
+        if outputFormat != 'tsv' and outputFormat not in OUTPUT_WRITERS:
+            sys.exit('unknown output format ' + outputFormat + ' (use tsv, ' + ', '.join(OUTPUT_WRITERS) + ')')
+        if outputFormat in ('parquet', 'arrow'):
+            import_pyarrow()
+    return outputFormats
+
+
+# ---------------------------- INCREMENTAL RE-MAPPING -------------------
+# with -store <file> the GeneResults of a run are kept in a result store (marshal file) keyed by gene name, together with
+# the signature of each input table and a checksum of each of its entries. The next run with the same store only resolves
+# the genes that are new in the gene set or whose idmap/brh/97pc/symbol/conversion entries changed, the other results
+# are taken from the store, so a run where only the gene set or the SCRMshaw output changed only resolves the new genes.
+# Reading the store back must stay cheaper than resolving the genes again, so the results are kept as columns (the temp and
+# final columns of all genes one after the other in one list each, where marshal keeps the '-', 'NULL', ... shared as they
+# are in resolved results, lookups as indexes in a list of the distinct ones and the entries each gene was resolved from
+# as lines of one string, only split if an input changed), the checksums of a table are only unmarshalled if its signature
+# changed and a store whose genes and inputs did not change is not written again
+STORE_VERSION = 4
+STORE_TABLES = ['sp1id', 'brh', 'pc1', 'sp2id', 'symbol', 'pc2', 'conv']
+
+
+# this function returns the signature of each input table of the result store (changed input files, or loader parameters,
+# give a different signature, see cache_signature)
+def table_signatures(sp1idmap, brhsp1sp2, flipped, sp1pc97, sp2idmap, symbolGene, sp2pc97, setConvGene=None, brhThresholds=None,
+                     gffDbxref=None):
+    convFiles = []
+    convParams = []
+    if setConvGene is not None:
+        convFiles.append(setConvGene)
+        # the conversions of a GFF file depend on the Dbxref database they are taken from
+        if gff_input(setConvGene):
+            convParams.append(gffDbxref if gffDbxref is not None else GFF_DBXREF)
+    return {'sp1id': cache_signature('idMap_dict', [sp1idmap], []),
+            'brh': cache_signature('brh_dict', [brhsp1sp2], [flipped, sorted((brhThresholds or {}).items())]),
+            'pc1': cache_signature('paralogs', [sp1pc97], []),
+            'sp2id': cache_signature('idMap2_dict', [sp2idmap], []),
+            # only the symbols of the FBgn ids of DMEL idmap file are loaded
+            'symbol': cache_signature('geneSymbol_dict', [symbolGene, sp2idmap], []),
+            'pc2': cache_signature('paralogs', [sp2pc97], []),
+            'conv': cache_signature('conv_dict', convFiles, convParams)}
+
+
+# this function returns a checksum of each entry of a loaded table (dictionary or paralog index, where the entry of an id is
+# its list of paralogs and its place in it). The entries of a dictionary are single ids or symbols, no longer than their
+# checksum would be, so they are their own checksum, and the list of paralogs is checksummed once for all of its ids
+def entry_checksums(table):
+    if table is None:
+        return {}
+    if isinstance(table, (ParalogIndex, CompactParalogIndex, DmelParalogTable)):
+        checksums = {}
+        for cluster in table:
+            clusterChecksum = zlib.crc32('\t'.join(cluster).encode()) << 32
+            for position, member in enumerate(cluster):
+                # an id listed twice keeps its first location (see ParalogIndex)
+                if member not in checksums:
+                    checksums[member] = clusterChecksum | position
+        return checksums
+    return table if isinstance(table, dict) else dict(table.items())
+
+
+# this function returns the keys that were added, removed or changed between two checksum dictionaries
+def changed_keys(oldChecksums, newChecksums):
+    changed = {key for key, checksum in newChecksums.items() if oldChecksums.get(key) != checksum}
+    changed.update(key for key in oldChecksums if key not in newChecksums)
+    return changed
+
+
+# this function returns the entries each gene of geneNames was resolved from, as a tab separated line: its key in the
+# conversion table, its species X id, the first id of its list of paralogs (if it has no brh), the DMEL id of its ortholog or
+# of the ortholog of its paralogs ('' when none). The ids are looked up with column joins (see VECTOR ENGINE)
+# the conversion key is kept even for a run without conversion, so a later run with conversion resolves the gene again
+def gene_dependencies(geneNames, dict_sp1id, dict_brh, pc1, separator=':'):
+    sp1Ids = column_join(dict_sp1id, geneNames)
+    dmelIds = column_join(dict_brh, sp1Ids)
+    places = column_find(pc1, [sp1Id if dmelId is None else None for sp1Id, dmelId in zip(sp1Ids, dmelIds)])
+    dependencies = []
+    for geneName, sp1Id, dmelId, place in zip(geneNames, sp1Ids, dmelIds, places):
+        parts = geneName.split(separator)
+        convKey = parts[1] if len(parts) > 1 else ''
+        leader = ''
+        if dmelId is None:
+            dmelId = ''
+            if place is not None:
+                leader = pc1[place[0]][0]
+                if place[1] > 0:
+                    dmelId = dict_brh.get(leader, '')
+        dependencies.append(convKey + '\t' + (sp1Id if sp1Id is not None else '') + '\t' + leader + '\t' + dmelId)
+    return dependencies
+
+
+# this function returns the DMEL ids whose ortholog columns changed: ids with a changed idmap or 97pc entry, ids whose FBgn
+# id has a changed symbol and every id of a list of paralogs that holds one of those (its paralog columns list them all)
+def changed_dmel_ids(changed, dict_sp2id, pc2):
+    dmelIds = changed['sp2id'] | changed['pc2']
+    if changed['symbol']:
+        dmelIds.update(dmelId for dmelId, fbgn in dict_sp2id.items() if fbgn in changed['symbol'])
+    if dmelIds:
+        for cluster in pc2:
+            if any(member in dmelIds for member in cluster):
+                dmelIds.update(cluster)
+    return dmelIds
+
+
+# this function reads a result store, returns None if there is none (or it is unreadable or of another version)
+# (the checksums of each table are left marshalled, see resolve_genes_incremental)
+def read_store(storeFile):
+    if not os.path.isfile(storeFile):
+        return None
+    try:
+        # (marshal.load() reads a file object in small pieces, reading it at once is many times faster)
+        with open(storeFile, 'rb') as fs:
+            store = marshal.loads(fs.read())
+    except (EOFError, ValueError, TypeError):
+        return None
+    if not isinstance(store, dict) or store.get('version') != STORE_VERSION:
+        return None
+    return store
+
+
+# this function writes a result store (to a temporary file first, so a killed run never leaves a broken store behind)
+def write_store(storeFile, store):
+    storeDir = os.path.dirname(os.path.abspath(storeFile))
+    os.makedirs(storeDir, exist_ok=True)
+    tmpFile = storeFile + '.' + str(os.getpid()) + '.tmp'
+    with open(tmpFile, 'wb') as fs:
+        marshal.dump(store, fs)
+    os.replace(tmpFile, storeFile)
+
+
+# this function returns the genes of a result store as columns: gene names, their temp and final columns (len(TEMP_HEADER)
+# and len(FINAL_HEADER) per gene, as every GeneResult has, in one list each), ortholog and paralog list entries, the index of their lookups in the
+# list of distinct lookups and the entries they were resolved from (see gene_dependencies) as lines of one string
+# genes are (name, temp columns, final columns, ortholog entry, paralog entry, lookups, dependencies line) tuples
+def store_columns(genes):
+    names, temps, finals, orthologs, paralogs, lookups, deps = zip(*genes) if genes else ([],) * 7
+    lookupIndexes = {}
+    for geneLookups in lookups:
+        if geneLookups not in lookupIndexes:
+            lookupIndexes[geneLookups] = len(lookupIndexes)
+    return {'names': list(names),
+            'temp': [column for tempCols in temps for column in tempCols],
+            'final': [column for finalCols in finals for column in finalCols],
+            'ortholog': list(orthologs), 'paralog': list(paralogs), 'lookups': [lookupIndexes[geneLookups] for geneLookups in lookups],
+            'lookupsList': list(lookupIndexes), 'deps': '\n'.join(deps)}
+
+
+# this function resolves the genes of a gene set as resolve_genes() does, resolving only the genes that are not in the
+# result store storeFile or whose input entries changed since it was written, and writes the store of this run back
+# signatures are the table_signatures() of the inputs the tables were loaded from
+def resolve_genes_incremental(storeFile, signatures, geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv=None,
+                              separator=':', workers=1, engine='loop'):
+    # (the store is read and written, and the results put together, in one pause of the garbage collector, see gc_paused)
+    with gc_paused():
+        return resolve_store_genes(storeFile, signatures, geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv,
+                                   separator, workers, engine)
+
+
+def resolve_store_genes(storeFile, signatures, geneNames, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv, separator,
+                        workers, engine):
+    tables = {'sp1id': dict_sp1id, 'brh': dict_brh, 'pc1': pc1, 'sp2id': dict_sp2id, 'symbol': dict_symb, 'pc2': pc2, 'conv': dict_conv}
+    store = read_store(storeFile)
+    if store is not None and store['separator'] != separator:
+        store = None
+    checksums = {}
+    changed = {}
+    for name in STORE_TABLES:
+        # the checksums are only worked out again (and the stored ones read) for tables whose input files (or parameters) changed
+        if store is not None and store['signatures'].get(name) == signatures[name]:
+            checksums[name] = store['checksums'][name]
+            changed[name] = set()
+        else:
+            newChecksums = entry_checksums(tables[name])
+            # (without a store every gene is resolved, whatever changed)
+            changed[name] = set()
+            if store is not None and name in store['checksums']:
+                changed[name] = changed_keys(marshal.loads(store['checksums'][name]), newChecksums)
+            checksums[name] = marshal.dumps(newChecksums)
+
+    stored = store['genes'] if store is not None else store_columns([])
+    storedNames = stored['names']
+    # the entries the stored genes were resolved from are only read if an entry changed
+    storedDeps = None
+    dmelIds = set()
+    if storedNames and any(changed.values()):
+        storedDeps = stored['deps'].split('\n')
+        dmelIds = changed_dmel_ids(changed, dict_sp2id, pc2)
+    positions = None
+    if storedDeps is None and geneNames == storedNames:
+        # the gene set of the store and no changed entry: every result is taken from the store, in the order of the store
+        uniqueNames = storedNames
+        todo = []
+        genePositions = range(len(storedNames))
+    else:
+        positions = dict(zip(storedNames, range(len(storedNames))))
+        uniqueNames = list(dict.fromkeys(geneNames))
+        if storedDeps is None:
+            todo = [geneName for geneName in uniqueNames if geneName not in positions]
+        else:
+            todo = []
+            for geneName in uniqueNames:
+                position = positions.get(geneName)
+                if position is not None:
+                    convKey, sp1Id, leader, dmelId = storedDeps[position].split('\t')
+                    if not (geneName in changed['sp1id'] or convKey in changed['conv'] or sp1Id in changed['brh'] or sp1Id in changed['pc1']
+                            or leader in changed['brh'] or dmelId in dmelIds):
+                        continue
+                todo.append(geneName)
+            # genes resolved again are no longer taken from the store
+            for geneName in todo:
+                positions.pop(geneName, None)
+        genePositions = map(positions.get, geneNames)
+
+    resolved = resolve_genes(todo, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2, dict_conv, separator, workers, engine)
+    resolvedGenes = dict(zip(todo, resolved))
+    tempWidth = len(TEMP_HEADER)
+    finalWidth = len(FINAL_HEADER)
+    storedTemp = stored['temp']
+    storedFinal = stored['final']
+    orthologs = stored['ortholog']
+    paralogs = stored['paralog']
+    storedLookups = [stored['lookupsList'][index] for index in stored['lookups']]
+    results = [resolvedGenes[geneName] if position is None else
+               GeneResult(storedFinal[position * finalWidth], storedTemp[position * tempWidth:(position + 1) * tempWidth],
+                          storedFinal[position * finalWidth:(position + 1) * finalWidth], orthologs[position], paralogs[position],
+                          storedLookups[position])
+               for geneName, position in zip(geneNames, genePositions)]
+    if runReport is not None:
+        runReport.add_lookups(resolved)
+        runReport.lookups['result store hit'] += len(uniqueNames) - len(todo)
+        runReport.counts['genes resolved'] = len(todo)
+        runReport.counts['genes from result store'] = len(uniqueNames) - len(todo)
+
+    # nothing to write back if no gene was resolved, the gene set is the same and every table has the stored signature
+    if store is not None and not todo and uniqueNames == storedNames and store['signatures'] == signatures:
+        return results
+    # genes no longer in the gene set are left out of the new store
+    if positions is None:
+        positions = dict(zip(storedNames, range(len(storedNames))))
+    if storedDeps is None and storedNames:
+        storedDeps = stored['deps'].split('\n')
+    resolvedDeps = dict(zip(todo, gene_dependencies(todo, dict_sp1id, dict_brh, pc1, separator)))
+    genes = []
+    for geneName in uniqueNames:
+        result = resolvedGenes.get(geneName)
+        if result is None:
+            position = positions[geneName]
+            genes.append((geneName, storedTemp[position * tempWidth:(position + 1) * tempWidth],
+                          storedFinal[position * finalWidth:(position + 1) * finalWidth], orthologs[position], paralogs[position],
+                          storedLookups[position], storedDeps[position]))
+        else:
+            genes.append((geneName, result.tempCols, result.finalCols, result.ortholog, result.paralog, tuple(result.lookups),
+                          resolvedDeps[geneName]))
+    write_store(storeFile, {'version': STORE_VERSION, 'separator': separator, 'signatures': signatures, 'checksums': checksums,
+                            'genes': store_columns(genes)})
+    return results
+
+
+# ---------------------------- SCRMSHAW ANNOTATION -------------------
+# SCRMshaw prediction files have (at least) 18 tab separated columns, columns 5 and 10 hold one gene or a comma separated
+# list of genes and columns 6 and 11 are replaced by the DMEL ortholog (_o_), paralog (_p_) or both (_op_) of those genes
+# e.g. ./orthologyMapping.py annotate -orth agamb_orthologList.csv -para agamb_paralogList.csv -so scrmshawOutput.bed.gz > SO_scrmshawOutput.bed
+SCRMSHAW_COLUMNS = 18
+# most column annotations remembered by annotate_mapped()
+SCRMSHAW_COLUMN_CACHE = 1 << 18
+
+
+# this class annotates SCRMshaw prediction lines using the ortholog and paralog dictionaries, remembering the annotation
+# of each gene so that genes seen again (most of them, in outputs of many training sets) are not looked up again
+class ScrmshawAnnotator:
+    def __init__(self, dict_orthologs, dict_paralogs):
+        self.dict_orthologs = dict_orthologs
+        self.dict_paralogs = dict_paralogs
+        self.geneAnnotations = {}
+        # annotations of genes and of single gene columns (as bytes) for annotate_mapped()
+        self.geneAnnotationsBytes = {}
+        self.columnAnnotations = {}
+
+    # annotation of a gene as part of a list of genes: 'symbol_o_,', 'symbol_p_,', 'symbol_op_,' or '-' if nothing found
+    def gene_annotation(self, gene):
+        annotation = self.geneAnnotations.get(gene)
+        if annotation is None:
+            ortholog = self.dict_orthologs.get(gene)
+            paralog = self.dict_paralogs.get(gene)
+            if ortholog is not None and paralog is None:
+                annotation = ortholog + '_o_,'
+            elif paralog is not None and ortholog is None:
+                annotation = str(paralog) + '_p_,'
+            elif ortholog is None and paralog is None:
+                annotation = '-'
+            # check they both are similar or not
+            elif ortholog != paralog.strip(','):
+                annotation = ortholog + '_o_,' + str(paralog) + '_p_,'
+            else:
+                annotation = ortholog + '_op_,'
+            self.geneAnnotations[gene] = annotation
+        return annotation
+
+    # annotation of a column: a single gene has no comma at the end, a list of genes has one after each gene
+    def column_annotation(self, genes):
+        if genes.find(',') == -1:
+            annotation = self.gene_annotation(genes)
+            return annotation if annotation == '-' else annotation[:-1]
+        return ''.join([self.gene_annotation(gene) for gene in genes.split(',')])
+
+    # returns the line with columns 6 and 11 replaced by the annotations of the genes in columns 5 and 10
+    def annotate_line(self, line):
+        cols = line.split('\t')
+        if len(cols) < SCRMSHAW_COLUMNS:
+            raise ValueError('SCRMshaw line has ' + str(len(cols)) + ' columns instead of ' + str(SCRMSHAW_COLUMNS) + ': ' + line)
+        cols[6] = self.column_annotation(cols[5])
+        cols[11] = cols[6] if cols[10] == cols[5] else self.column_annotation(cols[10])
+        return '\t'.join(cols[:SCRMSHAW_COLUMNS])
+
+    # annotates every line of (text) file object so and writes them to fo, bufferLines lines per write
+    # returns the number of lines annotated
+    def annotate(self, so, fo, bufferLines=10000):
+        buffer = []
+        nLines = 0
+        for line in so:
+            buffer.append(self.annotate_line(line))
+            if len(buffer) == bufferLines:
+                fo.write(''.join(buffer))
+                nLines += len(buffer)
+                buffer = []
+        if buffer:
+            fo.write(''.join(buffer))
+            nLines += len(buffer)
+        return nLines
+
+    # annotation of a column given as bytes (as bytes), each gene is only decoded and looked up once and lists of genes are
+    # put together from the annotations of their genes (the annotations of up to SCRMSHAW_COLUMN_CACHE columns are remembered,
+    # as the same lists of genes come back in the predictions of each training set)
+    def column_annotation_bytes(self, genes):
+        annotation = self.columnAnnotations.get(genes)
+        if annotation is not None:
+            return annotation
+        if genes.find(b',') == -1:
+            annotation = self.column_annotation(genes.decode()).encode()
+        else:
+            geneAnnotations = self.geneAnnotationsBytes
+            annotations = []
+            for gene in genes.split(b','):
+                annotation = geneAnnotations.get(gene)
+                if annotation is None:
+                    annotation = self.gene_annotation(gene.decode()).encode()
+                    geneAnnotations[gene] = annotation
+                annotations.append(annotation)
+            annotation = b''.join(annotations)
+        if len(self.columnAnnotations) < SCRMSHAW_COLUMN_CACHE:
+            self.columnAnnotations[genes] = annotation
+        return annotation
+
+    # annotates lines given as bytes (e.g. mapped_lines() of a memory mapped SCRMshaw output) and writes them to binary file
+    # object fo, the same as annotate() does for text lines: each line is only cut up to column 12, columns 5 and 10 are
+    # looked up as bytes and the other columns are written back as they were read, returns the number of lines annotated
+    def annotate_mapped(self, lines, fo, bufferLines=10000):
+        buffer = []
+        nLines = 0
+        annotations = self.columnAnnotations
+        for line in lines:
+            cols = line.split(b'\t', 12)
+            # cols[12] is columns 12 to the end of the line
+            nCols = len(cols) if len(cols) < 13 else 13 + cols[12].count(b'\t')
+            if nCols < SCRMSHAW_COLUMNS:
+                raise ValueError('SCRMshaw line has ' + str(nCols) + ' columns instead of ' + str(SCRMSHAW_COLUMNS) + ': ' + line.decode())
+            if nCols > SCRMSHAW_COLUMNS:
+                # the columns after the last one are left out (as annotate_line() does)
+                cols[12] = b'\t'.join(cols[12].split(b'\t', SCRMSHAW_COLUMNS - 12)[:SCRMSHAW_COLUMNS - 12])
+            annotation = annotations.get(cols[5])
+            if annotation is None:
+                annotation = self.column_annotation_bytes(cols[5])
+            cols[6] = annotation
+            if cols[10] != cols[5]:
+                annotation = annotations.get(cols[10])
+                if annotation is None:
+                    annotation = self.column_annotation_bytes(cols[10])
+            cols[11] = annotation
+            buffer.append(b'\t'.join(cols))
+            if len(buffer) == bufferLines:
+                fo.write(b''.join(buffer))
+                nLines += len(buffer)
+                buffer = []
+        if buffer:
+            fo.write(b''.join(buffer))
+            nLines += len(buffer)
+        return nLines
+
+
+# SCRMshaw annotator of the worker processes of annotate_scrmshaw_parallel(), set by scrmshaw_init()
+scrmshawAnnotator = None
+
+
+# this function stores the ortholog and paralog dictionaries in the worker process (forked workers share them without copying)
+def scrmshaw_init(dict_orthologs, dict_paralogs):
+    global scrmshawAnnotator
+    scrmshawAnnotator = ScrmshawAnnotator(dict_orthologs, dict_paralogs)
+
+
+# this function annotates the lines in bytes [start, end) of a SCRMshaw output (runs inside a worker process)
+def scrmshaw_chunk(chunk):
+    fileSO, start, end = chunk
+    out = io.BytesIO()
+    with mapped_input(fileSO) as mm:
+        nLines = scrmshawAnnotator.annotate_mapped(mapped_lines(mm, start, end), out)
+    return (out.getvalue(), nLines)
+
+
+# this function splits a file into about nChunks byte ranges [start, end) that each end at the end of a line
+def line_chunks(fileSO, nChunks):
+    size = os.path.getsize(fileSO)
+    chunkSize = max(1, size // nChunks)
+    chunks = []
+    start = 0
+    with open(fileSO, 'rb') as fi:
+        while start < size:
+            fi.seek(min(start + chunkSize, size))
+            fi.readline()
+            end = min(fi.tell(), size)
+            chunks.append((fileSO, start, end))
+            start = end
+    return chunks
+
+
+# this function annotates a SCRMshaw output in byte range chunks with a pool of worker processes and writes the annotated
+# chunks to (binary) fo in their original order, returns the number of lines annotated
+def annotate_scrmshaw_parallel(scrmshawOutputPath, fo, dict_orthologs, dict_paralogs, workers):
+    # a few chunks per worker keeps all of them busy, but not more than 64MB in a chunk
+    nChunks = max(workers * 4, os.path.getsize(scrmshawOutputPath) // (64 * 1024 * 1024) + 1)
+    nLines = 0
+    with multiprocessing.Pool(workers, initializer=scrmshaw_init, initargs=(dict_orthologs, dict_paralogs)) as pool:
+        for annotated, nChunkLines in pool.imap(scrmshaw_chunk, line_chunks(scrmshawOutputPath, nChunks)):
+            fo.write(annotated)
+            nLines += nChunkLines
+    return nLines
+
+
+# this function writes the annotated SCRMshaw output scrmshawOutputPath into orthologOutput ('-' is standard output)
+# a plain (uncompressed) file is memory mapped and annotated as bytes, with more than one worker in chunks by that many processes
+# returns the number of lines annotated
+def annotate_scrmshaw(scrmshawOutputPath, orthologOutput, dict_orthologs, dict_paralogs, workers=1):
+    mm = mapped_input(scrmshawOutputPath)
+    if mm is None:
+        fo = sys.stdout if orthologOutput == '-' else open(orthologOutput, 'w')
+    else:
+        sys.stdout.flush()
+        fo = sys.stdout.buffer if orthologOutput == '-' else open(orthologOutput, 'wb')
+    try:
+        if mm is None:
+            with open_input(scrmshawOutputPath) as so:
+                return ScrmshawAnnotator(dict_orthologs, dict_paralogs).annotate(so, fo)
+        with mm:
+            if workers > 1:
+                return annotate_scrmshaw_parallel(scrmshawOutputPath, fo, dict_orthologs, dict_paralogs, workers)
+            return ScrmshawAnnotator(dict_orthologs, dict_paralogs).annotate_mapped(iter(mm.readline, b''), fo)
+    finally:
+        if fo is sys.stdout or fo is sys.stdout.buffer:
+            fo.flush()
+        else:
+            fo.close()
+
+
+# this function reads back a list written by file_from_dict (e.g. <namesp1>_orthologList.csv) as a dictionary
+def dict_from_file(fileCSV):
+    with open(fileCSV, 'r', newline='') as fi:
+        return {row[0]: row[1] for row in csv.reader(fi) if len(row) >= 2}
+
+
+def annotate_main(argv):
+    parser = argparse.ArgumentParser(prog='orthologyMapping.py annotate')
+    parser.add_argument('-orth', '--orthologList', help='<namesp1>_orthologList.csv of a previous run')
+    parser.add_argument('-para', '--paralogList', help='<namesp1>_paralogList.csv of a previous run')
+    parser.add_argument('-final', '--finalFile', help='or <namesp1>_final.txt of a previous run instead of the two lists')
+    parser.add_argument('-so', '--scrmshawOutput', help='scrmshaw output file (can be compressed), - for standard input', default='-')
+    parser.add_argument('-o', '--output', help='annotated scrmshaw output file, - for standard output', default='-')
+    parser.add_argument('-workers', '--workers', help='number of processes annotating (uncompressed) scrmshaw output', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.finalFile is not None:
+        dict_orthologs, dict_paralogs = orthologs_dict('orthologs', 'paralogs', args.finalFile)
+    elif args.orthologList is not None and args.paralogList is not None:
+        dict_orthologs = dict_from_file(args.orthologList)
+        dict_paralogs = dict_from_file(args.paralogList)
+    else:
+        parser.error('provide either -final or both -orth and -para')
+    annotate_scrmshaw(args.scrmshawOutput, args.output, dict_orthologs, dict_paralogs, args.workers)
+
+
+# ---------------------------- LIBRARY API -------------------
+# the script can also be imported to keep the tables loaded in a long running process (pipeline, notebook) and answer
+# many queries against them without parsing the inputs again, e.g.
+#   import orthologyMapping
+#   index = orthologyMapping.OrthologyIndex('AGAMB.idmap.txt', 'AGAMB_DMELA.brh', 'AGAMB.97pc.txt', 'DMELA.idmap.txt', 'DMELA.97pc.txt', 'fb_synonym_fb_2020_02.tsv')
+#   index.resolve('AGAP000002').finalCols
+#   index.annotate_scrmshaw(open('scrmshawOutput.bed'), sys.stdout)
+#   index.resolve_many(['AGAP000002'], brhThresholds={'minScore': 200, 'maxEvalue': 1e-20})
+class OrthologyIndex:
+    def __init__(self, sp1idmap, brhsp1sp2, sp1pc97, sp2idmap, sp2pc97, symbolGene, flipped='true', setConvGene=None,
+                 separator=':', cacheDir='NoCache', compact=False, brhThresholds=None, gffDbxref=None):
+        self.sp1idmap = sp1idmap
+        self.brhsp1sp2 = brhsp1sp2
+        self.sp1pc97 = sp1pc97
+        self.sp2idmap = sp2idmap
+        self.sp2pc97 = sp2pc97
+        self.symbolGene = symbolGene
+        self.flipped = flipped.lower()
+        self.setConvGene = setConvGene
+        self.separator = separator
+        self.cacheDir = cacheDir
+        self.compact = compact
+        self.brhThresholds = brhThresholds
+        self.gffDbxref = gffDbxref
+        self.load()
+
+    # (re)reads the tables from the input files (or the cache). The tables in use (and their stamps) are only replaced once
+    # all of the new ones are read, so a load that fails (e.g. an input file removed or half written) leaves the index as
+    # it was and the next reload_if_changed() tries again
+    def load(self):
+        # stamps are taken before reading, so a file changed while it is read is read again by the next reload_if_changed()
+        stamps = self.input_stamps()
+        ids = IdTable() if self.compact else None
+        brhIndex = None
+        if self.brhThresholds is not None:
+            brhIndex = cached_load(self.cacheDir, brh_index, 'brh', self.brhsp1sp2, self.flipped)
+        tables = load_inputs(self.sp1idmap, self.brhsp1sp2, self.flipped, self.sp2idmap, self.symbolGene, self.sp1pc97, self.sp2pc97,
+                             self.cacheDir, ids, brhIndex, self.brhThresholds)
+        dict_conv = None
+        if self.setConvGene is not None:
+            dict_conv = conv_dict('conv', self.setConvGene, self.gffDbxref)
+        self.dict_sp1id, self.dict_brh, self.dict_sp2id, self.dict_symb, self.pc1, self.pc2 = tables
+        self.dict_conv = dict_conv
+        self.ids = ids
+        self.brhIndex = brhIndex
+        self.brhTables = {}
+        self.stamps = stamps
+
+    # returns the input files of the index
+    def input_files(self):
+        files = [self.sp1idmap, self.brhsp1sp2, self.sp1pc97, self.sp2idmap, self.sp2pc97, self.symbolGene, self.setConvGene]
+        return [fileI for fileI in files if fileI is not None]
+
+    # returns modification time and size of each input file
+    def input_stamps(self):
+        stamps = {}
+        for fileI in self.input_files():
+            st = os.stat(fileI)
+            stamps[fileI] = [st.st_mtime_ns, st.st_size]
+        return stamps
+
+    # reads the tables again if any input file changed since they were loaded, returns True if they were
+    def reload_if_changed(self):
+        if self.input_stamps() == self.stamps:
+            return False
+        self.load()
+        return True
+
+    # tables in the order resolve_gene() takes them
+    def tables(self):
+        return (self.dict_sp1id, self.dict_brh, self.pc1, self.dict_sp2id, self.dict_symb, self.pc2, self.dict_conv, self.separator)
+
+    # returns the brh dictionary of the hits passing brhThresholds (see BrhIndex.select), the hits of the brh file are read
+    # into a BrhIndex the first time and each set of thresholds is selected from it once
+    def brh_table(self, brhThresholds):
+        key = tuple(sorted(brhThresholds.items()))
+        if key not in self.brhTables:
+            if self.brhIndex is None:
+                self.brhIndex = cached_load(self.cacheDir, brh_index, 'brh', self.brhsp1sp2, self.flipped)
+            self.brhTables[key] = compact_table(self.ids, self.brhIndex.table(self.brhIndex.select(**brhThresholds)))
+        return self.brhTables[key]
+
+    # returns the brh metrics (see BrhIndex.metric_table) of the hits passing brhThresholds
+    def brh_metrics(self, brhThresholds=None):
+        if self.brhIndex is None:
+            self.brhIndex = cached_load(self.cacheDir, brh_index, 'brh', self.brhsp1sp2, self.flipped)
+        return self.brhIndex.metric_table(self.brhIndex.select(**(brhThresholds or self.brhThresholds or {})))
+
+    # returns the GeneResult of one gene of species X
+    def resolve(self, geneName):
+        return resolve_gene(geneName, *self.tables())
+
+    # returns the GeneResults of many genes in the same order (with more than one worker in a pool of processes, or with
+    # engine 'vector' all at once with array joins), with brhThresholds only the brh hits passing them are used for this query
+    def resolve_many(self, geneNames, workers=1, engine='loop', brhThresholds=None):
+        tables = self.tables()
+        if brhThresholds is not None:
+            tables = tables[:1] + (self.brh_table(brhThresholds),) + tables[2:]
+        return resolve_genes(list(geneNames), *tables, workers=workers, engine=engine)
+
+    # returns the ortholog and paralog dictionaries (as in <namesp1>_orthologList.csv and <namesp1>_paralogList.csv) of the genes
+    def lists(self, geneNames, workers=1):
+        return result_dicts(self.resolve_many(geneNames, workers))
+
+    # annotates the SCRMshaw lines of (text) file object so and writes them to fo, returns the number of lines annotated
+    # without geneNames every gene found in the SCRMshaw output is resolved (once), else only the genes of geneNames are annotated
+    # as with -geneSet in a full run
+    def annotate_scrmshaw(self, so, fo, geneNames=None):
+        if geneNames is not None:
+            return ScrmshawAnnotator(*self.lists(geneNames)).annotate(so, fo)
+        return IndexScrmshawAnnotator(self).annotate(so, fo)
+
+
+# this class annotates SCRMshaw prediction lines resolving each gene with an OrthologyIndex the first time it is seen
+class IndexScrmshawAnnotator(ScrmshawAnnotator):
+    def __init__(self, index):
+        ScrmshawAnnotator.__init__(self, {}, {})
+        self.index = index
+
+    def gene_annotation(self, gene):
+        if gene not in self.geneAnnotations:
+            result = self.index.resolve(gene)
+            if result.ortholog is not None:
+                self.dict_orthologs[gene] = result.ortholog
+            if result.paralog is not None:
+                self.dict_paralogs[gene] = result.paralog
+        return ScrmshawAnnotator.gene_annotation(self, gene)
+
+
+# ---------------------------- BATCH MODE -------------------
+# maps many species against DMEL in one process: the DMEL idmap, 97pc and symbol tables are loaded only once and
+# the species are mapped in a pool of worker processes (forked workers share the DMEL tables without copying them)
+# manifest is a tab separated file (with header) or a .json list of objects with these keys, one species per row:
+# name, sp1idmap, sp1pc97, brh, geneSet and optionally scrmshawOutput, conversion, setConvGene, separator, flipped, writeTemp, runReport, engine,
+# minScore, maxEvalue, minIdentity, minAlnLen, brhMetrics, store, format, gffDbxref, multiHit, topHits, groups (as the options of the same name)
+# e.g. ./orthologyMapping.py batch -manifest i5k.tsv -sp2id DMELA.idmap.txt -sp2pc DMELA.97pc.txt -symb fb_synonym_fb_2020_02.tsv -workers 4
+MANIFEST_DEFAULTS = {'scrmshawOutput': 'NoSCRM', 'conversion': 'false', 'setConvGene': '', 'separator': ':', 'flipped': 'true',
+                     'writeTemp': 'true', 'runReport': 'true', 'engine': 'loop', 'minScore': '', 'maxEvalue': '', 'minIdentity': '',
+                     'minAlnLen': '', 'brhMetrics': 'false', 'store': 'NoStore', 'format': 'tsv', 'gffDbxref': GFF_DBXREF,
+                     'multiHit': 'false', 'topHits': '', 'groups': 'false'}
+MANIFEST_PATHS = ['sp1idmap', 'sp1pc97', 'brh', 'geneSet', 'scrmshawOutput', 'setConvGene', 'store']
+
+# DMEL side tables of the batch, set in each worker process by batch_init()
+batchReference = None
+
+
+# this function reads the manifest of species for batch mode and returns a list of dictionaries (one per species)
+# relative paths in the manifest are taken relative to the manifest itself
+def read_manifest(fileM, required=('name', 'sp1idmap', 'sp1pc97', 'brh', 'geneSet')):
+    with open(fileM, 'r') as fm:
+        if fileM.endswith('.json'):
+            rows = json.load(fm)
+        else:
+            rows = list(csv.DictReader((line for line in fm if not (line.startswith('#') or line.strip() == '')), delimiter='\t'))
+    manifestDir = os.path.dirname(os.path.abspath(fileM))
+    entries = []
+    for row in rows:
+        entry = dict(MANIFEST_DEFAULTS)
+        entry.update({key: str(val).strip() for key, val in row.items() if val is not None and str(val).strip() != ''})
+        for key in required:
+            if key not in entry:
+                sys.exit('manifest ' + fileM + ' is missing ' + key + ' for ' + str(row))
+        for key in MANIFEST_PATHS:
+            if entry.get(key, '') not in ('', 'NoSCRM', 'NoStore'):
+                entry[key] = os.path.join(manifestDir, entry[key])
+        entries.append(entry)
+    return (entries)
+
+
+# this function stores the DMEL side tables in the worker process
+# (referenceFiles are the DMEL idmap, symbol and 97pc files the tables were loaded from)
+def batch_init(reference, cacheDir, referenceFiles):
+    global batchReference
+    batchReference = (reference, cacheDir, referenceFiles)
+
+
+# this function maps one species of the manifest (runs inside a worker process) and returns its name with number of orthologs and paralogs
+def batch_species(entry):
+    global runReport
+    (dict_sp2id, dict_symb, pc2), cacheDir, (sp2idmap, symbolGene, sp2pc97) = batchReference
+    runReport = RunReport() if entry['runReport'].lower() != 'false' else None
+    ids = dict_sp2id.ids if isinstance(dict_sp2id, IdRelation) else None
+    brhThresholds = brh_thresholds(entry['minScore'], entry['maxEvalue'], entry['minIdentity'], entry['minAlnLen'])
+    brhIndex = None
+    brhMetrics = None
+    brhHits = None
+    multiHit = entry['multiHit'].lower() == 'true'
+    with report_stage('load input tables'):
+        if brhThresholds or entry['brhMetrics'].lower() == 'true' or multiHit:
+            brhIndex = cached_load(cacheDir, brh_index, 'brh', entry['brh'], entry['flipped'].lower())
+            if entry['brhMetrics'].lower() == 'true':
+                brhMetrics = brhIndex.metric_table(brhIndex.select(**brhThresholds))
+            if multiHit:
+                brhHits = brhIndex.hits(brhIndex.rows(**brhThresholds))
+        dict_sp1id, dict_brh, pc1 = load_species(entry['sp1idmap'], entry['brh'], entry['flipped'].lower(), entry['sp1pc97'], cacheDir, ids,
+                                                 brhIndex, brhThresholds)
+    # compared after lower() as the other flags of the manifest (a JSON manifest gives true as 'True')
+    conversion = 'true' if entry['conversion'].lower() in ('true', 't') else 'false'
+    dict_conv = None
+    convGeneSet = None
+    if conversion == 'true':
+        convGeneSet = entry['setConvGene']
+        with report_stage('load conversion table'):
+            dict_conv = conv_dict('conv', convGeneSet, entry['gffDbxref'])
+    storeSignatures = None
+    if entry['store'] != 'NoStore':
+        storeSignatures = table_signatures(entry['sp1idmap'], entry['brh'], entry['flipped'].lower(), entry['sp1pc97'], sp2idmap, symbolGene,
+                                           sp2pc97, convGeneSet, brhThresholds, entry['gffDbxref'])
+    groups = None
+    if entry['groups'].lower() == 'true':
+        with report_stage('build co-orthology groups'):
+            groups = OrthologyGroups(dict_brh, pc1, pc2)
+    dict_orthologs, dict_paralogs = map_species(entry['name'], entry['geneSet'], dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb,
+                                                pc2, conversion, dict_conv, entry['separator'], entry['scrmshawOutput'],
+                                                entry['writeTemp'].lower() != 'false', 1, entry['engine'], brhMetrics, entry['store'],
+                                                storeSignatures, output_formats(entry['format']), brhHits, top_hits(entry['topHits']), groups)
+    if runReport is not None:
+        runReport.counts['orthologs'] = len(dict_orthologs)
+        runReport.counts['paralogs'] = len(dict_paralogs)
+        runReport.write(entry['name'] + '_runReport.json', {'species': entry['name'], 'manifest': entry})
+        runReport = None
+    return (entry['name'], len(dict_orthologs), len(dict_paralogs))
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog='orthologyMapping.py batch')
+    parser.add_argument('-manifest', '--manifest', help='tab separated (or .json) list of species to map, one per row', required=True)
+    parser.add_argument('-sp2id', '--sp2idmap', help='species 2 (DMEL) id map text file', required=True)
+    parser.add_argument('-sp2pc', '--sp2pc97', help='species 2 (DMEL) paralogs 97 pc file', required=True)
+    parser.add_argument('-symb', '--symbolGene', help='Gene Symbol', required=True)
+    parser.add_argument('-workers', '--workers', help='number of species mapped at the same time', type=int, default=os.cpu_count())
+    parser.add_argument('-cache', '--cacheDir', help='directory to keep compiled idmap/brh/97pc/symbol tables for faster repeat runs, else leave this parameter', default='NoCache')
+    parser.add_argument('-compact', '--compact', help='set it to true to keep the loaded tables as interned integer arrays (less memory, slower lookups)', default='false')
+    args = parser.parse_args(argv)
+    cacheDir = args.cacheDir
+    if (cacheDir != 'NoCache'):
+        cacheDir = os.path.abspath(cacheDir)
+
+    entries = read_manifest(args.manifest)
+    for entry in entries:
+        output_formats(entry['format'])
+        top_hits(entry['topHits'])
+    # the species tables of each worker are interned into (its copy of) the id table of the DMEL tables
+    ids = IdTable() if (args.compact).lower() == 'true' else None
+    referenceFiles = (os.path.abspath(args.sp2idmap), os.path.abspath(args.symbolGene), os.path.abspath(args.sp2pc97))
+    reference = load_reference(referenceFiles[0], referenceFiles[1], referenceFiles[2], cacheDir, ids)
+
+    workers = max(1, min(args.workers or 1, len(entries)))
+    pool = None
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initializer=batch_init, initargs=(reference, cacheDir, referenceFiles))
+        results = pool.imap(batch_species, entries)
+    else:
+        batch_init(reference, cacheDir, referenceFiles)
+        results = map(batch_species, entries)
+    for name, nOrthologs, nParalogs in results:
+        print(name + " number of orthologs found:" + str(nOrthologs))
+        print(name + " number of paralogs found:" + str(nParalogs))
+    if pool is not None:
+        pool.close()
+        pool.join()
+
+
+# ---------------------------- LOOKUP SERVICE -------------------
+# keeps the tables of one species and DMEL loaded and answers lookups over localhost HTTP (or a Unix socket with -socket),
+# JSON in and JSON out:
+#   POST /resolve  {"genes": ["AGAP000002", ...]}      -> {"results": [{"GeneName": ..., "Orthologs": ..., <columns of _final.txt>}, ...]}
+#                  optionally with "brh": {"minScore": ..., "maxEvalue": ..., "minIdentity": ..., "minAlignment": ...} to only use
+#                  the brh hits passing these thresholds for this request
+#   POST /annotate {"lines": ["<SCRMshaw line>", ...]} -> {"lines": ["<annotated SCRMshaw line>", ...]}
+#   GET  /status                                     -> input files with their modification time and size
+# the tables are read again when an input file changes (checked before each request, unless -reload false), if they cannot
+# be read (e.g. a file removed or half written) the request gets a 503 error and the next request tries again
+# e.g. ./orthologyMapping.py serve -sp1id AGAMB.idmap.txt -sp1pc AGAMB.97pc.txt -brh AGAMB_DMELA.brh -sp2id DMELA.idmap.txt -sp2pc DMELA.97pc.txt -symb fb_synonym_fb_2020_02.tsv -port 8765
+#      curl -s -d '{"genes": ["AGAP000002"]}' http://127.0.0.1:8765/resolve
+class LookupHandler(http.server.BaseHTTPRequestHandler):
+    # set by serve_main()
+    index = None
+    lock = None
+    reload = True
+
+    def send_json(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    # requests of a Unix socket have no client address
+    def address_string(self):
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def do_GET(self):
+        if self.path != '/status':
+            return self.send_json(404, {'error': 'unknown path ' + self.path})
+        with self.lock:
+            self.send_json(200, {'inputs': self.index.stamps, 'cacheDir': self.index.cacheDir})
+
+    def do_POST(self):
+        try:
+            query = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError as e:
+            return self.send_json(400, {'error': 'request is not JSON: ' + str(e)})
+        if not isinstance(query, dict):
+            return self.send_json(400, {'error': 'request is not a JSON object'})
+        # gene names and SCRMshaw lines are looked up and split as strings
+        for key in ['genes', 'lines']:
+            if isinstance(query.get(key), list) and not all(isinstance(value, str) for value in query[key]):
+                return self.send_json(400, {'error': key + ' must be a list of strings'})
+        with self.lock:
+            try:
+                reloaded = self.reload and self.index.reload_if_changed()
+            except Exception as e:
+                # (whatever reading the files raised, the client gets an answer and the tables in use are kept)
+                return self.send_json(503, {'error': 'input tables could not be read: ' + e.__class__.__name__ + ': ' + str(e)})
+            if self.path == '/resolve' and isinstance(query.get('genes'), list):
+                brhThresholds = query.get('brh')
+                if brhThresholds is not None:
+                    try:
+                        brhThresholds = brh_thresholds(**brhThresholds)
+                    except (TypeError, ValueError) as e:
+                        return self.send_json(400, {'error': 'bad brh thresholds: ' + str(e)})
+                try:
+                    resolved = self.index.resolve_many(query['genes'], brhThresholds=brhThresholds)
+                except (OSError, ValueError) as e:
+                    # (the hits of the brh file are read the first time a request gives thresholds)
+                    return self.send_json(503, {'error': 'brh file could not be read: ' + str(e)})
+                results = [dict(zip(FINAL_HEADER, result.finalCols)) for result in resolved]
+                return self.send_json(200, {'results': results, 'reloaded': reloaded})
+            if self.path == '/annotate' and isinstance(query.get('lines'), list):
+                annotator = IndexScrmshawAnnotator(self.index)
+                try:
+                    lines = [annotator.annotate_line(line) for line in query['lines']]
+                except ValueError as e:
+                    return self.send_json(400, {'error': str(e)})
+                return self.send_json(200, {'lines': lines, 'reloaded': reloaded})
+        self.send_json(400, {'error': 'POST /resolve {"genes": [...]} or /annotate {"lines": [...]}'})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(prog='orthologyMapping.py serve')
+    parser.add_argument('-sp1id', '--sp1idmap', help='species 1 id map text file', required=True)
+    parser.add_argument('-sp1pc', '--sp1pc97', help='species 1 paralogs 97 pc file', required=True)
+    parser.add_argument('-brh', '--brhsp1sp2', help='best reciprocal file sp1 to sp2', required=True)
+    parser.add_argument('-sp2id', '--sp2idmap', help='species 2 id map text file', required=True)
+    parser.add_argument('-sp2pc', '--sp2pc97', help='species 2 paralogs 97 pc file', required=True)
+    parser.add_argument('-symb', '--symbolGene', help='Gene Symbol', required=True)
+    parser.add_argument('-setConv', '--setConvGene', help='conversion file (or GFF file), if gene names need conversion')
+    parser.add_argument('-gffDbxref', '--gffDbxref', help='database of the Dbxref entries used for the conversions of a GFF -setConv file', default=GFF_DBXREF)
+    parser.add_argument('-flip', '--flipped', help='if in brh DMEL:specie1 set it to False', default='True')
+    parser.add_argument('-sep', '--separator', help='if separator is not colon, provide its value', default=':')
+    parser.add_argument('-cache', '--cacheDir', help='directory to keep compiled idmap/brh/97pc/symbol tables for faster restarts, else leave this parameter', default='NoCache')
+    parser.add_argument('-host', '--host', help='address to listen on', default='127.0.0.1')
+    parser.add_argument('-port', '--port', help='port to listen on', type=int, default=8765)
+    parser.add_argument('-socket', '--socket', help='listen on this Unix socket instead of host:port', default='NoSocket')
+    parser.add_argument('-reload', '--reload', help='set it to false to keep the tables even if the input files change', default='true')
+    parser.add_argument('-compact', '--compact', help='set it to true to keep the loaded tables as interned integer arrays (less memory, slower lookups)', default='false')
+    args = parser.parse_args(argv)
+    cacheDir = args.cacheDir
+    if (cacheDir != 'NoCache'):
+        cacheDir = os.path.abspath(cacheDir)
+    setConvGene = os.path.abspath(args.setConvGene) if args.setConvGene is not None else None
+
+    LookupHandler.index = OrthologyIndex(os.path.abspath(args.sp1idmap), os.path.abspath(args.brhsp1sp2), os.path.abspath(args.sp1pc97),
+                                         os.path.abspath(args.sp2idmap), os.path.abspath(args.sp2pc97), os.path.abspath(args.symbolGene),
+                                         args.flipped, setConvGene, args.separator, cacheDir, (args.compact).lower() == 'true',
+                                         gffDbxref=args.gffDbxref)
+    LookupHandler.lock = threading.Lock()
+    LookupHandler.reload = (args.reload).lower() != 'false'
+    if args.socket != 'NoSocket':
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = UnixHTTPServer(args.socket, LookupHandler)
+        print('serving on ' + args.socket)
+    else:
+        server = http.server.ThreadingHTTPServer((args.host, args.port), LookupHandler)
+        print('serving on http://' + args.host + ':' + str(server.server_address[1]))
+    sys.stdout.flush()
+    # kill (SIGTERM) stops the server the same way as ctrl-c, removing the socket file
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket != 'NoSocket' and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+# ---------------------------- REVERSE MAPPING -------------------
+# answers the reverse question: for FlyBase genes (FBgn ids, symbols or DMEL protein ids) which genes of each species are
+# their orthologs (brh to a DMEL protein of the FBgn id) or in-paralogs (in the 97pc list of paralogs of an ortholog), from
+# inverted indexes of the DMEL idmap, symbol, brh and species idmap tables built once for every species given
+# e.g. ./orthologyMapping.py reverse -manifest i5k.tsv -sp2id DMELA.idmap.txt -symb fb_synonym_fb_2020_02.tsv -q Nmdmc,FBgn0000008 -o reverse.txt
+#      ./orthologyMapping.py reverse -np1 agamb -sp1id AGAMB.idmap.txt -sp1pc AGAMB.97pc.txt -brh AGAMB_DMELA.brh -sp2id DMELA.idmap.txt -symb fb_synonym_fb_2020_02.tsv -queryFile flyGenes.txt
+REVERSE_HEADER = ['Query', 'FBgn', 'Symbol', 'Species', 'Orthologs', 'InParalogs']
+
+
+# this function returns the inverted index of a table ([value] = list of keys with that value, in the order of the table)
+def inverted_table(table):
+    inverted = {}
+    for key, value in table.items():
+        keys = inverted.get(value)
+        if keys is None:
+            inverted[value] = [key]
+        else:
+            keys.append(key)
+    return inverted
+
+
+# this class keeps the inverted DMEL tables and the inverted tables of each species added to it
+class ReverseIndex:
+    def __init__(self, dict_sp2id, dict_symb):
+        self.dict_sp2id = dict_sp2id
+        self.dict_symb = dict_symb
+        self.fbgnProteins = inverted_table(dict_sp2id)
+        self.symbolFbgns = inverted_table(dict_symb)
+        # [species name] = ([DMEL id] = species ids with a brh to it, [species id] = its genes, paralog index of the species)
+        self.species = {}
+
+    # adds a species (only its brh and idmap tables inverted and its paralog index are kept)
+    def add_species(self, name, dict_sp1id, dict_brh, pc1):
+        self.species[name] = (inverted_table(dict_brh), inverted_table(dict_sp1id), pc1)
+
+    # returns the FBgn ids a query stands for (an FBgn id, a DMEL protein id or a symbol)
+    def fbgn_ids(self, query):
+        if query in self.fbgnProteins or query in self.dict_symb:
+            return [query]
+        if query in self.dict_sp2id:
+            return [self.dict_sp2id[query]]
+        return self.symbolFbgns.get(query, [])
+
+    # returns the genes of a species that are orthologs of an FBgn id and the genes that are in-paralogs of those
+    def species_genes(self, name, fbgn):
+        brhInverse, sp1Inverse, pc1 = self.species[name]
+        orthologIds = []
+        for dmelId in self.fbgnProteins.get(fbgn, []):
+            orthologIds.extend(brhInverse.get(dmelId, []))
+        orthologs = []
+        for sp1Id in orthologIds:
+            orthologs.extend(sp1Inverse.get(sp1Id, []))
+        paralogs = []
+        seen = set(orthologIds)
+        for sp1Id in orthologIds:
+            if sp1Id in pc1:
+                for paralogId in pc1.cluster(sp1Id):
+                    if paralogId not in seen:
+                        seen.add(paralogId)
+                        paralogs.extend(sp1Inverse.get(paralogId, []))
+        return (orthologs, paralogs)
+
+    # returns the rows (see REVERSE_HEADER) of a query, one per FBgn id it stands for and species
+    def lookup(self, query):
+        fbgns = self.fbgn_ids(query)
+        if not fbgns:
+            return [[query, 'NotFound', '-', '-', '-', '-']]
+        rows = []
+        for fbgn in fbgns:
+            for name in self.species:
+                orthologs, paralogs = self.species_genes(name, fbgn)
+                rows.append([query, fbgn, self.dict_symb.get(fbgn, 'NoSymbolFound'), name, ','.join(orthologs) or '-',
+                             ','.join(paralogs) or '-'])
+        return rows
+
+
+def reverse_main(argv):
+    parser = argparse.ArgumentParser(prog='orthologyMapping.py reverse')
+    parser.add_argument('-manifest', '--manifest', help='tab separated (or .json) list of species (name, sp1idmap, sp1pc97, brh and optionally flipped), or the options of one species below')
+    parser.add_argument('-np1', '--namesp1', help='name of species 1')
+    parser.add_argument('-sp1id', '--sp1idmap', help='species 1 id map text file')
+    parser.add_argument('-sp1pc', '--sp1pc97', help='species 1 paralogs 97 pc file')
+    parser.add_argument('-brh', '--brhsp1sp2', help='best reciprocal file sp1 to sp2')
+    parser.add_argument('-flip', '--flipped', help='if in brh DMEL:specie1 set it to False', default='True')
+    parser.add_argument('-sp2id', '--sp2idmap', help='species 2 (DMEL) id map text file', required=True)
+    parser.add_argument('-symb', '--symbolGene', help='Gene Symbol', required=True)
+    parser.add_argument('-q', '--query', help='comma separated FBgn ids, symbols or DMEL ids to look up')
+    parser.add_argument('-queryFile', '--queryFile', help='file with one FBgn id, symbol or DMEL id per line, - for standard input')
+    parser.add_argument('-o', '--output', help='output file (see REVERSE_HEADER), - for standard output', default='-')
+    parser.add_argument('-cache', '--cacheDir', help='directory to keep compiled idmap/brh/97pc/symbol tables for faster repeat runs, else leave this parameter', default='NoCache')
+    parser.add_argument('-compact', '--compact', help='set it to true to keep the loaded tables as interned integer arrays (less memory, slower lookups)', default='false')
+    args = parser.parse_args(argv)
+    cacheDir = args.cacheDir
+    if (cacheDir != 'NoCache'):
+        cacheDir = os.path.abspath(cacheDir)
+
+    if args.manifest is not None:
+        entries = read_manifest(args.manifest, ('name', 'sp1idmap', 'sp1pc97', 'brh'))
+    elif None not in (args.namesp1, args.sp1idmap, args.sp1pc97, args.brhsp1sp2):
+        entries = [{'name': args.namesp1, 'sp1idmap': os.path.abspath(args.sp1idmap), 'sp1pc97': os.path.abspath(args.sp1pc97),
+                    'brh': os.path.abspath(args.brhsp1sp2), 'flipped': args.flipped}]
+    else:
+        parser.error('provide either -manifest or -np1, -sp1id, -sp1pc and -brh')
+    queries = []
+    if args.query is not None:
+        queries += [query.strip() for query in args.query.split(',') if query.strip() != '']
+    if args.queryFile is not None:
+        with open_input(args.queryFile) as fq:
+            queries += [line.strip() for line in fq if line.strip() != '']
+    if not queries:
+        parser.error('provide -q and/or -queryFile')
+
+    ids = IdTable() if (args.compact).lower() == 'true' else None
+    dict_sp2id, dict_symb, pc2 = load_reference(os.path.abspath(args.sp2idmap), os.path.abspath(args.symbolGene), None, cacheDir, ids)
+    index = ReverseIndex(dict_sp2id, dict_symb)
+    for entry in entries:
+        dict_sp1id, dict_brh, pc1 = load_species(entry['sp1idmap'], entry['brh'], entry['flipped'].lower(), entry['sp1pc97'], cacheDir, ids)
+        index.add_species(entry['name'], dict_sp1id, dict_brh, pc1)
+
+    fo = sys.stdout if args.output == '-' else open(args.output, 'w')
+    try:
+        fo.write('\t'.join(REVERSE_HEADER) + '\n')
+        for query in queries:
+            fo.writelines('\t'.join(row) + '\n' for row in index.lookup(query))
+    finally:
+        if fo is sys.stdout:
+            fo.flush()
+        else:
+            fo.close()
+
+
+# modes that can be given as first argument instead of the usual single species options
+SUBCOMMANDS = {'batch': batch_main, 'annotate': annotate_main, 'serve': serve_main, 'reverse': reverse_main}
+
+
 # -----------------------------MAIN FUNCTION-------------------
 def main():
+    # other modes are given as first argument e.g. ./orthologyMapping.py batch -manifest species.tsv ... (see SUBCOMMANDS below)
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        return SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+
     # global d1
     parser = argparse.ArgumentParser()
     parser.add_argument('-np1', '--namesp1', help='name of species 1', required=True)
@@ -147,15 +2806,37 @@ def main():
     parser.add_argument('-brh', '--brhsp1sp2', help='best reciprocal file sp1 to sp2', required=True)
     parser.add_argument('-sp2id', '--sp2idmap', help='species 2 id map text file', required=True)
     parser.add_argument('-sp2pc', '--sp2pc97', help='species 2 paralogs 97 pc file', required=True)
-    parser.add_argument('-geneSet', '--geneSet', help='gene set from gff same as gene set used for orthology mapping',
+    parser.add_argument('-geneSet', '--geneSet', help='gene set from gff same as gene set used for orthology mapping (or the GFF file itself)',
                         required=True)
     parser.add_argument('-symb', '--symbolGene', help='Gene Symbol', required=True)
     parser.add_argument('-conv', '--conversion', help='if conversion req or not', default=False)
-    parser.add_argument('-setConv', '--setConvGene', help='conversion file')
+    parser.add_argument('-setConv', '--setConvGene', help='conversion file (or the GFF file it would be made from, see GFF INPUT)')
+    parser.add_argument('-gffDbxref', '--gffDbxref', help='database of the Dbxref entries used for the conversions of a GFF -setConv file', default=GFF_DBXREF)
     parser.add_argument('-flip', '--flipped', help='if in brh DMEL:specie1 set it to False', default='True')
     parser.add_argument('-sep', '--separator', help='if separator is not colon, provide its value', default=':')
     parser.add_argument('-so', '--scrmshawOutput', help='if you want to get ortho/paralogs in scrmshaw output, provide scrmhsaw output file here, else leave this parameter',default='NoSCRM')
+    parser.add_argument('-cache', '--cacheDir', help='directory to keep compiled idmap/brh/97pc/symbol tables for faster repeat runs, else leave this parameter', default='NoCache')
+    parser.add_argument('-temp', '--writeTemp', help='set it to false to skip writing the intermediate <namesp1>_temp.txt file (e.g. for large runs)', default='true')
+    parser.add_argument('-workers', '--workers', help='number of processes used to resolve the gene set and annotate scrmshaw output', type=int, default=1)
+    parser.add_argument('-report', '--runReport', help='set it to false to skip writing <namesp1>_runReport.json (timings, counters, memory)', default='true')
+    parser.add_argument('-profile', '--profile', help='set it to true to profile the run with cProfile into <namesp1>_profile.txt', default='false')
+    parser.add_argument('-compact', '--compact', help='set it to true to keep the loaded tables as interned integer arrays (less memory, slower lookups)', default='false')
+    parser.add_argument('-engine', '--engine', help='loop resolves genes one by one, vector resolves the whole gene set with column joins', choices=['loop', 'vector'], default='loop')
+    parser.add_argument('-minScore', '--minScore', help='only use brh hits with at least this bit score', type=float)
+    parser.add_argument('-maxEvalue', '--maxEvalue', help='only use brh hits with at most this e-value', type=float)
+    parser.add_argument('-minIdentity', '--minIdentity', help='only use brh hits with at least this percent identity', type=float)
+    parser.add_argument('-minAlnLen', '--minAlnLen', help='only use brh hits aligned over at least this many residues in both genes', type=int)
+    parser.add_argument('-brhMetrics', '--brhMetrics', help='set it to true to add score, e-value, identity and aligned length of the brh hit to <namesp1>_final.txt', default='false')
+    parser.add_argument('-format', '--outputFormat', help='comma separated output formats: tsv (text files), sqlite, parquet, arrow (e.g. tsv,sqlite)', default='tsv')
+    parser.add_argument('-store', '--store', help='result store file kept between runs, only genes that are new or whose inputs changed since the last run are resolved again, else leave this parameter', default='NoStore')
+    parser.add_argument('-multiHit', '--multiHit', help='set it to true to write <namesp1>_multiHit.txt with every DMEL hit of each gene ranked by score (for brh/hit files with more than one partner per protein)', default='false')
+    parser.add_argument('-topHits', '--topHits', help='with -multiHit true only write this many best hits of each gene', type=int)
+    parser.add_argument('-groups', '--groups', help='set it to true to write co-orthology groups (connected 97pc/brh ids) to <namesp1>_groups.txt and <namesp1>_geneGroups.txt', default='false')
+    parser.add_argument('-lazy', '--lazy', help='set it to true to read the gene set first and load only the idmap/brh/97pc/symbol rows reachable from its genes (for small gene sets, the cache is not used)', default='false')
     args = parser.parse_args()
+    if (args.groups).lower() == 'true' and (args.lazy).lower() == 'true':
+        # groups reach ids that are not reachable from the gene set one hop out
+        parser.error('-groups true needs the whole tables, it cannot be used with -lazy true')
     # absolute path
     namesp1 = args.namesp1
     sp1idmap = os.path.abspath(args.sp1idmap)
@@ -169,528 +2850,91 @@ def main():
     flipped = (args.flipped).lower()
     separator = args.separator
     scrmshawOutput = (args.scrmshawOutput)
-    if (scrmshawOutput != 'NoSCRM'):
-        scrmshawOutputPath = os.path.abspath(scrmshawOutput)
+    writeTemp = (args.writeTemp).lower() != 'false'
+    cacheDir = args.cacheDir
+    if (cacheDir != 'NoCache'):
+        cacheDir = os.path.abspath(cacheDir)
+    outputFormats = output_formats(args.outputFormat)
+
+    global runReport
+    profile = (args.profile).lower() == 'true'
+    if (args.runReport).lower() != 'false' or profile:
+        runReport = RunReport(profile)
 
     # Depending on naming convention of genes used for SCRMshaw and orthoDB, you might need to convert them to same convention first
     # and if there is need of conversion (or conversion=true), user need to provide the respective file needed for conversion and that
     # file is used to create a dictionary to save them
+    dict_conv = None
+    convGeneSet = None
     if (conversion == "TRUE" or conversion == "T" or conversion == "true"):
         convGeneSet = os.path.abspath(args.setConvGene)
-        dict_conv = conv_dict('conv', convGeneSet)
-
-    # creating a dictionary of SpecX using idmap file (format: )
-    dict_sp1id = idMap_dict('sp1id', sp1idmap)
-    # pprint.pprint(dict_sp1id)
-    # print('Flipped',flipped)
-    # creating a dictionary to store best reciprocal hits (format: )
-    dict_brh = brh_dict('brh', brhsp1sp2, flipped)
-    # creating a dictionary of DMEL using idmap file (format: )
-    dict_sp2id = idMap2_dict('sp2id', sp2idmap)
-    # creating a dictionary to save symbol of genes (format: )
-    dict_symb = geneSymbol_dict('symbol', symbolGene)
-
-    # pprint.pprint(dict_symb)
-    # creating list of paralog lists for specX and DMEL
-    pc1 = paralogs('pc1', sp1pc97)
-    pc2 = paralogs('pc2', sp2pc97)
-
-    # creating two intermediate files that will store information regarding orthologs and paralogs
-    g1 = open(namesp1 + '_temp.txt', 'w')
-    g1.write(
-        'GeneName_TC' + '\t' + 'GeneName_OGid' + '\t' + 'Ortholog_id_symb' + '\t' +'Dmel_paralogs'+'\t'+'Dmel_paralogs_ids'+'\t'+'Dmel_paralogs_Symbols'+'\t'+ 'listOfParalogsIfAny' + '\t' + 'ifParalogHasOrtholog_id_symb' + '\t' +'Dmel_Pparalogs'+'\t'+'Dmel_Pparalogs_ids'+'\t'+'Dmel_Pparalogs_Symbols'+'\n')
-    f1a = open(namesp1 + '_final.txt', 'w')
-    f1a.write(
-        'GeneName' + '\t' + 'Orthologs' + '\t' + 'GeneSymbolOrthologs' + '\t' +'Dmel_paralogs'+'\t'+'GeneSymbolDmel_paralogs'+'\t' +'ParalogsThatHaveOrthologs' + '\t' + 'GeneSymbolParalogs'+ '\t' +'Dmel_Pparalogs'+'\t'+'GeneSymbolDmel_Pparalogs'+'\n')
-
-    # opening geneSet file that has 1 gene per line (all of genes extracted from its gff) and
-    # finding out if there are any orthologs or/and paralogs present wrt DMEL, if present write into two temp files created before..
-    # to use later on to edit SCRMshaw prediction file to add respective ortho/para data in it
-    with open(geneSet, 'r') as gS, open(namesp1 + '_temp.txt', 'a') as g1, open(namesp1 + '_final.txt', 'a') as f1a:
-        for line in gS:
-            geneName = line.rstrip('\n')
-            # g1.write(geneName)
-            # f1.write(geneName+'\t')
-            # if there is a step of conversion of gene Naming involved, then making sure to use the right one using the
-            # dictioanary created previously
-            if (conversion == "TRUE" or conversion == "T" or conversion == "true"):
-                # print('require c')
-                if geneName.split(separator)[1] in dict_conv:
-                    # f1.write(dict_conv[geneName.split(separator)[1]]+'\t')
-                    geneName2 = dict_conv[geneName.split(separator)[1]]
-                else:
-                    # f1.write(geneName+'\t')
-                    geneName2 = geneName
-            # if not, then go ahead with line one of gene name
-            else:
-                # f1.write(geneName+'\t')
-                geneName2 = geneName
-
-            # if gene is present in the idMap dictionary of Spec X
-            if geneName in dict_sp1id:
-                # print('present')
-                # writing genename in temp file using idmap file
-                # g1.write('\t'+dict_sp1id[geneName])
-
-                # STEP 1: Check ORTHOLOGS
-                # First of all check if it has any Ortholog or not..
-                # check if it has orthologs-forget about paralogs---
-                if dict_sp1id[geneName] in dict_brh:
-                    # g1.write('Has ortholog')
-                    if dict_brh[dict_sp1id[geneName]] in dict_sp2id:
-
-                        #initializing all variables used for dmels paralogs
-                        dmelsParalogsList=''
-                        dmelsParalogsListFBgn=[]
-                        dmelsParalogsListFBgnSymb=[]
-
-
-                        # print(geneName2)
-                        # print(dict_sp1id[geneName2])
-                        # print(dict_brh[dict_sp1id[geneName]]+'__'+dict_sp2id[dict_brh[dict_sp1id[geneName]]])
-                        # print("---Has Ortholog--") #probably no need to look at paralogs then, even if they are there, they wont be in brh file right?
-                        # g1.write(geneName+'\t'+dict_sp1id[geneName]+'\t'+'Has parlogs:'+str('sublist')+'\t'+dict_brh[dict_sp1id[geneName]]+'\t'+dict_sp2id[dict_brh[dict_sp1id[geneName]]]+'\n')
-                        g1.write(
-                            geneName2 + '\t' + dict_sp1id[geneName] + '\t' + dict_brh[dict_sp1id[geneName]] + '__' +
-                            dict_sp2id[dict_brh[dict_sp1id[geneName]]])
-                        #	f1.write('\t'+dict_sp2id[dict_brh[dict_sp1id[geneName]]])
-                        f1a.write(geneName2 + '\t' + dict_sp2id[dict_brh[dict_sp1id[geneName]]])
-                        noOrigOrtholog = 'False'
-
-                        # Gene symbol:
-                        if dict_sp2id[dict_brh[dict_sp1id[geneName]]] in dict_symb:
-                            g1.write('/' + dict_symb[dict_sp2id[dict_brh[dict_sp1id[geneName]]]])
-                            # f1.write('\t'+dict_symb[dict_sp2id[dict_brh[dict_sp1id[geneName]]]])
-                            f1a.write('\t' + dict_symb[dict_sp2id[dict_brh[dict_sp1id[geneName]]]])
-                        else:
-                            g1.write('/' + 'NoSymb')
-                            # f1.write('\t'+'NULL')
-                            f1a.write('\t' + 'NoSymbolFound')
-
-
-                        #---FORGOT DMEL paralogs
-                        # check if dmel's id (whose ortholog is found) has any paralogs?
-                        #if dict_brh[dict_sp1id[geneName]] in pc2:
-                        if any(dict_brh[dict_sp1id[geneName]] in sublist2 for sublist2 in pc2):
-                            #has paralogs , printing those here
-                            # find where is it located on the list
-                            paralogListIndex2 = find(dict_brh[dict_sp1id[geneName]] , pc2)
-                         #   print('list of dmel paralogs: ' + str(pc2[paralogListIndex2[0]]))
-                            dmelsParalogsList=pc2[paralogListIndex2[0]]
-
-                            # go through each of these paralogs and list their symbols
-                            for i in range(0, len(pc2[paralogListIndex2[0]])):
-
-                                # check each para for its symbol
-                                #first check if it has Fbgn id
-                                if pc2[paralogListIndex2[0]][i] in dict_sp2id:
-                                    #print("Fbgn id for this paralog, ",pc2[paralogListIndex2[0]][i]," is: ",dict_sp2id[pc2[paralogListIndex2[0]][i]])
-                                    dmelsParalogsListFBgn.append(dict_sp2id[pc2[paralogListIndex2[0]][i]])
-                                    #check for symbols
-                                    if dict_sp2id[pc2[paralogListIndex2[0]][i]] in dict_symb:
-                                       # print("and the symbol is: ", dict_symb[dict_sp2id[pc2[paralogListIndex2[0]][i]]])
-                                        dmelsParalogsListFBgnSymb.append(dict_symb[dict_sp2id[pc2[paralogListIndex2[0]][i]]])
-                                    else:
-                                     #   print("but doesnt have symbol")
-                                        dmelsParalogsListFBgnSymb.append('-')
-                                else:
-                                   # print("no FbgnID found")
-                                    dmelsParalogsListFBgn.append('-')
-                        if dmelsParalogsList!='':
-                           # print(dmelsParalogsList)
-                            #print(dmelsParalogsListFBgn)
-                            #print(dmelsParalogsListFBgnSymb)
-                            g1.write('\t'+str(dmelsParalogsList)+'\t'+str(dmelsParalogsListFBgn)+'\t'+str(dmelsParalogsListFBgnSymb))
-                            f1a.write('\t'+str(dmelsParalogsListFBgn)+'\t'+str(dmelsParalogsListFBgnSymb))
-                        else:
-                            g1.write('\t'+'NoParalogs'+'\t'+'-'+'\t'+'-')
-                            f1a.write('\t'+'NoParalogs' + '\t' + '-')
-                        #end-DMELs paralogs for direct orthologs
-
-
-                    else:  # id is not found in dictionary of ids--so no ortholog can be found
-                        # print('id is not found in dictionary of ids')
-                        g1.write(geneName2 + '\t' + dict_sp1id[geneName2] + '\t' + 'NULL' + '\t' + 'NULL'+'\t' + 'NULL' + '\t' + 'NULL'+ '\t' + 'NULL'+'\t' + 'NULL' + '\t' + 'NULL')
-                        f1a.write(geneName2 + '\t' + 'NULL' + '\t' + 'NULL'+'\t' + 'NULL' + '\t' + 'NULL'+'\t'+'NULL' + '\t' + 'NULL')
-
-                else:  # if not present in BRH file
-                    # print(dict_sp1id[geneName])
-                    # print("---NO Ortholog--")
-                    g1.write(geneName2 + '\t' + dict_sp1id[geneName] + '\t' + 'NO ortholog'+'\t'+'-'+'\t'+'-'+'\t'+'-')
-                    f1a.write(geneName2 + '\t' + 'NoDirectOrtholog' + '\t' + 'NULL'+'\t'+'-'+'\t'+'-')
-                    noOrigOrtholog = 'True'
-
-                # STEP 2: Check PARALOGS.. (if no ortholog found)
-                # SECOND STEP --check if there is any paralog present, if so: whether that paralog has any ortholog [although it won't if gene itself has already an ortholog]
-                # using the id of geneName, check to see if its present in paralog file (using pc list created before)
-
-                # if there wasnt any ortholog then go ahead and check its paralogs
-                if noOrigOrtholog == 'True':
-                    # try start
-                    if any(dict_sp1id[geneName] in sublist for sublist in pc1):
-                        # find where is it located on the list
-                        paralogListIndex = find(dict_sp1id[geneName], pc1)
-
-                        # if this index [1] item is 0 : that means this does have paralogs, but none of paralogs have any ortholog
-                        # if  this index [1] item is 1: that means the paralog at position 0 might have ortholog might not > check if it does
-                        if paralogListIndex[1] == 0:
-                            #	print("No Ortholog of its following paralogs",str(pc1[paralogListIndex[0]]))
-                            f1a.write('\t' + 'HasParalogButNoChanceOfOrthologOfParalogs' + '\t' + '-'+'\t'+'-'+'\t'+'-')
-                            g1.write('\t' + str(pc1[paralogListIndex[0]]) + '\t' + 'NULL'+'\t'+'-'+'\t'+'-'+'\t'+'-')
-                        #paralog can only have ortholog if its not the first one in 97 pc file
-                        elif paralogListIndex[1] != 0:
-                            # print("Its paralog may have an ortholog",str(pc1[paralogListIndex[0]]))
-
-                            if pc1[paralogListIndex[0]][0] in dict_brh:  # its paralog does have  ortholog
-                                #	print("Yes its paralog DOES have an ortholog- see below")
-                                if dict_brh[pc1[paralogListIndex[0]][0]] in dict_sp2id:
-
-                                    # initializing all variables used for dmels paralogs
-                                    dmelsParalogsParalogsList = ''
-                                    dmelsParalogsParalogsListFBgn = []
-                                    dmelsParalogsParalogsListFBgnSymb = []
-
-                                    #	print(pc1[paralogListIndex[0]][0]+'--'+dict_brh[pc1[paralogListIndex[0]][0]]+'__'+dict_sp2id[dict_brh[pc1[paralogListIndex[0]][0]]])
-                                    g1.write('\t' + str(pc1[paralogListIndex[0]]) + '\t' + pc1[paralogListIndex[0]][
-                                        0] + '--' + dict_brh[pc1[paralogListIndex[0]][0]] + '__' + dict_sp2id[
-                                                 dict_brh[pc1[paralogListIndex[0]][0]]])
-                                    f1a.write('\t' + dict_sp2id[dict_brh[pc1[paralogListIndex[0]][0]]] + '\t')
-                                    # check its symbol
-                                    if dict_sp2id[dict_brh[pc1[paralogListIndex[0]][0]]] in dict_symb:
-                                        g1.write('/' + dict_symb[dict_sp2id[dict_brh[pc1[paralogListIndex[0]][0]]]])
-                                        f1a.write(dict_symb[dict_sp2id[dict_brh[pc1[paralogListIndex[0]][0]]]])
-                                    else:
-                                        g1.write('/' + 'NoSymb')
-                                        f1a.write('NoSymbolFound')
-
-
-                                    # ---FORGOT DMEL paralogs
-                                    # check if dmel's id (whose ortholog is found) has any paralogs?
-                                    # if dict_brh[dict_sp1id[geneName]] in pc2:
-                                    if any(dict_brh[pc1[paralogListIndex[0]][0]] in sublist2 for sublist2 in pc2):
-                                        # has paralogs , printing those here
-                                        # find where is it located on the list
-                                        paralogListIndex3 = find(dict_brh[pc1[paralogListIndex[0]][0]], pc2)
-                                    #    print('P list of dmel paralogs: ' + str(pc2[paralogListIndex3[0]]))
-                                        dmelsParalogsParalogsList = pc2[paralogListIndex3[0]]
-                                        # go through each of these paralogs and list their symbols
-                                        for i in range(0, len(pc2[paralogListIndex3[0]])):
-
-                                            # check each para for its symbol
-                                            # first check if it has Fbgn id
-                                            if pc2[paralogListIndex3[0]][i] in dict_sp2id:
-                                               # print("Fbgn id for this paralog, ", pc2[paralogListIndex3[0]][i],
-                                                #      " is: ", dict_sp2id[pc2[paralogListIndex3[0]][i]])
-                                                dmelsParalogsParalogsListFBgn.append(dict_sp2id[pc2[paralogListIndex3[0]][i]])
-                                                # check for symbols
-                                                if dict_sp2id[pc2[paralogListIndex3[0]][i]] in dict_symb:
-                                                   # print("and the symbol is: ",
-                                                       #   dict_symb[dict_sp2id[pc2[paralogListIndex3[0]][i]]])
-                                                    dmelsParalogsParalogsListFBgnSymb.append(
-                                                        dict_symb[dict_sp2id[pc2[paralogListIndex3[0]][i]]])
-                                                else:
-                                                    #print("but doesnt have symbol")
-                                                    dmelsParalogsParalogsListFBgnSymb.append('-')
-                                            else:
-                                                # print("no FbgnID found")
-                                                dmelsParalogsParalogsListFBgn.append('-')
-                                    if dmelsParalogsParalogsList != '':
-                                        # print(dmelsParalogsList)
-                                        # print(dmelsParalogsListFBgn)
-                                        # print(dmelsParalogsListFBgnSymb)
-                                        g1.write('\t' + str(dmelsParalogsParalogsList) + '\t' + str(
-                                            dmelsParalogsParalogsListFBgn) + '\t' + str(dmelsParalogsParalogsListFBgnSymb))
-                                        f1a.write('\t' + str(dmelsParalogsParalogsListFBgn) + '\t' + str(
-                                            dmelsParalogsParalogsListFBgnSymb))
-                                    else:
-                                        g1.write('\t' + 'NoParalogsParalogs' + '\t' + '-' + '\t' + '-')
-                                        f1a.write('\t' + 'NoParalogsParalogs' + '\t' + '-')
-                                    # end-DMELs paralogs for paralogs orthologs
-
-                                    # end-DMELs
-
-
-
-
-
-
-
-
-
-                            else:  # its paralog also doesnt have any ortholog
-                                # print("no its paralog also doesnt have any ortholog")
-                                g1.write('\t' + str(pc1[paralogListIndex[0]]) + '\t' + '-'+'\t'+'-'+'\t'+'-'+'\t'+'-')
-                                f1a.write('\t' + 'HasParalogButNoOrthologOfParalogs' + '\t' + '-'+'\t'+'-'+'\t'+'-')
-
-                    else:  # not found in 97 pc file
-                        # print(" doesnt have paralogs")
-                        f1a.write('\t' + 'NoParalogsFound' + '\t' + '-'+'\t'+'-'+'\t'+'-')
-                        g1.write('\t' + 'NoParalogs' + '\t' + '-'+'\t'+'-'+'\t'+'-'+'\t'+'-')
-
-                else:  # ortholog is present, no need to look at paralog
-                    #	print(" doesnt need paralogs")
-                    f1a.write('\t' + 'NoNeedOfParalogs' + '\t' + '-'+'\t'+'-'+'\t'+'-')
-                    g1.write('\t' + '-' + '\t' + '-'+'\t'+'-'+'\t'+'-'+'\t'+'-')
-
-            else:  # gene id not found in idmap--nothing else could be looked up
-                g1.write(geneName2 + '\t' + '-' + '\t' + '-' + '\t' + '-' + '\t' + '-'+ '\t' + '-' + '\t' + '-'+'\t'+'-'+'\t'+'-'+'\t'+'-'+'\t'+'-')
-                f1a.write(geneName + '\t' + 'geneIDnotMapped' + '\t' + '-' + '\t' + '-' + '\t' + '-'+ '\t' + '-' + '\t' + '-'+'\t'+'-'+'\t'+'-')
-            # for sublist in pc1:
-            # for item in sublist:
-            g1.write('\n')
-            f1a.write('\n')
-    g1.close()
-    f1a.close()
-
-    fof = os.path.abspath(namesp1 + '_final.txt')
-    dict_orthologs, dict_paralogs = orthologs_dict('orthologs', 'paralogs', fof)
+        with report_stage('load conversion table'):
+            dict_conv = conv_dict('conv', convGeneSet, args.gffDbxref)
+
+    # creating dictionaries of SpecX and DMEL ids using idmap files, a dictionary to store best reciprocal hits,
+    # a dictionary to save symbol of genes and indexed list of paralog lists for specX and DMEL
+    # (read back from the cache directory if these inputs were already parsed in a previous run)
+    # with brh thresholds or metrics the brh file is kept as a BrhIndex of its hits and only the hits passing are used
+    brhThresholds = brh_thresholds(args.minScore, args.maxEvalue, args.minIdentity, args.minAlnLen)
+    metrics = (args.brhMetrics).lower() == 'true'
+    brhIndex = None
+    brhMetrics = None
+    # with -multiHit true every hit of each gene (not only the last one of the file) is kept as BrhHits for <namesp1>_multiHit.txt
+    multiHit = (args.multiHit).lower() == 'true'
+    topHits = top_hits(args.topHits)
+    brhHits = None
+    # with a result store only the genes that are new or whose inputs changed since the last run are resolved (signatures of
+    # the inputs are taken before reading them, so a file changed while it is read is looked at again by the next run)
+    store = args.store
+    storeSignatures = None
+    if (store != 'NoStore'):
+        store = os.path.abspath(store)
+        storeSignatures = table_signatures(sp1idmap, brhsp1sp2, flipped, sp1pc97, sp2idmap, symbolGene, sp2pc97, convGeneSet, brhThresholds,
+                                           args.gffDbxref)
+    with report_stage('load input tables'):
+        ids = IdTable() if (args.compact).lower() == 'true' else None
+        if (args.lazy).lower() == 'true':
+            # only the rows reachable from the genes of the gene set are loaded
+            dict_sp1id, dict_brh, dict_sp2id, dict_symb, pc1, pc2, brhIndex = load_inputs_lazy(
+                read_gene_set(geneSet), sp1idmap, brhsp1sp2, flipped, sp2idmap, symbolGene, sp1pc97, sp2pc97, ids, brhThresholds,
+                metrics or multiHit)
+            if metrics:
+                brhMetrics = brhIndex.metric_table(brhIndex.select(**brhThresholds))
+        else:
+            if brhThresholds or metrics or multiHit:
+                brhIndex = cached_load(cacheDir, brh_index, 'brh', brhsp1sp2, flipped)
+                if metrics:
+                    brhMetrics = brhIndex.metric_table(brhIndex.select(**brhThresholds))
+            dict_sp1id, dict_brh, dict_sp2id, dict_symb, pc1, pc2 = load_inputs(sp1idmap, brhsp1sp2, flipped, sp2idmap, symbolGene,
+                                                                                sp1pc97, sp2pc97, cacheDir, ids, brhIndex, brhThresholds)
+        if multiHit:
+            brhHits = brhIndex.hits(brhIndex.rows(**brhThresholds))
+    groups = None
+    if (args.groups).lower() == 'true':
+        with report_stage('build co-orthology groups'):
+            groups = OrthologyGroups(dict_brh, pc1, pc2)
+
+    dict_orthologs, dict_paralogs = map_species(namesp1, geneSet, dict_sp1id, dict_brh, pc1, dict_sp2id, dict_symb, pc2,
+                                                conversion, dict_conv, separator, scrmshawOutput, writeTemp, args.workers, args.engine,
+                                                brhMetrics, store, storeSignatures, outputFormats, brhHits, topHits, groups)
     print("number of orthologs found:" + str(len(dict_orthologs)))
     # pprint.pprint(dict_orthologs)
     print("number of paralogs found:" + str(len(dict_paralogs)))
     # pprint.pprint(dict_paralogs)
 
-    # creating csv files for ortholog and paralog list
-    file_from_dict(namesp1 + '_orthologList', dict_orthologs)
-    file_from_dict(namesp1 + '_paralogList', dict_paralogs)
-
-    orthologOutput = 'SO_' + scrmshawOutput
-
-    #need to fix it at some point, exclude anything useless-- op stuff (June 22)
-    if (scrmshawOutput != 'NoSCRM'):
-        with open(scrmshawOutputPath, 'r') as so, open(orthologOutput, 'w') as fo:
-            for line in so:
-                cols = line.split('\t')
-
-                # Check col 5 and col 10
-                # To reduce calculation
-                if cols[5] == cols[10]:
-                    # if one gene
-                    if cols[5].find(',') == -1:
-                        # In theory shouldnt enter here ever
-                        # check if col 5 has ortholog or paralog or both
-                        if (cols[5] in dict_orthologs) and (cols[5] not in dict_paralogs):
-                            ortho_para1 = dict_orthologs[cols[5]] + '_o_'
-                        if (cols[5] in dict_paralogs) and (cols[5] not in dict_orthologs):
-                            ortho_para1 = str(dict_paralogs[cols[5]]) + '_p_'
-                        if (cols[5] not in dict_paralogs) and (cols[5] not in dict_orthologs):
-                            ortho_para1 = '-'
-                        if (cols[5] in dict_paralogs) and (cols[5] in dict_orthologs):
-                            # check they both are similar or not
-                            if dict_orthologs[cols[5]] != dict_paralogs[cols[5]].strip(','):
-                                ortho_para1 = dict_orthologs[cols[5]] + '_o_,' + str(dict_paralogs[cols[5]]) + '_p_'
-                            else:
-                                ortho_para1 = dict_orthologs[cols[5]] + '_op_'
-
-                        fo.write(cols[0] + '\t' + cols[1] + '\t' + cols[2] + '\t' + cols[3] + '\t' + cols[4] + '\t' + cols[
-                            5] + '\t' + ortho_para1 + '\t' + cols[7] + '\t' + cols[8] + '\t' + cols[9] + '\t' + cols[
-                                     10] + '\t' + ortho_para1 + '\t' + cols[12] + '\t' + cols[13] + '\t' + cols[14] + '\t' +
-                                 cols[15] + '\t' + cols[16] + '\t' + cols[17])
-
-                    # if multiple genes
-
-                    if cols[5].find(',') != -1:
-                        ortho_para1 = ''
-                        genes1 = cols[5].split(',')
-                        for i in range(0, len(genes1)):
-
-                            # check if col 5 1st gene has ortholog or paralog or both
-                            if (genes1[i] in dict_orthologs) and (genes1[i] not in dict_paralogs):
-                                ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_o_,'
-                            if (genes1[i] in dict_paralogs) and (genes1[i] not in dict_orthologs):
-                                ortho_para1 = ortho_para1 + str(dict_paralogs[genes1[i]]) + '_p_,'
-                            if (genes1[i] not in dict_paralogs) and (genes1[i] not in dict_orthologs):
-                                ortho_para1 = ortho_para1 + '-'
-                            if (genes1[i] in dict_paralogs) and (genes1[i] in dict_orthologs):
-                                # check they both are similar or not
-                                if dict_orthologs[genes1[i]] != dict_paralogs[genes1[i]].strip(','):
-                                    ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_o_,' + dict_paralogs[
-                                        genes1[i]] + '_p_,'
-                                else:
-                                    ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_op_,'
-
-                        fo.write(cols[0] + '\t' + cols[1] + '\t' + cols[2] + '\t' + cols[3] + '\t' + cols[4] + '\t' + cols[
-                            5] + '\t' + ortho_para1 + '\t' + cols[7] + '\t' + cols[8] + '\t' + cols[9] + '\t' + cols[
-                                     10] + '\t' + ortho_para1 + '\t' + cols[12] + '\t' + cols[13] + '\t' + cols[14] + '\t' +
-                                 cols[15] + '\t' + cols[16] + '\t' + cols[17])
-
-
-
-                elif cols[5] != cols[10]:
-
-                    # CASE A
-                    # Neither col 5 nor col 10 has more than one gene on it---
-                    if cols[5].find(',') == -1 and cols[10].find(',') == -1:
-                        # check if col 5 has ortholog or paralog or both
-                        if (cols[5] in dict_orthologs) and (cols[5] not in dict_paralogs):
-                            ortho_para1 = dict_orthologs[cols[5]] + '_o_'
-                        if (cols[5] in dict_paralogs) and (cols[5] not in dict_orthologs):
-                            ortho_para1 = str(dict_paralogs[cols[5]]) + '_p_'
-                        if (cols[5] not in dict_paralogs) and (cols[5] not in dict_orthologs):
-                            ortho_para1 = '-'
-                        if (cols[5] in dict_paralogs) and (cols[5] in dict_orthologs):
-                            # check they both are similar or not
-                            if dict_orthologs[cols[5]] != dict_paralogs[cols[5]].strip(','):
-                                ortho_para1 = dict_orthologs[cols[5]] + '_o_,' + dict_paralogs[cols[5]] + '_p_'
-                            else:
-                                ortho_para1 = dict_orthologs[cols[5]] + '_op_'
-
-                        # fo.write(cols[0]+'\t'+cols[1]+'\t'+cols[2]+'\t'+cols[3]+'\t'+cols[4]+'\t'+cols[5]+'\t'+ortho_para+'\t'+cols[7]+'\t'+cols[8]+'\t'+cols[9]+'\t'+cols[10]+'\t'+cols[11]+'\t'+cols[12]+'\t'+cols[13]+'\t'+cols[14]+'\t'+cols[15]+'\t'+cols[16]+'\t'+cols[17])
-
-                        # check if col 10 has ortholog or paralog or both
-                        if (cols[10] in dict_orthologs) and (cols[10] not in dict_paralogs):
-                            ortho_para2 = dict_orthologs[cols[10]] + '_o_'
-                        if (cols[10] in dict_paralogs) and (cols[10] not in dict_orthologs):
-                            ortho_para2 = str(dict_paralogs[cols[10]]) + '_p_'
-                        if (cols[10] not in dict_paralogs) and (cols[10] not in dict_orthologs):
-                            ortho_para2 = '-'
-                        if (cols[10] in dict_paralogs) and (cols[10] in dict_orthologs):
-                            # check they both are similar or not
-                            if dict_orthologs[cols[10]] != dict_paralogs[cols[10]].strip(','):
-                                ortho_para2 = dict_orthologs[cols[10]] + '_o_,' + dict_paralogs[cols[10]] + '_p_'
-                            else:
-                                ortho_para2 = dict_orthologs[cols[10]] + '_op_'
-
-                        fo.write(cols[0] + '\t' + cols[1] + '\t' + cols[2] + '\t' + cols[3] + '\t' + cols[4] + '\t' + cols[
-                            5] + '\t' + ortho_para1 + '\t' + cols[7] + '\t' + cols[8] + '\t' + cols[9] + '\t' + cols[
-                                     10] + '\t' + ortho_para2 + '\t' + cols[12] + '\t' + cols[13] + '\t' + cols[14] + '\t' +
-                                 cols[15] + '\t' + cols[16] + '\t' + cols[17])
-
-
-                    # CASE B
-                    # Column 5 has more than 1 gene but col 10 has 1 gene only
-                    elif cols[5].find(',') != -1 and cols[10].find(',') == -1:
-                        ortho_para1 = ''
-                        genes1 = cols[5].split(',')
-                        for i in range(0, len(genes1)):
-
-                            # check if col 5 1st gene has ortholog or paralog or both
-                            if (genes1[i] in dict_orthologs) and (genes1[i] not in dict_paralogs):
-                                ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_o_,'
-                            if (genes1[i] in dict_paralogs) and (genes1[i] not in dict_orthologs):
-                                ortho_para1 = ortho_para1 + str(dict_paralogs[genes1[i]]) + '_p_,'
-                            if (genes1[i] not in dict_paralogs) and (genes1[i] not in dict_orthologs):
-                                ortho_para1 = ortho_para1 + '-'
-                            if (genes1[i] in dict_paralogs) and (genes1[i] in dict_orthologs):
-                                # check they both are similar or not
-                                if dict_orthologs[genes1[i]] != dict_paralogs[genes1[i]].strip(','):
-                                    ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_o_,' + dict_paralogs[
-                                        genes1[i]] + '_p_,'
-                                else:
-                                    ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_op_,'
-
-                        # check if col 10 has ortholog or paralog or both
-                        if (cols[10] in dict_orthologs) and (cols[10] not in dict_paralogs):
-                            ortho_para2 = dict_orthologs[cols[10]] + '_o_'
-                        if (cols[10] in dict_paralogs) and (cols[10] not in dict_orthologs):
-                            ortho_para2 = str(dict_paralogs[cols[10]]) + '_p_'
-                        if (cols[10] not in dict_paralogs) and (cols[10] not in dict_orthologs):
-                            ortho_para2 = '-'
-                        if (cols[10] in dict_paralogs) and (cols[10] in dict_orthologs):
-                            # check they both are similar or not
-                            if dict_orthologs[cols[10]] != dict_paralogs[cols[10]].strip(','):
-                                ortho_para2 = dict_orthologs[cols[10]] + '_o_,' + dict_paralogs[cols[10]] + '_p_'
-                            else:
-                                ortho_para2 = dict_orthologs[cols[10]] + '_op_'
-
-                        fo.write(cols[0] + '\t' + cols[1] + '\t' + cols[2] + '\t' + cols[3] + '\t' + cols[4] + '\t' + cols[
-                            5] + '\t' + ortho_para1 + '\t' + cols[7] + '\t' + cols[8] + '\t' + cols[9] + '\t' + cols[
-                                     10] + '\t' + ortho_para2 + '\t' + cols[12] + '\t' + cols[13] + '\t' + cols[14] + '\t' +
-                                 cols[15] + '\t' + cols[16] + '\t' + cols[17])
-
-
-                    # CASE C
-                    # 			#Column 5 has 1 gene but col 10 has more than 1 gene
-                    #
-                    elif cols[5].find(',') == -1 and cols[10].find(',') != -1:
-
-                        if (cols[5] in dict_orthologs) and (cols[5] not in dict_paralogs):
-                            ortho_para1 = dict_orthologs[cols[5]] + '_o_'
-                        if (cols[5] in dict_paralogs) and (cols[5] not in dict_orthologs):
-                            ortho_para1 = str(dict_paralogs[cols[5]]) + '_p_'
-                        if (cols[5] not in dict_paralogs) and (cols[5] not in dict_orthologs):
-                            ortho_para1 = '-'
-                        if (cols[5] in dict_paralogs) and (cols[5] in dict_orthologs):
-                            # check they both are similar or not
-                            if dict_orthologs[cols[5]] != dict_paralogs[cols[5]].strip(','):
-                                ortho_para1 = dict_orthologs[cols[5]] + '_o_,' + dict_paralogs[cols[5]] + '_p_'
-                            else:
-                                ortho_para1 = dict_orthologs[cols[5]] + '_op_'
-
-                        ortho_para2 = ''
-                        genes2 = cols[10].split(',')
-                        for i in range(0, len(genes2)):
-
-                            # check if col 5 1st gene has ortholog or paralog or both
-                            if (genes2[i] in dict_orthologs) and (genes2[i] not in dict_paralogs):
-                                ortho_para2 = ortho_para2 + dict_orthologs[genes2[i]] + '_o_,'
-                            if (genes2[i] in dict_paralogs) and (genes2[i] not in dict_orthologs):
-                                ortho_para2 = ortho_para2 + str(dict_paralogs[genes2[i]]) + '_p_,'
-                            if (genes2[i] not in dict_paralogs) and (genes2[i] not in dict_orthologs):
-                                ortho_para2 = ortho_para2 + '-'
-                            if (genes2[i] in dict_paralogs) and (genes2[i] in dict_orthologs):
-                                # check they both are similar or not
-                                if dict_orthologs[genes2[i]] != dict_paralogs[genes2[i]].strip(','):
-                                    ortho_para2 = ortho_para2 + dict_orthologs[genes2[i]] + '_o_,' + dict_paralogs[
-                                        genes2[i]] + '_p_,'
-                                else:
-                                    ortho_para2 = ortho_para2 + dict_orthologs[genes2[i]] + '_op_,'
-
-                        fo.write(cols[0] + '\t' + cols[1] + '\t' + cols[2] + '\t' + cols[3] + '\t' + cols[4] + '\t' + cols[
-                            5] + '\t' + ortho_para1 + '\t' + cols[7] + '\t' + cols[8] + '\t' + cols[9] + '\t' + cols[
-                                     10] + '\t' + ortho_para2 + '\t' + cols[12] + '\t' + cols[13] + '\t' + cols[14] + '\t' +
-                                 cols[15] + '\t' + cols[16] + '\t' + cols[17])
-
-
-
-                    # CASE D
-                    # Column 5 and col 10 both have more than 1 gene  but different
-                    elif cols[5].find(',') != -1 and cols[10].find(',') != -1:
-                        ortho_para1 = ''
-                        genes1 = cols[5].split(',')
-                        for i in range(0, len(genes1)):
-
-                            # check if col 5 1st gene has ortholog or paralog or both
-                            if (genes1[i] in dict_orthologs) and (genes1[i] not in dict_paralogs):
-                                ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_o_,'
-                            if (genes1[i] in dict_paralogs) and (genes1[i] not in dict_orthologs):
-                                ortho_para1 = ortho_para1 + str(dict_paralogs[genes1[i]]) + '_p_,'
-                            if (genes1[i] not in dict_paralogs) and (genes1[i] not in dict_orthologs):
-                                ortho_para1 = ortho_para1 + '-'
-                            if (genes1[i] in dict_paralogs) and (genes1[i] in dict_orthologs):
-                                # check they both are similar or not
-                                if dict_orthologs[genes1[i]] != dict_paralogs[genes1[i]].strip(','):
-                                    ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_o_,' + dict_paralogs[
-                                        genes1[i]] + '_p_,'
-                                else:
-                                    ortho_para1 = ortho_para1 + dict_orthologs[genes1[i]] + '_op_,'
-
-                        ortho_para2 = ''
-                        genes2 = cols[10].split(',')
-                        for i in range(0, len(genes2)):
-
-                            # check if col 5 1st gene has ortholog or paralog or both
-                            if (genes2[i] in dict_orthologs) and (genes2[i] not in dict_paralogs):
-                                ortho_para2 = ortho_para2 + dict_orthologs[genes2[i]] + '_o_,'
-                            if (genes2[i] in dict_paralogs) and (genes2[i] not in dict_orthologs):
-                                ortho_para2 = ortho_para2 + str(dict_paralogs[genes2[i]]) + '_p_,'
-                            if (genes2[i] not in dict_paralogs) and (genes2[i] not in dict_orthologs):
-                                ortho_para2 = ortho_para2 + '-'
-                            if (genes2[i] in dict_paralogs) and (genes2[i] in dict_orthologs):
-                                # check they both are similar or not
-                                if dict_orthologs[genes2[i]] != dict_paralogs[genes2[i]].strip(','):
-                                    ortho_para2 = ortho_para2 + dict_orthologs[genes2[i]] + '_o_,' + dict_paralogs[
-                                        genes2[i]] + '_p_,'
-                                else:
-                                    ortho_para2 = ortho_para2 + dict_orthologs[genes2[i]] + '_op_,'
-
-                        fo.write(cols[0] + '\t' + cols[1] + '\t' + cols[2] + '\t' + cols[3] + '\t' + cols[4] + '\t' + cols[
-                            5] + '\t' + ortho_para1 + '\t' + cols[7] + '\t' + cols[8] + '\t' + cols[9] + '\t' + cols[
-                                     10] + '\t' + ortho_para2 + '\t' + cols[12] + '\t' + cols[13] + '\t' + cols[14] + '\t' +
-                                 cols[15] + '\t' + cols[16] + '\t' + cols[17])
+    if runReport is not None:
+        runReport.counts['orthologs'] = len(dict_orthologs)
+        runReport.counts['paralogs'] = len(dict_paralogs)
+        # (with -report false -profile true the report is only kept for the profile)
+        if (args.runReport).lower() != 'false':
+            runReport.write(namesp1 + '_runReport.json', {'species': namesp1, 'arguments': vars(args), 'workers': args.workers})
+        if profile:
+            runReport.write_profile(namesp1 + '_profile.txt')
 
 
 # ./orthologyMapping.py -np1 tcas -sp1id TCAST.idmap.txt -sp1pc TCAST.97pc.txt -brh TCAST_DMELA.brh -sp2pc DMELA.97pc.txt -sp2id DMELA.idmap.txt -geneSet OSG2geneSet.txt -symb fb_synonym_fb_2020_02.tsv -conv true -setConv OGS3toOGS2_conversion.txt -so scrmshawOutput_peaksCalled_antennal_lobe_imm_1388_peaks.bed -sep ':' -flip TRUE
 # ../orthologyMapping.py -np1 agamb -sp1id AGAMB.idmap.txt -sp1pc AGAMB.97pc.txt -brh AGAMB_DMELA.brh -sp2pc DMELA.97pc.txt -sp2id DMELA.idmap.txt -geneSet AGAM_4.9_genes -symb fb_synonym_fb_2020_02.tsv -conv false -so scrmshawOutput_peaksCalled_adult_circulatory_imm_MedianPointAmplitudeCurve_633_peaks.bed
 # ./orthologyMapping.py -np1 apis -sp1id AMELL.idmap.txt -sp1pc AMELL.97pc.txt -brh AMELL_DMELA.brh -sp2pc DMELA.97pc.txt -sp2id DMELA.idmap.txt -geneSet OSG2geneSet.txt -symb fb_synonym_fb_2020_02.tsv -conv true -setConv OSG3toOSG2_conversion.txt -so scrmshawOutput_peaksCalled_adult_circulatory_imm_MedianPointAmplitudeCurve_575_peaks.bed -sep '|' -flip false
 
-main()
+if __name__ == '__main__':
+    main()
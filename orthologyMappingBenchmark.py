@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+################################################################
+# Benchmark of orthology mapping-
+#
+# generates synthetic OrthoDB/FlyBase/SCRMshaw inputs of a given size (species X and DMEL idmap files, 97pc files,
+# X_DMELA.brh file, gene set, FlyBase symbol file and a SCRMshaw output) and times each stage of orthologyMapping.py
+# on them (parsing of every input, paralog lookups, gene loop, writing/reading of the final file, SCRMshaw annotation)
+# and the full pipeline run as a separate process, reporting wall time, peak memory (RSS) and throughput
+# e.g. to compare 10k, 100k and 1M genes with clusters of up to 8 paralogs and 60% of genes having a brh:
+# ./orthologyMappingBenchmark.py -sizes 10000,100000,1000000 -maxCluster 8 -coverage 0.6 -json bench.json
+################################################################
+
+
+import os
+import sys
+import time
+import json
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+import orthologyMapping as om
+
+
+# this function writes a synthetic set of inputs for nGenes species X genes into outDir and returns the paths of the files
+# DMEL gets about 3/4 of the number of genes, a paralogFraction of ids of each species is put in 97pc lists of 2 to maxCluster ids,
+# a coverage fraction of species X genes has a brh and symbolCoverage of FBgn ids has a symbol
+def generate_inputs(outDir, nGenes, maxCluster=6, coverage=0.6, paralogFraction=0.3, symbolCoverage=0.85, scrmshawLines=100000,
+                    seed=1):
+    rng = random.Random(seed)
+    nDmel = max(1, nGenes * 3 // 4)
+    sp1Ids = ['9999:%06x' % i for i in range(nGenes)]
+    sp2Ids = ['7227:%06x' % i for i in range(nDmel)]
+    geneNames = ['GENE%07d' % i for i in range(nGenes)]
+    fbgnIds = ['FBgn%07d' % i for i in range(nDmel)]
+    files = {name: os.path.join(outDir, fileName) for name, fileName in [
+        ('sp1idmap', 'SPECX.idmap.txt'), ('sp1pc97', 'SPECX.97pc.txt'), ('brh', 'SPECX_DMELA.brh'),
+        ('sp2idmap', 'DMELA.idmap.txt'), ('sp2pc97', 'DMELA.97pc.txt'), ('geneSet', 'SPECX_genes'),
+        ('symbolGene', 'fb_synonym.tsv'), ('scrmshawOutput', 'scrmshawOutput.bed')]}
+
+    with open(files['sp1idmap'], 'w') as f:
+        f.writelines(sp1Ids[i] + ' ' + geneNames[i] + '\n' for i in range(nGenes))
+    with open(files['sp2idmap'], 'w') as f:
+        f.writelines(sp2Ids[i] + ' ' + fbgnIds[i] + '\n' for i in range(nDmel))
+    with open(files['symbolGene'], 'w') as f:
+        f.write('## FlyBase synonym table (synthetic)\n')
+        f.write('#primary_FBid\torganism_abbreviation\tcurrent_symbol\tcurrent_fullname\tfullname_synonym(s)\tsymbol_synonym(s)\n')
+        f.writelines(fbgnIds[i] + '\tDmel\tSym' + str(i) + '\tsynthetic gene ' + str(i) + '\t\tCG' + str(i) + '|s' + str(i) + '\n'
+                     for i in range(nDmel) if rng.random() < symbolCoverage)
+
+    # 97pc files: representative, then comma separated list of its paralogs
+    nonRepresentatives = set()
+    for fileName, ids in [(files['sp1pc97'], sp1Ids), (files['sp2pc97'], sp2Ids)]:
+        shuffled = ids[:]
+        rng.shuffle(shuffled)
+        limit = int(len(shuffled) * paralogFraction)
+        start = 0
+        with open(fileName, 'w') as f:
+            while start < limit:
+                size = rng.randint(2, max(2, maxCluster))
+                cluster = shuffled[start:start + size]
+                start += size
+                if len(cluster) > 1:
+                    f.write(cluster[0] + '\t' + ','.join(cluster[1:]) + '\n')
+                    if ids is sp1Ids:
+                        nonRepresentatives.update(cluster[1:])
+
+    # brh file: protein_id1 protein_id2 score evalue percent_identity start1 end1 start2 end2
+    # (in 97pc lists only the representatives usually have a brh)
+    with open(files['brh'], 'w') as f:
+        for sp1Id in sp1Ids:
+            if rng.random() < coverage and (sp1Id not in nonRepresentatives or rng.random() < 0.2):
+                f.write('%s\t%s\t%.2f\t%.4e\t%.2f\t%d\t%d\t%d\t%d\n' % (
+                    sp1Id, rng.choice(sp2Ids), rng.uniform(50, 2000), 10 ** -rng.uniform(1, 200), rng.uniform(20, 100),
+                    1, rng.randint(50, 1500), 1, rng.randint(50, 1500)))
+
+    with open(files['geneSet'], 'w') as f:
+        f.writelines(geneName + '\n' for geneName in geneNames)
+
+    # SCRMshaw output: 18 columns, columns 5 and 10 are a gene or a comma separated list of genes
+    with open(files['scrmshawOutput'], 'w') as f:
+        for i in range(scrmshawLines):
+            genes5 = ','.join(rng.sample(geneNames, min(nGenes, rng.randint(1, 3))))
+            genes10 = genes5 if rng.random() < 0.3 else ','.join(rng.sample(geneNames, min(nGenes, rng.randint(1, 3))))
+            f.write('\t'.join(['chr' + str(i % 10), str(i * 1000), str(i * 1000 + 500), 'imm', '%.4f' % rng.random(), genes5, '-',
+                               '+', str(i), str(i + 1), genes10, '-', 'trainingSet', '1', '2', '3', '4', 'peak' + str(i)]) + '\n')
+    return files
+
+
+# this function returns peak memory (RSS, in MB) of this process, or of the finished child processes if children is True
+def peak_rss(children=False):
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in KB on linux and in bytes on macOS
+    return usage.ru_maxrss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+# this function runs func(*args), returns its result and adds a timing row (wall time, peak RSS, rows per second) to report
+def timed(report, stage, rows, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    wall = time.perf_counter() - start
+    report.append({'stage': stage, 'wall_s': round(wall, 4), 'peak_rss_mb': round(peak_rss(), 1), 'rows': rows,
+                   'rows_per_s': round(rows / wall) if wall > 0 else None})
+    return result
+
+
+# this function counts the lines of a file
+def count_lines(fileName):
+    with open(fileName, 'rb') as f:
+        return sum(1 for line in f)
+
+
+# this function times every stage of the mapping on the generated files (inside this process) and the whole pipeline
+# as a separate process, and returns the list of timing rows
+def run_benchmark(files, workDir, workers=1):
+    report = []
+    dict_sp1id = timed(report, 'idMap_dict', count_lines(files['sp1idmap']), om.idMap_dict, 'sp1id', files['sp1idmap'])
+    dict_brh = timed(report, 'brh_dict', count_lines(files['brh']), om.brh_dict, 'brh', files['brh'], 'true')
+    dict_sp2id = timed(report, 'idMap2_dict', count_lines(files['sp2idmap']), om.idMap2_dict, 'sp2id', files['sp2idmap'])
+    dict_symb = timed(report, 'geneSymbol_dict', count_lines(files['symbolGene']), om.geneSymbol_dict, 'symbol',
+                      files['symbolGene'], frozenset(dict_sp2id.values()))
+    pc1 = timed(report, 'paralogs (species X)', count_lines(files['sp1pc97']), om.paralogs, 'pc1', files['sp1pc97'])
+    pc2 = timed(report, 'paralogs (DMEL)', count_lines(files['sp2pc97']), om.paralogs, 'pc2', files['sp2pc97'])
+    sp1Ids = list(dict_sp1id.values())
+    timed(report, 'find (every species X id)', len(sp1Ids), lambda: [om.find(sp1Id, pc1) for sp1Id in sp1Ids])
+
+    with open(files['geneSet']) as gS:
+        geneNames = [line.rstrip('\n') for line in gS]
+    results = timed(report, 'gene loop (resolve_genes)', len(geneNames), om.resolve_genes, geneNames, dict_sp1id, dict_brh, pc1,
+                    dict_sp2id, dict_symb, pc2, None, ':', workers)
+
+    cwd = os.getcwd()
+    os.chdir(workDir)
+    try:
+        timed(report, 'write_results', len(results), om.write_results, 'bench', results)
+        dict_orthologs, dict_paralogs = timed(report, 'result_dicts', len(results), om.result_dicts, results)
+        timed(report, 'orthologs_dict (reparse final)', len(results), om.orthologs_dict, 'orthologs', 'paralogs', 'bench_final.txt')
+        timed(report, 'SCRMshaw annotation (-so)', count_lines(files['scrmshawOutput']), om.annotate_scrmshaw,
+              files['scrmshawOutput'], 'SO_bench.bed', dict_orthologs, dict_paralogs, workers)
+
+        # full pipeline as a separate process, so its peak memory is not mixed with the stages above
+        command = [sys.executable, os.path.abspath(om.__file__), '-np1', 'benchFull', '-sp1id', files['sp1idmap'],
+                   '-sp1pc', files['sp1pc97'], '-brh', files['brh'], '-sp2id', files['sp2idmap'], '-sp2pc', files['sp2pc97'],
+                   '-geneSet', files['geneSet'], '-symb', files['symbolGene'], '-so', files['scrmshawOutput'],
+                   '-workers', str(workers)]
+        start = time.perf_counter()
+        subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+        wall = time.perf_counter() - start
+        report.append({'stage': 'full pipeline', 'wall_s': round(wall, 4), 'peak_rss_mb': round(peak_rss(children=True), 1),
+                       'rows': len(geneNames), 'rows_per_s': round(len(geneNames) / wall) if wall > 0 else None})
+    finally:
+        os.chdir(cwd)
+    return report
+
+
+# this function prints the timing rows of one benchmark size as a table
+def print_report(nGenes, report):
+    print('\n== ' + str(nGenes) + ' genes ==')
+    print('%-32s %10s %12s %12s %14s' % ('stage', 'wall (s)', 'peak RSS MB', 'rows', 'rows/s'))
+    for row in report:
+        print('%-32s %10.3f %12.1f %12d %14s' % (row['stage'], row['wall_s'], row['peak_rss_mb'], row['rows'],
+                                                  row['rows_per_s'] if row['rows_per_s'] is not None else '-'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-sizes', '--sizes', help='comma separated numbers of species X genes to benchmark', default='10000,100000')
+    parser.add_argument('-maxCluster', '--maxCluster', help='largest number of ids in a 97pc list of paralogs', type=int, default=6)
+    parser.add_argument('-coverage', '--coverage', help='fraction of species X genes that have a brh', type=float, default=0.6)
+    parser.add_argument('-paralogFraction', '--paralogFraction', help='fraction of ids listed in 97pc files', type=float, default=0.3)
+    parser.add_argument('-scrmshawLines', '--scrmshawLines', help='number of lines of the SCRMshaw output (default: same as genes)', type=int)
+    parser.add_argument('-workers', '--workers', help='number of processes used for gene loop and SCRMshaw annotation', type=int, default=1)
+    parser.add_argument('-seed', '--seed', help='seed of the random generator', type=int, default=1)
+    parser.add_argument('-dir', '--workDir', help='directory for generated inputs and outputs (default: a temporary one, removed afterwards)')
+    parser.add_argument('-json', '--jsonReport', help='also write all timings to this json file (to track them over time)')
+    args = parser.parse_args()
+
+    workDir = args.workDir if args.workDir else tempfile.mkdtemp(prefix='orthologyBenchmark_')
+    allReports = []
+    try:
+        for nGenes in [int(size) for size in args.sizes.split(',')]:
+            sizeDir = os.path.join(workDir, str(nGenes))
+            os.makedirs(sizeDir, exist_ok=True)
+            files = generate_inputs(sizeDir, nGenes, args.maxCluster, args.coverage, args.paralogFraction,
+                                    symbolCoverage=0.85, scrmshawLines=args.scrmshawLines or nGenes, seed=args.seed)
+            report = run_benchmark(files, sizeDir, args.workers)
+            print_report(nGenes, report)
+            allReports.append({'genes': nGenes, 'maxCluster': args.maxCluster, 'coverage': args.coverage,
+                               'paralogFraction': args.paralogFraction, 'workers': args.workers, 'stages': report})
+    finally:
+        if not args.workDir:
+            shutil.rmtree(workDir, ignore_errors=True)
+
+    if args.jsonReport:
+        with open(args.jsonReport, 'w') as fj:
+            json.dump({'python': sys.version.split()[0], 'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'runs': allReports}, fj, indent=2)
+
+
+if __name__ == '__main__':
+    main()
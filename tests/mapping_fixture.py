@@ -0,0 +1,83 @@
+# species X / DMEL data set shared by the tests of orthologyMapping.py, with a gene for every kind of result:
+# GENE1 brh with symbol, no DMEL paralogs          GENE2 brh with DMEL paralogs (one of them without FBgn id)
+# GENE3 no brh, its paralog GENE2 has an ortholog   GENE4 brh partner without DMEL id (NULL columns)
+# GENE5 no brh, the brh partner of its paralog GENE4 has no DMEL id (NULL columns, no paralog list entry)
+# GENE6 no brh, its paralog GENE7 has an ortholog without symbol nor DMEL paralogs
+# GENE7 brh without symbol                          GENE8 and GENE11 no brh and no paralogs
+# GENE9 first (longest) of its list of paralogs     GENE10 no brh, its paralog GENE9 has no brh either
+# GENE12 brh whose symbol is not the first of its DMEL paralogs   GENE13 not in idmap
+import os
+import sys
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT = os.path.join(ROOT, 'orthologyMapping.py')
+
+INPUTS = {
+    'sp.idmap.txt': ''.join('9999:%06x SP:GENE%d\n' % (i, i) for i in range(1, 13)),
+    'sp.97pc.txt': '9999:000002\t9999:000003\n9999:000004\t9999:000005\n9999:000007\t9999:000006\n9999:000009\t9999:00000a\n',
+    'sp_dm.brh': '9999:000001\t7227:000001\t120.5\t1e-30\t91.5\t1\t200\t1\t210\n'
+                 '9999:000002\t7227:000002\t80.0\t1e-8\t70.0\t1\t90\t1\t90\n'
+                 '9999:000004\t7227:000009\t60.0\t1e-5\t55.0\t1\t50\t1\t60\n'
+                 '9999:000007\t7227:000004\t45.0\t1e-3\t40.0\t10\t40\t5\t50\n'
+                 '9999:00000c\t7227:000005\t300.0\t1e-90\t99.0\t1\t400\t1\t400\n',
+    'dm.idmap.txt': ''.join('7227:%06d FBgn%07d\n' % (i, i) for i in (1, 2, 4, 5, 6)),
+    'dm.97pc.txt': '7227:000002\t7227:000003\n7227:000006\t7227:000005\n',
+    'sym.tsv': '## symbols\n' + ''.join('FBgn%07d\tDmel\tS%d\tfull\t\tsyn\n' % (i, i) for i in (1, 2, 5, 6)),
+    'genes.txt': ''.join('SP:GENE%d\n' % i for i in range(1, 14)),
+    'conv.txt': 'gene1\tGENE1\ngene5\tGENE5\ngene13\tGENE13\n',
+    'scrm.bed': ''.join('chr1\t%d\t%d\tx\t0.5\t%s\t-\t7\t8\t9\t%s\t-\t12\t13\t14\t15\t16\tset%d\n' % (100 * i, 100 * i + 50, left, right, i)
+                        for i, (left, right) in enumerate([('SP:GENE1', 'SP:GENE1'), ('SP:GENE4', 'SP:GENE5'),
+                                                           ('SP:GENE5,SP:GENE3', 'SP:GENE2'), ('SP:GENE6', 'SP:GENE7,SP:GENE12'),
+                                                           ('SP:GENE13,SP:GENE8', 'SP:GENE9,SP:GENE10'),
+                                                           ('SP:GENE11', 'SP:GENE11')], 1)),
+}
+
+# genes whose rows have NULL columns (brh partner without DMEL id), the rows older versions wrote short
+RAGGED_GENES = ['SP:GENE4', 'SP:GENE5']
+
+ARGS = ['-np1', 'sp', '-sp1id', 'sp.idmap.txt', '-sp1pc', 'sp.97pc.txt', '-brh', 'sp_dm.brh', '-sp2id', 'dm.idmap.txt',
+        '-sp2pc', 'dm.97pc.txt', '-symb', 'sym.tsv', '-geneSet', 'genes.txt', '-so', 'scrm.bed', '-conv', 'false', '-report', 'false']
+CONVERSION = ['-conv', 'true', '-setConv', 'conv.txt']
+
+# outputs of a mapping run with -so scrm.bed
+OUTPUTS = ['sp_final.txt', 'sp_temp.txt', 'sp_orthologList.csv', 'sp_paralogList.csv', 'SO_scrm.bed']
+
+
+# this class runs orthologyMapping.py in a work directory holding INPUTS (a new one for every test)
+class MappingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workDir)
+        for fileName, text in INPUTS.items():
+            self.write(fileName, text)
+
+    def path(self, fileName):
+        return os.path.join(self.workDir, fileName)
+
+    def write(self, fileName, text):
+        with open(self.path(fileName), 'w') as f:
+            f.write(text)
+
+    def read(self, fileName):
+        with open(self.path(fileName)) as f:
+            return f.read()
+
+    # runs the script with args in the work directory and returns its stdout
+    def run_script(self, *args):
+        process = subprocess.run([sys.executable, SCRIPT] + list(args), cwd=self.workDir, check=True, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, universal_newlines=True)
+        return process.stdout
+
+    # runs a mapping of the data set (ARGS, with args added) and returns {output file: its text}, the outputs are
+    # removed so the next run writes them again
+    def run_mapping(self, *args, outputs=OUTPUTS):
+        self.run_script(*(ARGS + list(args)))
+        texts = {}
+        for fileName in outputs:
+            texts[fileName] = self.read(fileName)
+            os.remove(self.path(fileName))
+        return texts
@@ -0,0 +1,44 @@
+# tests of orthologyMapping.py annotate (SCRMshaw output annotated from the outputs of an earlier run): it must write the same
+# annotated SCRMshaw output as the mapping run itself, also from <namesp1>_final.txt files of older versions
+import unittest
+
+from mapping_fixture import MappingTestCase
+
+# rows of GENE4 and GENE5 as the first version wrote them into sp_final.txt (11 and 5 columns)
+OLD_ROWS = {
+    'SP:GENE4': 'SP:GENE4\tNULL\tNULL\tNULL\tNULL\tNULL\tNULL\t-\t-\t-\t-\n',
+    'SP:GENE5': 'SP:GENE5\tNoDirectOrtholog\tNULL\t-\t-\n',
+}
+
+
+class AnnotateTest(MappingTestCase):
+    def annotate(self, *args):
+        self.run_script('annotate', '-so', 'scrm.bed', '-o', 'annotated.bed', *args)
+        return self.read('annotated.bed')
+
+    def test_final_file(self):
+        outputs = self.run_mapping()
+        self.write('final.txt', outputs['sp_final.txt'])
+        self.assertEqual(self.annotate('-final', 'final.txt'), outputs['SO_scrm.bed'])
+
+    def test_lists(self):
+        outputs = self.run_mapping()
+        self.write('orth.csv', outputs['sp_orthologList.csv'])
+        self.write('para.csv', outputs['sp_paralogList.csv'])
+        self.assertEqual(self.annotate('-orth', 'orth.csv', '-para', 'para.csv'), outputs['SO_scrm.bed'])
+
+    def test_final_file_of_older_version(self):
+        outputs = self.run_mapping()
+        rows = [OLD_ROWS.get(line.split('\t')[0], line) for line in outputs['sp_final.txt'].splitlines(True)]
+        self.assertEqual([len(row.split('\t')) for row in rows if row in OLD_ROWS.values()], [11, 5])
+        self.write('final.txt', ''.join(rows))
+        self.assertEqual(self.annotate('-final', 'final.txt'), outputs['SO_scrm.bed'])
+
+    def test_final_file_with_brh_metrics(self):
+        expected = self.run_mapping()['SO_scrm.bed']
+        self.write('final.txt', self.run_mapping('-brhMetrics', 'true')['sp_final.txt'])
+        self.assertEqual(self.annotate('-final', 'final.txt'), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
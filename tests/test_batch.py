@@ -0,0 +1,54 @@
+# tests of orthologyMapping.py batch (species of a manifest mapped against DMEL in one process): each species must get the
+# outputs of a mapping run of that species alone
+import json
+import os
+import unittest
+
+from mapping_fixture import CONVERSION, INPUTS, MappingTestCase
+
+# the data set as two species of a manifest: sp as in ARGS, sq with the conversion file and its own SCRMshaw output
+SPECIES = [
+    {'name': 'sp', 'sp1idmap': 'sp.idmap.txt', 'sp1pc97': 'sp.97pc.txt', 'brh': 'sp_dm.brh', 'geneSet': 'genes.txt', 'scrmshawOutput': 'scrm.bed'},
+    {'name': 'sq', 'sp1idmap': 'sp.idmap.txt', 'sp1pc97': 'sp.97pc.txt', 'brh': 'sp_dm.brh', 'geneSet': 'genes.txt',
+     'scrmshawOutput': 'scrm2.bed', 'conversion': 'True', 'setConvGene': 'conv.txt'},
+]
+BATCH_ARGS = ['-sp2id', 'dm.idmap.txt', '-sp2pc', 'dm.97pc.txt', '-symb', 'sym.tsv']
+SPECIES_OUTPUTS = ['_final.txt', '_temp.txt', '_orthologList.csv', '_paralogList.csv']
+
+
+class BatchTest(MappingTestCase):
+    def setUp(self):
+        super().setUp()
+        self.write('scrm2.bed', INPUTS['scrm.bed'])
+        os.mkdir(self.path('manifests'))
+        expected = self.run_mapping()
+        expected.update({'sq' + name[2:] if name.startswith('sp_') else 'SO_scrm2.bed': text
+                         for name, text in self.run_mapping(*CONVERSION).items()})
+        self.expected = expected
+
+    # runs batch with the manifest (in its own directory, its paths are relative to it) and returns the outputs of both species
+    def run_batch(self, manifest, *args):
+        self.run_script('batch', '-manifest', manifest, '-workers', '1', *(BATCH_ARGS + list(args)))
+        outputs = [name + suffix for name in ['sp', 'sq'] for suffix in SPECIES_OUTPUTS] + ['SO_scrm.bed', 'SO_scrm2.bed']
+        texts = {}
+        for fileName in outputs:
+            texts[fileName] = self.read(fileName)
+            os.remove(self.path(fileName))
+        return texts
+
+    def test_tsv_manifest(self):
+        header = ['name', 'sp1idmap', 'sp1pc97', 'brh', 'geneSet', 'scrmshawOutput', 'conversion', 'setConvGene']
+        rows = ['\t'.join(['../' + species[key] if key in ('sp1idmap', 'sp1pc97', 'brh', 'geneSet', 'scrmshawOutput', 'setConvGene')
+                           and key in species else species.get(key, '') for key in header]) for species in SPECIES]
+        self.write('manifests/species.tsv', '\n'.join(['\t'.join(header), '# comment'] + rows) + '\n')
+        self.assertEqual(self.run_batch('manifests/species.tsv'), self.expected)
+
+    def test_json_manifest(self):
+        self.write('species.json', json.dumps(SPECIES))
+        self.assertEqual(self.run_batch('species.json'), self.expected)
+        self.assertEqual(self.run_batch('species.json', '-workers', '2'), self.expected)
+        self.assertEqual(self.run_batch('species.json', '-compact', 'true', '-cache', 'cache'), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
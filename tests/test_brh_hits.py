@@ -0,0 +1,58 @@
+# tests of the options of orthologyMapping.py reading the metrics of the brh hits: -brhMetrics (metrics of the hit of each
+# direct ortholog added to <namesp1>_final.txt) and -minScore/-maxEvalue/-minIdentity/-minAlnLen (only the hits passing them used)
+import unittest
+
+from mapping_fixture import INPUTS, MappingTestCase
+
+# each threshold option with a value and the hits (columns of a brh line) passing it, the aligned length of a hit being the
+# shorter of its two aligned ranges
+THRESHOLDS = [
+    (['-minScore', '70'], lambda cols: float(cols[2]) >= 70),
+    (['-maxEvalue', '1e-6'], lambda cols: float(cols[3]) <= 1e-6),
+    (['-minIdentity', '60'], lambda cols: float(cols[4]) >= 60),
+    (['-minAlnLen', '60'], lambda cols: min(int(cols[6]) - int(cols[5]), int(cols[8]) - int(cols[7])) + 1 >= 60),
+]
+
+
+class BrhMetricsTest(MappingTestCase):
+    def test_metrics_after_the_final_columns(self):
+        expected = self.run_mapping()['sp_final.txt'].splitlines()
+        rows = [line.split('\t') for line in self.run_mapping('-brhMetrics', 'true')['sp_final.txt'].splitlines()]
+        self.assertEqual(['\t'.join(row[:9]) for row in rows], expected)
+        self.assertEqual(rows[0][9:], ['BRH_score', 'BRH_evalue', 'BRH_identity', 'BRH_alignedLength'])
+        metrics = {row[0]: row[9:] for row in rows[1:]}
+        self.assertEqual(metrics['SP:GENE1'], ['120.50', '1.0000e-30', '91.50', '200'])
+        # the hit of GENE4 is used although its partner has no DMEL id, GENE5 has no hit of its own
+        self.assertEqual(metrics['SP:GENE4'], ['60.00', '1.0000e-05', '55.00', '50'])
+        self.assertEqual(metrics['SP:GENE5'], ['-'] * 4)
+        self.assertEqual(metrics['SP:GENE13'], ['-'] * 4)
+
+
+class BrhThresholdTest(MappingTestCase):
+    # runs with the thresholds must give the outputs of a default run on a brh file holding only the hits passing them
+    def check_thresholds(self, args, passing, *moreArgs):
+        brhLines = [line for line in INPUTS['sp_dm.brh'].splitlines(True) if all(hit(line.split('\t')) for hit in passing)]
+        self.assertTrue(0 < len(brhLines) < len(INPUTS['sp_dm.brh'].splitlines()), args)
+        expected = self.run_mapping(*moreArgs)
+        self.write('sp_dm.brh', ''.join(brhLines))
+        filtered = self.run_mapping(*moreArgs)
+        self.write('sp_dm.brh', INPUTS['sp_dm.brh'])
+        self.assertNotEqual(filtered, expected, args)
+        self.assertEqual(self.run_mapping(*(args + list(moreArgs))), filtered, args)
+
+    def test_each_threshold(self):
+        for args, passing in THRESHOLDS:
+            self.check_thresholds(args, [passing])
+            self.check_thresholds(args, [passing], '-engine', 'vector')
+
+    def test_thresholds_together(self):
+        self.check_thresholds(THRESHOLDS[1][0] + THRESHOLDS[3][0], [THRESHOLDS[1][1], THRESHOLDS[3][1]])
+        self.check_thresholds(THRESHOLDS[0][0] + THRESHOLDS[2][0], [THRESHOLDS[0][1], THRESHOLDS[2][1]], '-lazy', 'true')
+
+    def test_metrics_of_the_hits_passing(self):
+        rows = [line.split('\t') for line in self.run_mapping('-brhMetrics', 'true', '-minScore', '100')['sp_final.txt'].splitlines()]
+        self.assertEqual({row[0]: row[9] for row in rows[1:] if row[9] != '-'}, {'SP:GENE1': '120.50', 'SP:GENE12': '300.00'})
+
+
+if __name__ == '__main__':
+    unittest.main()
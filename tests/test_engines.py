@@ -0,0 +1,49 @@
+# tests of the vector engine of orthologyMapping.py (-engine vector, see VECTOR ENGINE): it must give the same GeneResults,
+# and so the same outputs, as resolving the genes one by one, for every kind of result of the data set (see mapping_fixture)
+import sys
+import unittest
+
+from mapping_fixture import CONVERSION, INPUTS, RAGGED_GENES, ROOT, MappingTestCase
+
+sys.path.insert(0, ROOT)
+import orthologyMapping  # noqa: E402
+
+
+class EngineTest(MappingTestCase):
+    def resolve_both(self, ids=None, setConv=None):
+        tables = orthologyMapping.load_inputs(self.path('sp.idmap.txt'), self.path('sp_dm.brh'), 'true', self.path('dm.idmap.txt'),
+                                              self.path('sym.tsv'), self.path('sp.97pc.txt'), self.path('dm.97pc.txt'), ids=ids)
+        dict_conv = None if setConv is None else orthologyMapping.conv_dict('conv', self.path(setConv))
+        geneNames = INPUTS['genes.txt'].split()
+        loop = [orthologyMapping.resolve_gene(geneName, *tables, dict_conv) for geneName in geneNames]
+        vector = orthologyMapping.resolve_genes_vector(geneNames, *tables, dict_conv)
+        return (loop, vector)
+
+    def test_same_gene_results(self):
+        loop, vector = self.resolve_both()
+        self.assertEqual(vector, loop)
+        # every kind of result has the columns of the headers, the ragged ones included
+        for result in loop:
+            self.assertEqual(len(result.tempCols), len(orthologyMapping.TEMP_HEADER))
+            self.assertEqual(len(result.finalCols), len(orthologyMapping.FINAL_HEADER))
+        ragged = [result for result in loop if result.geneName in RAGGED_GENES]
+        self.assertEqual([result.finalCols[1:5] for result in ragged], [['NULL'] * 4, ['NoDirectOrtholog', 'NULL', '-', '-']])
+        self.assertEqual([result.paralog for result in ragged], [None, None])
+
+    def test_same_gene_results_with_conversion(self):
+        loop, vector = self.resolve_both(setConv='conv.txt')
+        self.assertEqual(vector, loop)
+
+    def test_same_gene_results_compact(self):
+        loop, vector = self.resolve_both(ids=orthologyMapping.IdTable())
+        self.assertEqual(vector, loop)
+        self.assertEqual(loop, self.resolve_both()[0])
+
+    def test_same_outputs(self):
+        for args in [[], CONVERSION]:
+            expected = self.run_mapping(*args)
+            self.assertEqual(self.run_mapping(*args, '-engine', 'vector'), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
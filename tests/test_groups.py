@@ -0,0 +1,75 @@
+# tests of orthologyMapping.py -groups true (co-orthology groups of the 97pc and brh graph, see CO-ORTHOLOGY GROUPS): the groups
+# must be the connected components of that graph, found here by a plain search, and the other outputs those of the default run
+import unittest
+
+from mapping_fixture import CONVERSION, INPUTS, MappingTestCase
+
+GROUP_OUTPUTS = ['sp_groups.txt', 'sp_geneGroups.txt']
+
+
+# this function returns the connected components of the graph of the data set as {('sp' or 'dm', id): set of its nodes}
+def components():
+    edges = {}
+
+    def link(a, b):
+        edges.setdefault(a, set()).add(b)
+        edges.setdefault(b, set()).add(a)
+
+    for fileName, side in [('sp.97pc.txt', 'sp'), ('dm.97pc.txt', 'dm')]:
+        for line in INPUTS[fileName].splitlines():
+            ids = line.split('\t')
+            for other in ids:
+                link((side, ids[0]), (side, other))
+    for line in INPUTS['sp_dm.brh'].splitlines():
+        cols = line.split('\t')
+        link(('sp', cols[0]), ('dm', cols[1]))
+    found = {}
+    for node in edges:
+        if node in found:
+            continue
+        component = set()
+        todo = [node]
+        while todo:
+            member = todo.pop()
+            if member not in component:
+                component.add(member)
+                todo.extend(edges[member])
+        for member in component:
+            found[member] = component
+    return found
+
+
+class GroupTest(MappingTestCase):
+    def test_same_outputs(self):
+        for args in [[], CONVERSION]:
+            self.assertEqual(self.run_mapping('-groups', 'true', *args), self.run_mapping(*args), args)
+
+    def test_connected_components(self):
+        outputs = self.run_mapping('-groups', 'true', outputs=GROUP_OUTPUTS)
+        geneGroups = [line.split('\t') for line in outputs['sp_geneGroups.txt'].splitlines()]
+        self.assertEqual(geneGroups[0], ['GeneName', 'GeneName_OGid', 'Group'])
+        groups = {}
+        for line in outputs['sp_groups.txt'].splitlines()[1:]:
+            cols = line.split('\t')
+            members = {('sp', member) for member in cols[1].split(',')}
+            members |= {('dm', member) for member in cols[2].split(',') if cols[2] != '-'}
+            groups[cols[0]] = members
+        found = components()
+        numbers = []
+        for geneName, sp1Id, group in geneGroups[1:]:
+            if ('sp', sp1Id) not in found:
+                self.assertEqual(group, '-', geneName)
+                continue
+            self.assertEqual(groups[group], found[('sp', sp1Id)], geneName)
+            if group not in numbers:
+                numbers.append(group)
+        # groups numbered in the order of the gene set, each written once
+        self.assertEqual(numbers, [str(number) for number in range(1, len(groups) + 1)])
+        # GENE4 and GENE5 (brh partner without DMEL id) are in one group with that partner, which has no FBgn id
+        gene4 = dict((row[0], row[2]) for row in geneGroups[1:])['SP:GENE4']
+        self.assertEqual(groups[gene4], {('sp', '9999:000004'), ('sp', '9999:000005'), ('dm', '7227:000009')})
+        self.assertIn('\t7227:000009\tNULL\tNoSymbolFound\n', outputs['sp_groups.txt'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+# tests of the result store of orthologyMapping.py (-store, see INCREMENTAL RE-MAPPING): a run taking genes from the store
+# must write the same <namesp1>_final.txt as a run without it
+# run with: python3 -m pytest tests (or python3 -m unittest discover tests)
+import os
+import sys
+import json
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+from mapping_fixture import OUTPUTS, MappingTestCase
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'orthologyMapping.py')
+
+# a small species X / DMEL data set: GENE1 has a brh, GENE2 has a brh and a list of paralogs, GENE3 only has GENE2 as paralog
+INPUTS = {
+    'sp.idmap.txt': '9999:000001 SP:GENE1\n9999:000002 SP:GENE2\n9999:000003 SP:GENE3\n',
+    'sp.97pc.txt': '9999:000002\t9999:000003\n',
+    'sp_dm.brh': '9999:000001\t7227:000001\t100.0\t1e-10\t90.0\t1\t100\t1\t100\n'
+                 '9999:000002\t7227:000002\t80.0\t1e-8\t70.0\t1\t90\t1\t90\n',
+    'dm.idmap.txt': '7227:000001 FBgn0000001\n7227:000002 FBgn0000002\n',
+    'dm.97pc.txt': '7227:000002\t7227:000003\n',
+    'sym.tsv': '## symbols\nFBgn0000001\tDmel\tS1\tfull\t\tsyn\nFBgn0000002\tDmel\tS2\tfull\t\tsyn\n',
+    'genes.txt': 'SP:GENE1\nSP:GENE2\nSP:GENE3\n',
+    'conv.txt': 'gene1\tGENE1\ngene3\tGENE3\n',
+}
+
+ARGS = ['-np1', 'sp', '-sp1id', 'sp.idmap.txt', '-sp1pc', 'sp.97pc.txt', '-brh', 'sp_dm.brh', '-sp2id', 'dm.idmap.txt',
+        '-sp2pc', 'dm.97pc.txt', '-symb', 'sym.tsv', '-geneSet', 'genes.txt']
+CONVERSION = ['-conv', 'true', '-setConv', 'conv.txt']
+NO_CONVERSION = ['-conv', 'false']
+
+
+class IncrementalStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.workDir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workDir)
+        for fileName, text in INPUTS.items():
+            self.write(fileName, text)
+
+    def write(self, fileName, text):
+        with open(os.path.join(self.workDir, fileName), 'w') as f:
+            f.write(text)
+
+    # runs the script in the work directory and returns its sp_final.txt
+    def run_mapping(self, *args):
+        subprocess.run([sys.executable, SCRIPT] + ARGS + list(args), cwd=self.workDir, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        with open(os.path.join(self.workDir, 'sp_final.txt')) as f:
+            return f.read()
+
+    def test_store_gives_same_output(self):
+        expected = self.run_mapping(*NO_CONVERSION)
+        self.assertEqual(self.run_mapping(*NO_CONVERSION, '-store', 'sp.store'), expected)
+        self.assertEqual(self.run_mapping(*NO_CONVERSION, '-store', 'sp.store'), expected)
+
+    def test_conversion_turned_on(self):
+        expected = self.run_mapping(*CONVERSION)
+        self.run_mapping(*NO_CONVERSION, '-store', 'sp.store')
+        final = self.run_mapping(*CONVERSION, '-store', 'sp.store')
+        self.assertEqual(final, expected)
+        self.assertIn('gene1\t', final)
+        self.assertIn('gene3\t', final)
+
+    def test_conversion_turned_off(self):
+        expected = self.run_mapping(*NO_CONVERSION)
+        self.run_mapping(*CONVERSION, '-store', 'sp.store')
+        self.assertEqual(self.run_mapping(*NO_CONVERSION, '-store', 'sp.store'), expected)
+
+    def test_conversion_entry_changed(self):
+        self.run_mapping(*CONVERSION, '-store', 'sp.store')
+        self.write('conv.txt', 'gene1\tGENE1\nother3\tGENE3\n')
+        expected = self.run_mapping(*CONVERSION)
+        self.assertEqual(self.run_mapping(*CONVERSION, '-store', 'sp.store'), expected)
+
+    def test_brh_changed(self):
+        self.run_mapping(*NO_CONVERSION, '-store', 'sp.store')
+        self.write('sp_dm.brh', INPUTS['sp_dm.brh'].replace('7227:000002\t80.0', '7227:000001\t180.0'))
+        expected = self.run_mapping(*NO_CONVERSION)
+        self.assertEqual(self.run_mapping(*NO_CONVERSION, '-store', 'sp.store'), expected)
+
+    # counts of the run report of the last run
+    def report_counts(self):
+        with open(os.path.join(self.workDir, 'sp_runReport.json')) as f:
+            return json.load(f)['counts']
+
+    def test_unchanged_inputs_resolve_nothing(self):
+        expected = self.run_mapping(*NO_CONVERSION, '-store', 'sp.store')
+        self.assertEqual(self.report_counts()['genes resolved'], 3)
+        storeStat = os.stat(os.path.join(self.workDir, 'sp.store'))
+        self.assertEqual(self.run_mapping(*NO_CONVERSION, '-store', 'sp.store'), expected)
+        self.assertEqual((self.report_counts()['genes resolved'], self.report_counts()['genes from result store']), (0, 3))
+        # a store whose genes and inputs did not change is not written again
+        self.assertEqual(os.stat(os.path.join(self.workDir, 'sp.store')).st_mtime_ns, storeStat.st_mtime_ns)
+
+    def test_new_gene_only_resolves_it(self):
+        self.run_mapping(*NO_CONVERSION, '-store', 'sp.store')
+        self.write('genes.txt', 'SP:GENE3\nSP:GENE4\nSP:GENE1\n')
+        expected = self.run_mapping(*NO_CONVERSION)
+        self.assertEqual(self.run_mapping(*NO_CONVERSION, '-store', 'sp.store'), expected)
+        self.assertEqual((self.report_counts()['genes resolved'], self.report_counts()['genes from result store']), (1, 2))
+
+
+# the same with the data set of mapping_fixture (every kind of result, the NULL columns of a brh partner without DMEL id too)
+class AllResultsStoreTest(MappingTestCase):
+    def test_store_gives_same_outputs(self):
+        expected = self.run_mapping()
+        self.assertEqual(self.run_mapping('-store', 'sp.store'), expected)
+        self.assertEqual(self.run_mapping('-store', 'sp.store'), expected)
+
+    def test_dmel_idmap_changed(self):
+        self.run_mapping('-store', 'sp.store', outputs=OUTPUTS[:2])
+        # the brh partner of GENE4 (and so of the paralog GENE5) gets a DMEL id, the one of GENE12 loses its id
+        self.write('dm.idmap.txt', self.read('dm.idmap.txt').replace('7227:000005 FBgn0000005', '7227:000009 FBgn0000009'))
+        expected = self.run_mapping()
+        self.assertEqual(self.run_mapping('-store', 'sp.store'), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
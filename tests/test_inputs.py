@@ -0,0 +1,85 @@
+# tests of the ways orthologyMapping.py reads its inputs (cache of parsed tables, compressed files, lazy loading of the rows
+# reachable from the gene set, GFF3 gene set and conversion file): each must give the outputs of the default run
+import bz2
+import gzip
+import lzma
+import os
+import unittest
+
+from mapping_fixture import ARGS, CONVERSION, INPUTS, OUTPUTS, MappingTestCase
+
+# gene set and conversion file of the data set as GFF3: the gene set is the gene features of genes.gff3 (a gene listed on two
+# lines is in it once), the conversions are the BEETLEBASE Dbxref entries of conv.gff3 (the first one of a gene, see conv.txt)
+GFF_INPUTS = {
+    'genes.gff3': '##gff-version 3\n# gene set\n' + ''.join(
+        'chr1\tsrc\tgene\t%d\t%d\t.\t+\t.\tID=SP:GENE%d;Name=g%d\n'
+        'chr1\tsrc\tmRNA\t%d\t%d\t.\t+\t.\tID=SP:RNA%d;Parent=SP:GENE%d\n' % (100 * i, 100 * i + 50, i, i, 100 * i, 100 * i + 50, i, i)
+        for i in range(1, 14)) + 'chr2\tsrc\tgene\t1\t50\t.\t+\t.\tID=SP:GENE2\n##FASTA\n>chr1\nACGT\n',
+    'conv.gff3': '##gff-version 3\n'
+                 'chr1\tsrc\tgene\t1\t50\t.\t+\t.\tID=gene1;Dbxref=GeneID:1,BEETLEBASE:GENE1\n'
+                 'chr1\tsrc\tgene\t60\t90\t.\t+\t.\tID=gene5;Dbxref=BEETLEBASE:GENE5\n'
+                 'chr1\tsrc\tgene\t95\t99\t.\t+\t.\tID=gene5b;Dbxref=OTHERDB:GENE6\n'
+                 'chr2\tsrc\tgene\t1\t50\t.\t+\t.\tID=gene13\n'
+                 'chr2\tsrc\tgene\t1\t50\t.\t+\t.\tID=gene13;Dbxref=BEETLEBASE:GENE13\n',
+}
+
+COMPRESSORS = {'.gz': gzip.compress, '.bz2': bz2.compress, '.xz': lzma.compress}
+
+
+# this function returns ARGS with the input files renamed by rename (the output name -np1 and flags are kept)
+def renamed_args(rename, args=ARGS):
+    return [rename(arg) if arg in INPUTS else arg for arg in args]
+
+
+class InputTest(MappingTestCase):
+    def test_cache(self):
+        expected = self.run_mapping()
+        self.assertEqual(self.run_mapping('-cache', 'cache'), expected)
+        self.assertTrue(os.listdir(self.path('cache')))
+        # second run reads the tables back from the cache
+        self.assertEqual(self.run_mapping('-cache', 'cache'), expected)
+        self.assertEqual(self.run_mapping('-cache', 'cache', *CONVERSION), self.run_mapping(*CONVERSION))
+
+    def test_compressed_inputs(self):
+        expected = self.run_mapping(*CONVERSION)
+        for suffix, compress in COMPRESSORS.items():
+            for fileName, text in INPUTS.items():
+                with open(self.path(fileName + suffix), 'wb') as f:
+                    f.write(compress(text.encode('utf-8')))
+            args = renamed_args(lambda fileName: fileName + suffix, ARGS + CONVERSION)
+            self.assertEqual(self.run_mapping(*args), expected, suffix)
+
+    # (the compression is found from the first bytes of a file, not from its name)
+    def test_compressed_inputs_without_suffix(self):
+        expected = self.run_mapping()
+        for fileName, text in INPUTS.items():
+            with open(self.path('z_' + fileName), 'wb') as f:
+                f.write(gzip.compress(text.encode('utf-8')))
+        outputs = self.run_mapping(*renamed_args(lambda fileName: 'z_' + fileName), outputs=OUTPUTS[:-1] + ['SO_z_scrm.bed'])
+        outputs['SO_scrm.bed'] = outputs.pop('SO_z_scrm.bed')
+        self.assertEqual(outputs, expected)
+
+    def test_lazy(self):
+        for args in [[], CONVERSION, ['-brhMetrics', 'true', '-minScore', '50']]:
+            self.assertEqual(self.run_mapping('-lazy', 'true', *args), self.run_mapping(*args), args)
+
+    def test_lazy_gene_subset(self):
+        self.write('genes.txt', 'SP:GENE5\nSP:GENE3\nSP:GENE13\n')
+        expected = self.run_mapping()
+        self.assertEqual(self.run_mapping('-lazy', 'true'), expected)
+
+    def test_gff_inputs(self):
+        for fileName, text in GFF_INPUTS.items():
+            self.write(fileName, text)
+        expected = self.run_mapping(*CONVERSION)
+        self.assertNotEqual(expected, self.run_mapping())
+        args = renamed_args(lambda fileName: {'genes.txt': 'genes.gff3', 'conv.txt': 'conv.gff3'}.get(fileName, fileName),
+                            ARGS + CONVERSION)
+        self.assertEqual(self.run_mapping(*args), expected)
+        with open(self.path('genes.gff3.gz'), 'wb') as f:
+            f.write(gzip.compress(GFF_INPUTS['genes.gff3'].encode('utf-8')))
+        self.assertEqual(self.run_mapping(*[arg if arg != 'genes.gff3' else 'genes.gff3.gz' for arg in args]), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# tests of the output formats of orthologyMapping.py (-format sqlite,parquet,arrow, see OUTPUT FORMATS): every format must
+# hold the rows of <namesp1>_final.txt, one value per column, also for rows of a brh partner without DMEL id
+import ast
+import json
+import sqlite3
+import sys
+import unittest
+
+from mapping_fixture import RAGGED_GENES, ROOT, MappingTestCase
+
+sys.path.insert(0, ROOT)
+import orthologyMapping  # noqa: E402
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+METRIC_TYPES = [float, float, float, int]
+
+
+# this function returns the rows of a final file as the formats hold them: lists of DMEL paralogs as lists (None for a cell
+# without list) and metrics as numbers (None for '-')
+def final_records(finalText):
+    lines = finalText.splitlines()
+    listColumns = [lines[0].split('\t').index(column) for column in orthologyMapping.LIST_COLUMNS]
+    records = []
+    for line in lines[1:]:
+        record = line.split('\t')
+        for column in listColumns:
+            record[column] = ast.literal_eval(record[column]) if record[column].startswith('[') else None
+        for column, toType in zip(range(9, len(record)), METRIC_TYPES):
+            record[column] = toType(record[column]) if record[column] != '-' else None
+        records.append(record)
+    return records
+
+
+class OutputFormatTest(MappingTestCase):
+    def sqlite_records(self, fileName):
+        db = sqlite3.connect(self.path(fileName))
+        try:
+            cursor = db.execute('SELECT * FROM genes ORDER BY rowid')
+            header = [description[0] for description in cursor.description]
+            rows = [list(row) for row in cursor]
+        finally:
+            db.close()
+        for row in rows:
+            for column, name in enumerate(header):
+                if name in orthologyMapping.LIST_COLUMNS and row[column] is not None:
+                    row[column] = json.loads(row[column])
+        return rows
+
+    def arrow_records(self, fileName):
+        if fileName.endswith('.parquet'):
+            table = pyarrow.parquet.read_table(self.path(fileName))
+        else:
+            with pyarrow.ipc.open_file(self.path(fileName)) as reader:
+                table = reader.read_all()
+        return [list(row.values()) for row in table.to_pylist()]
+
+    def check_formats(self, *args):
+        outputs = self.run_mapping('-format', 'tsv,sqlite' + (',parquet,arrow' if pyarrow is not None else ''), *args,
+                                   outputs=['sp_final.txt'])
+        expected = final_records(outputs['sp_final.txt'])
+        self.assertEqual(self.sqlite_records('sp.sqlite'), expected)
+        if pyarrow is not None:
+            self.assertEqual(self.arrow_records('sp_final.parquet'), expected)
+            self.assertEqual(self.arrow_records('sp_final.arrow'), expected)
+        return {record[0]: record for record in expected}
+
+    def test_formats(self):
+        records = self.check_formats()
+        self.assertEqual([len(records[gene]) for gene in RAGGED_GENES], [9, 9])
+
+    def test_formats_with_brh_metrics(self):
+        records = self.check_formats('-brhMetrics', 'true')
+        self.assertEqual([records[gene][9:] for gene in RAGGED_GENES], [[60.0, 1e-05, 55.0, 50], [None] * 4])
+
+    # results with the rows the first version wrote for GENE4 and GENE5 (11 and 5 columns) are written one value per column
+    def test_short_and_long_rows(self):
+        results = orthologyMapping.resolve_genes(RAGGED_GENES, *orthologyMapping.load_inputs(
+            self.path('sp.idmap.txt'), self.path('sp_dm.brh'), 'true', self.path('dm.idmap.txt'), self.path('sym.tsv'),
+            self.path('sp.97pc.txt'), self.path('dm.97pc.txt')))
+        oldRows = [['SP:GENE4'] + ['NULL'] * 6 + ['-'] * 4, ['SP:GENE5', 'NoDirectOrtholog', 'NULL', '-', '-']]
+        results = [result._replace(finalCols=finalCols) for result, finalCols in zip(results, oldRows)]
+        expected = [['SP:GENE4', 'NULL', 'NULL', None, None, 'NULL', 'NULL', None, None],
+                    ['SP:GENE5', 'NoDirectOrtholog', 'NULL', None, None, '-', '-', None, None]]
+        namesp1 = self.path('sp')
+        orthologyMapping.write_sqlite(namesp1, results, {}, {})
+        self.assertEqual(self.sqlite_records('sp.sqlite'), expected)
+        if pyarrow is not None:
+            orthologyMapping.write_parquet(namesp1, results, {}, {})
+            orthologyMapping.write_arrow(namesp1, results, {}, {})
+            self.assertEqual(self.arrow_records('sp_final.parquet'), expected)
+            self.assertEqual(self.arrow_records('sp_final.arrow'), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
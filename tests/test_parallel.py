@@ -0,0 +1,55 @@
+# tests of the worker processes of orthologyMapping.py (-workers): the gene set resolved in chunks and the SCRMshaw output
+# annotated in byte range chunks must give the same results, in the same order, as one process
+import sys
+import unittest
+
+from mapping_fixture import CONVERSION, INPUTS, ROOT, MappingTestCase
+
+sys.path.insert(0, ROOT)
+import orthologyMapping  # noqa: E402
+
+
+class ParallelTest(MappingTestCase):
+    def test_same_outputs(self):
+        for args in [[], CONVERSION]:
+            self.assertEqual(self.run_mapping('-workers', '3', *args), self.run_mapping(*args), args)
+
+    # (gene sets smaller than a chunk are resolved in the process itself, so this one is made larger than a few chunks)
+    def test_resolve_in_chunks(self):
+        tables = orthologyMapping.load_inputs(self.path('sp.idmap.txt'), self.path('sp_dm.brh'), 'true', self.path('dm.idmap.txt'),
+                                              self.path('sym.tsv'), self.path('sp.97pc.txt'), self.path('dm.97pc.txt'))
+        sp1id, brh, sp2id, symb, pc1, pc2 = tables
+        geneNames = INPUTS['genes.txt'].split() * 1000
+        geneNames[::7] = ['SP:EXTRA%d' % i for i in range(len(geneNames[::7]))]
+        expected = orthologyMapping.resolve_genes(geneNames, sp1id, brh, pc1, sp2id, symb, pc2)
+        self.assertEqual(orthologyMapping.resolve_genes(geneNames, sp1id, brh, pc1, sp2id, symb, pc2, workers=3), expected)
+
+    def test_annotate_in_chunks(self):
+        outputs = self.run_mapping()
+        self.write('final.txt', outputs['sp_final.txt'])
+        # lines of different lengths so the chunk boundaries fall inside lines, the last one without newline
+        lines = INPUTS['scrm.bed'].splitlines(True) * 40
+        lines = [line.replace('\tx\t', '\t' + 'x' * (i % 13) + '\t') for i, line in enumerate(lines)]
+        lines[-1] = lines[-1].rstrip('\n')
+        self.write('scrm.bed', ''.join(lines))
+        annotated = []
+        for workers in ['1', '2', '5']:
+            self.run_script('annotate', '-final', 'final.txt', '-so', 'scrm.bed', '-o', 'annotated.bed', '-workers', workers)
+            annotated.append(self.read('annotated.bed'))
+        self.assertEqual(annotated[1:], annotated[:1] * 2)
+        # every line annotated as in the mapping run (its name column put back)
+        expected = outputs['SO_scrm.bed'].splitlines() * 40
+        self.assertEqual([line.split('\t', 4)[:3] + ['x'] + line.split('\t', 4)[4:] for line in annotated[0].splitlines()],
+                         [line.split('\t', 4) for line in expected])
+
+    def test_line_chunks(self):
+        self.write('scrm.bed', INPUTS['scrm.bed'])
+        for nChunks in [1, 4, 100]:
+            chunks = orthologyMapping.line_chunks(self.path('scrm.bed'), nChunks)
+            text = ''.join(self.read('scrm.bed')[start:end] for fileSO, start, end in chunks)
+            self.assertEqual(text, INPUTS['scrm.bed'])
+            self.assertTrue(all(self.read('scrm.bed')[end - 1] == '\n' for fileSO, start, end in chunks))
+
+
+if __name__ == '__main__':
+    unittest.main()
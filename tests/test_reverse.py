@@ -0,0 +1,55 @@
+# tests of orthologyMapping.py reverse (FlyBase genes to the genes of each species): the orthologs and in-paralogs of a FlyBase
+# gene must be the genes the mapping run gives it as ortholog and as ortholog of their paralogs
+import json
+import unittest
+
+from mapping_fixture import MappingTestCase
+
+REVERSE_ARGS = ['-np1', 'sp', '-sp1id', 'sp.idmap.txt', '-sp1pc', 'sp.97pc.txt', '-brh', 'sp_dm.brh', '-sp2id', 'dm.idmap.txt',
+                '-symb', 'sym.tsv', '-o', 'reverse.txt']
+FBGNS = ['FBgn%07d' % i for i in (1, 2, 4, 5, 6)]
+
+
+class ReverseTest(MappingTestCase):
+    # returns {FBgn id: (orthologs, in-paralogs)} of the genes of the mapping run (Orthologs and ParalogsThatHaveOrthologs columns)
+    def forward_genes(self):
+        genes = {fbgn: ([], []) for fbgn in FBGNS}
+        for line in self.run_mapping()['sp_final.txt'].splitlines()[1:]:
+            cols = line.split('\t')
+            for side, fbgn in enumerate([cols[1], cols[5]]):
+                if fbgn in genes:
+                    genes[fbgn][side].append(cols[0])
+        return genes
+
+    def reverse(self, *args):
+        self.run_script('reverse', *(REVERSE_ARGS + list(args)))
+        lines = self.read('reverse.txt').splitlines()
+        self.assertEqual(lines[0].split('\t'), ['Query', 'FBgn', 'Symbol', 'Species', 'Orthologs', 'InParalogs'])
+        return [line.split('\t') for line in lines[1:]]
+
+    def test_same_genes_as_mapping(self):
+        expected = [[fbgn, fbgn, 'S' + fbgn[-1] if fbgn != 'FBgn0000004' else 'NoSymbolFound', 'sp', ','.join(orthologs) or '-',
+                     ','.join(paralogs) or '-'] for fbgn, (orthologs, paralogs) in self.forward_genes().items()]
+        self.assertEqual(self.reverse('-q', ','.join(FBGNS)), expected)
+        self.assertEqual(self.reverse('-q', ','.join(FBGNS), '-compact', 'true', '-cache', 'cache'), expected)
+
+    # queries by symbol and DMEL id give the rows of their FBgn id, the DMEL id of the brh partner of GENE4 is not in the idmap
+    def test_queries(self):
+        self.write('queries.txt', 'S2\n\n7227:000004\nnothing\n7227:000009\n')
+        rows = self.reverse('-queryFile', 'queries.txt', '-q', 'FBgn0000002')
+        self.assertEqual([row[:2] for row in rows], [['FBgn0000002', 'FBgn0000002'], ['S2', 'FBgn0000002'],
+                                                     ['7227:000004', 'FBgn0000004'], ['nothing', 'NotFound'],
+                                                     ['7227:000009', 'NotFound']])
+        self.assertEqual(rows[0][1:], rows[1][1:])
+        self.assertEqual(rows[2][4:], ['SP:GENE7', 'SP:GENE6'])
+
+    def test_manifest(self):
+        single = self.reverse('-q', ','.join(FBGNS))
+        species = {'sp1idmap': 'sp.idmap.txt', 'sp1pc97': 'sp.97pc.txt', 'brh': 'sp_dm.brh'}
+        self.write('species.json', json.dumps([dict(species, name='sp'), dict(species, name='sq')]))
+        rows = self.reverse('-manifest', 'species.json', '-q', ','.join(FBGNS))
+        self.assertEqual(rows, [row[:3] + [name] + row[4:] for row in single for name in ['sp', 'sq']])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+# tests of orthologyMapping.py serve (lookups over local HTTP): /resolve and /annotate must answer the rows and annotated
+# lines of a mapping run, bad requests get 400 and input files that cannot be read 503 (the tables in use are kept)
+import json
+import os
+import subprocess
+import sys
+import unittest
+import urllib.error
+import urllib.request
+
+from mapping_fixture import CONVERSION, INPUTS, ROOT, SCRIPT, MappingTestCase
+
+sys.path.insert(0, ROOT)
+import orthologyMapping  # noqa: E402
+
+SERVE_ARGS = ['-sp1id', 'sp.idmap.txt', '-sp1pc', 'sp.97pc.txt', '-brh', 'sp_dm.brh', '-sp2id', 'dm.idmap.txt', '-sp2pc', 'dm.97pc.txt',
+              '-symb', 'sym.tsv', '-port', '0']
+
+
+class ServeTest(MappingTestCase):
+    # starts the service with args in the work directory (on a free port), it is stopped at the end of the test
+    def serve(self, *args):
+        server = subprocess.Popen([sys.executable, SCRIPT, 'serve'] + SERVE_ARGS + list(args), cwd=self.workDir,
+                                  stdout=subprocess.PIPE, universal_newlines=True)
+        self.addCleanup(server.wait)
+        self.addCleanup(server.terminate)
+        self.addCleanup(server.stdout.close)
+        self.url = server.stdout.readline().split()[-1]
+
+    # sends a request (body given as bytes or JSON data) and returns its status and JSON answer
+    def request(self, path, body=None):
+        if body is not None and not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+        try:
+            with urllib.request.urlopen(self.url + path, data=body, timeout=30) as response:
+                return (response.status, json.load(response))
+        except urllib.error.HTTPError as e:
+            with e:
+                return (e.code, json.load(e))
+
+    def final_rows(self, outputs):
+        return [dict(zip(orthologyMapping.FINAL_HEADER, line.split('\t'))) for line in outputs['sp_final.txt'].splitlines()[1:]]
+
+    def test_resolve(self):
+        outputs = self.run_mapping()
+        self.serve()
+        status, answer = self.request('/resolve', {'genes': INPUTS['genes.txt'].split()})
+        self.assertEqual((status, answer['results']), (200, self.final_rows(outputs)))
+        self.assertEqual(answer['reloaded'], False)
+
+    def test_resolve_with_conversion_and_thresholds(self):
+        self.serve('-setConv', 'conv.txt')
+        status, answer = self.request('/resolve', {'genes': INPUTS['genes.txt'].split()})
+        self.assertEqual(answer['results'], self.final_rows(self.run_mapping(*CONVERSION)))
+        status, answer = self.request('/resolve', {'genes': INPUTS['genes.txt'].split(), 'brh': {'minScore': 70, 'maxEvalue': 1e-6}})
+        self.assertEqual(answer['results'], self.final_rows(self.run_mapping('-minScore', '70', '-maxEvalue', '1e-6', *CONVERSION)))
+
+    def test_annotate(self):
+        outputs = self.run_mapping()
+        self.serve('-compact', 'true')
+        status, answer = self.request('/annotate', {'lines': INPUTS['scrm.bed'].splitlines()})
+        self.assertEqual(status, 200)
+        self.assertEqual([line.rstrip('\n') for line in answer['lines']], outputs['SO_scrm.bed'].splitlines())
+
+    def test_status(self):
+        self.serve()
+        status, answer = self.request('/status')
+        self.assertEqual(status, 200)
+        self.assertEqual(sorted(os.path.basename(fileI) for fileI in answer['inputs']),
+                         sorted(['sp.idmap.txt', 'sp.97pc.txt', 'sp_dm.brh', 'dm.idmap.txt', 'dm.97pc.txt', 'sym.tsv']))
+        self.assertEqual(self.request('/other')[0], 404)
+
+    def test_bad_requests(self):
+        self.serve()
+        for path, body in [('/resolve', b'{not json'), ('/resolve', b'["SP:GENE1"]'), ('/resolve', {'genes': ['SP:GENE1', 3]}),
+                           ('/annotate', {'lines': [None]}), ('/resolve', {'genes': ['SP:GENE1'], 'brh': {'minScore': 'high'}}),
+                           ('/resolve', {'genes': ['SP:GENE1'], 'brh': {'unknown': 1}}), ('/resolve', {'lines': []}),
+                           ('/annotate', {'lines': ['too\tfew\tcolumns']}), ('/other', {'genes': []})]:
+            status, answer = self.request(path, body)
+            self.assertEqual(status, 400, (path, body))
+            self.assertIn('error', answer)
+        # the service still answers after them
+        self.assertEqual(self.request('/resolve', {'genes': ['SP:GENE1']})[0], 200)
+
+    def test_reload(self):
+        self.serve()
+        self.write('sym.tsv', INPUTS['sym.tsv'].replace('\tS1\t', '\tNewS1\t'))
+        status, answer = self.request('/resolve', {'genes': ['SP:GENE1']})
+        self.assertEqual((status, answer['reloaded'], answer['results'][0]['GeneSymbolOrthologs']), (200, True, 'NewS1'))
+
+    def test_unreadable_inputs(self):
+        expected = self.final_rows(self.run_mapping())
+        self.serve()
+        os.rename(self.path('sp_dm.brh'), self.path('moved.brh'))
+        status, answer = self.request('/resolve', {'genes': INPUTS['genes.txt'].split()})
+        self.assertEqual(status, 503)
+        self.assertIn('error', answer)
+        self.assertEqual(self.request('/annotate', {'lines': []})[0], 503)
+        # once the file is back the tables are read again (they were kept meanwhile)
+        os.rename(self.path('moved.brh'), self.path('sp_dm.brh'))
+        status, answer = self.request('/resolve', {'genes': INPUTS['genes.txt'].split()})
+        self.assertEqual((status, answer['results']), (200, expected))
+
+
+if __name__ == '__main__':
+    unittest.main()